@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Async Downloader - asyncio/aiohttp engine for bulk document downloads
+Downloads every document of a bill on one event loop: a per-host semaphore caps
+how hard we hit each server, bodies are streamed to disk, each attempt has its
+own deadline and retries wait on the loop instead of holding a thread.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+import aiohttp
+
+from document_store import get_store, text_path
+from extraction_cache import has_current_extraction
+from file_download import (DownloadValidationError, finish_partial, hash_file, partial_path,
+                           resume_headers, start_partial)
+from http_client import DEFAULT_HEADERS
+from rate_limiter import get_limiter, is_retryable_status, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Concurrent downloads per host, and across all hosts
+DOWNLOAD_PER_HOST = int(os.environ.get("DOWNLOAD_PER_HOST", 4))
+DOWNLOAD_MAX_CONCURRENCY = int(os.environ.get("DOWNLOAD_MAX_CONCURRENCY", 8))
+# Seconds allowed for a single attempt (connect + full body)
+DOWNLOAD_DEADLINE = float(os.environ.get("DOWNLOAD_DEADLINE", 60))
+DOWNLOAD_MAX_RETRIES = int(os.environ.get("DOWNLOAD_MAX_RETRIES", 3))
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RetryableDownloadError(Exception):
+    """A failed attempt worth trying again (transient status, reset, timeout)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AsyncDocumentDownloader:
+    """Downloads a list of document dicts concurrently and keeps throughput stats."""
+
+    def __init__(self, output_dir, per_host=DOWNLOAD_PER_HOST, max_concurrency=DOWNLOAD_MAX_CONCURRENCY,
+                 deadline=DOWNLOAD_DEADLINE, max_retries=DOWNLOAD_MAX_RETRIES):
+        self.output_dir = output_dir
+        self.store = get_store(output_dir)
+        self.per_host = per_host
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.host_semaphores = {}
+        self.stats = {
+            "documents": 0,
+            "downloaded": 0,
+            "cached": 0,
+            "skipped": 0,
+            "failed": 0,
+            "retries": 0,
+            "bytes": 0,
+        }
+
+    def host_semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self.host_semaphores[host]
+
+    async def fetch_to_file(self, session, url, filepath, hasher):
+        """
+        One attempt: stream the body into filepath's .part file, resuming
+        where an earlier attempt stopped, then validate and rename it into
+        place. Every byte of the file goes through hasher. Returns bytes
+        written and the response headers.
+        """
+        written = 0
+        headers, offset = resume_headers(filepath)
+        if offset:
+            logger.info(f"Resuming {url} from byte {offset}")
+        limiter = get_limiter(url)
+        async with self.host_semaphore(url):
+            await limiter.acquire_async()
+            start_time = time.monotonic()
+            released = False
+            try:
+                async with session.get(url, headers=headers) as response:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    limiter.release(status=response.status, latency=time.monotonic() - start_time,
+                                    retry_after=retry_after)
+                    released = True
+                    if is_retryable_status(response.status):
+                        raise RetryableDownloadError(f"HTTP {response.status}", retry_after=retry_after)
+                    if response.status == 416 and offset:
+                        finish_partial(filepath, None)
+                        hash_file(hasher, filepath)
+                        return 0, response.headers
+                    response.raise_for_status()
+                    response_headers = response.headers
+                    offset, expected_size = start_partial(filepath, response.status, response.headers, offset)
+                    if offset:
+                        hash_file(hasher, partial_path(filepath), offset)
+                    with open(partial_path(filepath), 'r+b' if offset else 'wb') as f:
+                        f.seek(offset)
+                        f.truncate()
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            f.write(chunk)
+                            hasher.update(chunk)
+                            written += len(chunk)
+            except (aiohttp.ClientPayloadError, aiohttp.ServerDisconnectedError,
+                    aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not released:
+                    limiter.release(error=True)
+                raise RetryableDownloadError(f"{type(e).__name__}: {e}")
+            except DownloadValidationError as e:
+                raise RetryableDownloadError(str(e))
+
+        try:
+            finish_partial(filepath, expected_size)
+        except DownloadValidationError as e:
+            raise RetryableDownloadError(str(e))
+        return written, response_headers
+
+    async def download(self, session, doc_info):
+        """Same contract as download_and_process_doc(..., extract_text=False)."""
+        try:
+            return await self._download(session, doc_info)
+        except Exception as e:
+            # A malformed URL or an unexpected client error fails this document, not the batch
+            logger.error(f"Error downloading {doc_info['link_url']}: {e}")
+            doc_info['error'] = f"Error downloading {doc_info['link_url']}: {e}"
+            doc_info["downloaded"] = False
+            doc_info.setdefault("text_extracted", False)
+            self.stats["failed"] += 1
+            return doc_info
+
+    async def _download(self, session, doc_info):
+        self.stats["documents"] += 1
+        doc_url = doc_info["link_url"]
+        filename = os.path.basename(doc_url)
+
+        # Skip User-Manual files
+        if "User-Manual" in doc_url or "User-Manual" in filename:
+            logger.info(f"Skipping User-Manual file: {doc_url}")
+            self.stats["skipped"] += 1
+            return doc_info
+
+        # Same content-addressed store download_and_process_doc uses
+        found = self.store.lookup(doc_url)
+        if found:
+            return self.use_stored(doc_info, found[0])
+
+        doc_info["downloaded"] = False
+        doc_info["text_extracted"] = False
+        async with self.staging_lock(doc_url):
+            # It may have been stored while we waited for the staging file
+            found = self.store.lookup(doc_url)
+            if found:
+                return self.use_stored(doc_info, found[0])
+            return await self.download_to_store(session, doc_info)
+
+    def use_stored(self, doc_info, filepath):
+        logger.info(f"File exists, skipping download: {os.path.basename(doc_info['link_url'])}")
+        doc_info["filepath"] = filepath
+        doc_info["text_filepath"] = text_path(filepath)
+        doc_info["downloaded"] = True
+        doc_info["text_extracted"] = has_current_extraction(filepath, self.output_dir)
+        self.stats["cached"] += 1
+        return doc_info
+
+    async def download_to_store(self, session, doc_info):
+        """Download through the staging file into the store. Caller holds the staging lock."""
+        doc_url = doc_info["link_url"]
+        staging = self.store.staging_path(doc_url)
+        for attempt in range(self.max_retries):
+            try:
+                logger.info(f"Downloading: {doc_url}")
+                hasher = hashlib.sha256()
+                written, headers = await self.fetch_to_file(session, doc_url, staging, hasher)
+                self.stats["bytes"] += written
+                filepath = self.store.commit(doc_url, staging, hasher.hexdigest(), headers)
+                doc_info["filepath"] = filepath
+                doc_info["text_filepath"] = text_path(filepath)
+                doc_info["text_extracted"] = has_current_extraction(filepath, self.output_dir)
+                doc_info["downloaded"] = True
+                self.stats["downloaded"] += 1
+                return doc_info
+            except RetryableDownloadError as e:
+                if attempt < self.max_retries - 1:
+                    # Back off on the loop; the other downloads keep running
+                    wait_time = e.retry_after if e.retry_after is not None else (2 ** attempt) * 5
+                    logger.warning(f"Error downloading {doc_url}: {e}. Retrying in {wait_time} seconds...")
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(wait_time)
+                    continue
+                logger.error(f"Failed to download {doc_url} after {self.max_retries} attempts: {e}")
+                doc_info['error'] = f"Error downloading {doc_url}: {e}"
+            except aiohttp.ClientResponseError as e:
+                # 4xx and other non-transient statuses are not worth retrying
+                logger.error(f"Error downloading {doc_url}: {e.status} {e.message}")
+                doc_info['error'] = f"Error downloading {doc_url}: {e.status} {e.message}"
+            except OSError as e:
+                logger.error(f"Error saving or processing {doc_url}: {e}")
+                doc_info['error'] = f"Error saving or processing {doc_url}: {e}"
+            break
+
+        # Any .part file stays behind for the next run to resume
+        doc_info["downloaded"] = False
+        self.stats["failed"] += 1
+        return doc_info
+
+    @contextlib.asynccontextmanager
+    async def staging_lock(self, url):
+        """The store's staging lock for url (see DocumentStore.staging_lock), waited for on the loop."""
+        if fcntl is None:
+            yield
+            return
+        path = self.store.staging_lock_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.05)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def download_all(self, documents):
+        timeout = aiohttp.ClientTimeout(total=self.deadline, sock_connect=15)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host)
+        headers = {k: v for k, v in DEFAULT_HEADERS.items() if k != 'Connection'}
+        # Byte ranges only line up with what we write if the body isn't compressed
+        headers["Accept-Encoding"] = "identity"
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector, headers=headers) as session:
+            return await asyncio.gather(*(self.download(session, doc) for doc in documents))
+
+    def run(self, documents):
+        """Download documents (in place) and return them in input order, plus stats."""
+        start_time = time.time()
+        results = asyncio.run(self.download_all(documents))
+        elapsed = time.time() - start_time
+        stats = dict(self.stats)
+        stats["seconds"] = round(elapsed, 2)
+        stats["mb_per_second"] = round(stats["bytes"] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None
+        stats["docs_per_second"] = round(stats["downloaded"] / elapsed, 2) if elapsed > 0 else None
+        logger.info(f"Async download: {stats['downloaded']} downloaded, {stats['cached']} cached, "
+                    f"{stats['failed']} failed, {stats['bytes']} bytes in {stats['seconds']}s "
+                    f"({stats['mb_per_second']} MB/s)")
+        return list(results), stats
+
+
+def download_documents(documents, output_dir, **options):
+    """Download every document concurrently. Returns (documents, stats)."""
+    return AsyncDocumentDownloader(output_dir, **options).run(documents)
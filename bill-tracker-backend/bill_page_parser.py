@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+Bill Page Parser - Pluggable HTML parser backends for SUTRA bill pages
+The extraction rules are written once against a few primitive queries, and
+each backend answers those queries with its own engine:
+
+  html.parser  BeautifulSoup with Python's built-in parser (original behaviour)
+  lxml         lxml.html with compiled XPath
+  selectolax   selectolax (lexbor) with CSS selectors
+
+Pick a backend with the SUTRA_HTML_PARSER environment variable or by passing
+backend= to parse_bill_page. All backends return the same dict.
+"""
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARSER_BACKEND = os.environ.get("SUTRA_HTML_PARSER", "html.parser")
+
+SUTRA_BASE_URL = "https://sutra.oslpr.org"
+DOCUMENT_EXTENSIONS = ('.pdf', '.doc', '.docx')
+VOTE_LABELS = ["Votos a favor", "Votos en contra", "Votos abstenidos", "Votos ausentes"]
+EVENT_PARAGRAPH_CLASS = "mt-1 flex text-xs leading-5 text-gray-500"
+
+
+def absolute_url(href):
+    """Make a SUTRA link absolute."""
+    if not href.startswith("http"):
+        return SUTRA_BASE_URL + href
+    return href
+
+
+class ParserBackend:
+    """
+    Base class for parser backends.
+
+    Subclasses implement the primitive queries below; parse() holds the
+    extraction rules so every backend produces identical output.
+
+    Class filters follow BeautifulSoup's class_ semantics:
+    - class_contains: substring of the whole class attribute
+    - class_is: one of the classes, or the whole attribute if it has spaces
+    """
+
+    name = None
+
+    def load(self, html):
+        """Parse HTML and return the root node."""
+        raise NotImplementedError
+
+    def find_all(self, node, tag, class_contains=None, class_is=None, attr=None):
+        """Descendants of node with the given tag, class filter and attribute."""
+        raise NotImplementedError
+
+    def find_next(self, node, tag, class_contains=None, class_is=None):
+        """First element after node in document order (descendants included)."""
+        raise NotImplementedError
+
+    def text(self, node):
+        """Equivalent of BeautifulSoup's get_text(strip=True)."""
+        raise NotImplementedError
+
+    def raw_text(self, node):
+        """Equivalent of BeautifulSoup's get_text()."""
+        raise NotImplementedError
+
+    def string(self, node):
+        """Equivalent of BeautifulSoup's .string (None unless a single text child)."""
+        raise NotImplementedError
+
+    def get(self, node, attr):
+        raise NotImplementedError
+
+    def parent(self, node):
+        raise NotImplementedError
+
+    def children(self, node):
+        """Child elements of node (no text or comment nodes)."""
+        raise NotImplementedError
+
+    def tag(self, node):
+        raise NotImplementedError
+
+    def classes(self, node):
+        """The class attribute with whitespace normalised ('' if missing)."""
+        raise NotImplementedError
+
+    # --- Shared helpers built on the primitives ---
+
+    def find(self, node, tag, **filters):
+        matches = self.find_all(node, tag, **filters)
+        return matches[0] if matches else None
+
+    def find_all_with_string(self, node, tag, needles):
+        """Elements whose own string contains any of the needles."""
+        results = []
+        for element in self.find_all(node, tag):
+            s = self.string(element)
+            if s and any(needle in s for needle in needles):
+                results.append(element)
+        return results
+
+    def find_with_string(self, node, tag, needle):
+        matches = self.find_all_with_string(node, tag, [needle])
+        return matches[0] if matches else None
+
+    # --- Extraction rules ---
+
+    def parse(self, html):
+        """
+        Parse a bill page into a dict with the bill header fields, the author
+        lists, commission and document tab content, every document link on the
+        page and the timeline events.
+        """
+        root = self.load(html)
+
+        page = {
+            "measure_number": None,
+            "filing_date": None,
+            "title": None,
+            "authors": [],
+            "author_items": [],
+            "has_commission_tab": False,
+            "commission_items": [],
+            "has_documents_tab": False,
+            "document_links": [],
+            "events": []
+        }
+
+        # Measure number from heading
+        header = self.find(root, 'h1', class_contains="text-2xl")
+        if header is not None:
+            page["measure_number"] = self.text(header)
+
+        # Filing date
+        filing_date_elem = self.find_with_string(root, 'span', "Fecha de Radicación")
+        if filing_date_elem is not None:
+            date_span = self.find_next(filing_date_elem, 'span', class_contains="text-xs")
+            if date_span is not None:
+                page["filing_date"] = self.text(date_span)
+
+        # Title
+        title_elem = self.find_with_string(root, 'span', "Título")
+        if title_elem is not None:
+            title_span = self.find_next(title_elem, 'span', class_is="text-balance")
+            if title_span is not None:
+                page["title"] = self.text(title_span)
+
+        # Authors from the plain "Autores" block
+        authors_div = next((div for div in self.find_all(root, 'div') if self.text(div) == 'Autores'), None)
+        if authors_div is not None:
+            author_block = self.find_next(authors_div, 'div')
+            if author_block is not None:
+                for span in self.find_all(author_block, 'span'):
+                    span_text = self.text(span)
+                    if span_text and not any(kw in self.raw_text(span).lower() for kw in ["autor", "fecha"]):
+                        page["authors"].append(span_text)
+
+        # Tabs
+        buttons = self.find_all(root, 'button')
+        if any(self.text(button) == 'Autores (1)' for button in buttons):
+            for author_item in self.find_all(root, 'li', class_contains="autor_id_li"):
+                author_name = self.find(author_item, 'p', class_contains="font-semibold")
+                if author_name is not None:
+                    page["author_items"].append(self.text(author_name))
+
+        if any('Comisión' in self.raw_text(button) for button in buttons):
+            page["has_commission_tab"] = True
+            for item in self.find_all_with_string(root, 'li', ["Comisión"]):
+                commission_name = self.text(item)
+                if commission_name:
+                    page["commission_items"].append(commission_name)
+
+        page["has_documents_tab"] = any(self.text(button) == 'Documentos (0)' for button in buttons)
+
+        # Every document link on the page, with both description styles used by the scraper
+        for link in self.find_all(root, 'a', attr='href'):
+            href = self.get(link, 'href')
+            if not href or not href.endswith(DOCUMENT_EXTENSIONS):
+                continue
+            link_text = self.text(link)
+            secondary = self.find(link, 'span', class_contains="text-sutra-secondary")
+            pointer = self.find(link, 'span', class_contains="cursor-pointer")
+            page["document_links"].append({
+                "link_url": absolute_url(href),
+                "tab_description": self.text(secondary) if secondary is not None else link_text,
+                "description": self.text(pointer) if pointer is not None else link_text
+            })
+
+        # Timeline events
+        for event_item in self.find_all(root, 'li', class_contains="relative flex justify-between"):
+            event = self.parse_event(event_item)
+            if event is not None:
+                page["events"].append(event)
+
+        return page
+
+    def parse_event(self, event_item):
+        """
+        Parse one timeline <li> into a raw event dict, or None if it has no title.
+
+        The event subtree is walked once and each field is picked up as its
+        element goes by, instead of searching the subtree again per field.
+        """
+        found = {"title": None, "date": None}
+        paragraphs = []  # [element, has a date label or link]
+        links = []       # [element, description span]
+        vote_elems = []
+
+        def walk(node, open_paragraphs, open_links):
+            for child in self.children(node):
+                tag = self.tag(child)
+                classes = self.classes(child)
+                child_paragraphs = open_paragraphs
+                child_links = open_links
+
+                if tag == 'span':
+                    if found["title"] is None and "text-sutra-primary" in classes.split():
+                        found["title"] = child
+                    if "text-sutra-secondary" in classes:
+                        for link in open_links:
+                            if link[1] is None:
+                                link[1] = child
+                    s = self.string(child)
+                    if s:
+                        if "Fecha:" in s:
+                            if found["date"] is None:
+                                found["date"] = child
+                            for paragraph in open_paragraphs:
+                                paragraph[1] = True
+                        if any(label in s for label in VOTE_LABELS):
+                            vote_elems.append(child)
+                elif tag == 'p':
+                    if classes == EVENT_PARAGRAPH_CLASS:
+                        paragraph = [child, False]
+                        paragraphs.append(paragraph)
+                        child_paragraphs = open_paragraphs + [paragraph]
+                elif tag == 'a':
+                    for paragraph in open_paragraphs:
+                        paragraph[1] = True
+                    if self.get(child, 'href') is not None:
+                        link = [child, None]
+                        links.append(link)
+                        child_links = open_links + [link]
+
+                walk(child, child_paragraphs, child_links)
+
+        walk(event_item, [], [])
+
+        if found["title"] is None:
+            return None
+
+        event_title = self.text(found["title"])
+        event = {
+            "descripcion": event_title,
+            "fecha": None,
+            "documents": []
+        }
+
+        # Date - the text after "Fecha:" in the label's parent
+        if found["date"] is not None:
+            date_parent = self.parent(found["date"])
+            event["fecha"] = self.text(date_parent).replace("Fecha:", "").strip()
+
+        # Commission name lives in a plain paragraph without date or links
+        for p, has_date_or_link in paragraphs:
+            if has_date_or_link:
+                continue
+            commission_text = self.text(p)
+            if commission_text and "Comisión" in commission_text:
+                event["comision"] = commission_text
+                break
+
+        # Document links
+        for link, doc_desc_elem in links:
+            doc_url = self.get(link, 'href')
+            # Skip User-Manual files
+            if "User-Manual" in doc_url:
+                continue
+            event["documents"].append({
+                "link_url": absolute_url(doc_url),
+                "description": self.text(doc_desc_elem) if doc_desc_elem is not None else "Document"
+            })
+
+        # Vote counts
+        if "Votación" in event_title or "Aprobado" in event_title:
+            vote_counts = {}
+            for vote_elem in vote_elems:
+                vote_type = self.text(vote_elem).rstrip(":")
+                vote_value_elem = self.parent(vote_elem)
+                if vote_value_elem is not None:
+                    vote_text = self.text(vote_value_elem).replace(vote_type, "").strip()
+                    vote_counts[vote_type] = int(vote_text) if vote_text.isdigit() else vote_text
+            event["votes"] = vote_counts if vote_counts else None
+
+        return event
+
+
+class BeautifulSoupBackend(ParserBackend):
+    """BeautifulSoup with Python's html.parser - slow but always available."""
+
+    name = "html.parser"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, Tag
+        self.BeautifulSoup = BeautifulSoup
+        self.Tag = Tag
+
+    def load(self, html):
+        # The whole document, not just the timeline: parse() also reads the
+        # header, the tabs and every document link on the page (nav and
+        # timeline included), and a SoupStrainer only filters top-level tags
+        return self.BeautifulSoup(html, 'html.parser')
+
+    def _class_filter(self, class_contains, class_is):
+        if class_contains is not None:
+            return lambda c: c and class_contains in c
+        return class_is
+
+    def find_all(self, node, tag, class_contains=None, class_is=None, attr=None):
+        kwargs = {}
+        class_filter = self._class_filter(class_contains, class_is)
+        if class_filter is not None:
+            kwargs['class_'] = class_filter
+        if attr is not None:
+            kwargs[attr] = True
+        return node.find_all(tag, **kwargs)
+
+    def find_next(self, node, tag, class_contains=None, class_is=None):
+        class_filter = self._class_filter(class_contains, class_is)
+        if class_filter is None:
+            return node.find_next(tag)
+        return node.find_next(tag, class_=class_filter)
+
+    def text(self, node):
+        return node.get_text(strip=True)
+
+    def raw_text(self, node):
+        return node.get_text()
+
+    def string(self, node):
+        return node.string
+
+    def get(self, node, attr):
+        return node.get(attr)
+
+    def parent(self, node):
+        return node.parent
+
+    def children(self, node):
+        return [child for child in node.children if isinstance(child, self.Tag)]
+
+    def tag(self, node):
+        return node.name
+
+    def classes(self, node):
+        class_attr = node.get('class') or []
+        if isinstance(class_attr, str):
+            class_attr = class_attr.split()
+        return " ".join(class_attr)
+
+
+class LxmlBackend(ParserBackend):
+    """lxml.html with compiled XPath queries."""
+
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self.lxml_html = lxml.html
+        self.etree = etree
+        self.xpaths = {}
+
+    def load(self, html):
+        return self.lxml_html.document_fromstring(html)
+
+    def _condition(self, class_contains, class_is, attr):
+        conditions = []
+        if class_contains is not None:
+            conditions.append("contains(normalize-space(@class), $c)")
+        elif class_is is not None:
+            if ' ' in class_is:
+                conditions.append("normalize-space(@class) = $c")
+            else:
+                conditions.append("contains(concat(' ', normalize-space(@class), ' '), concat(' ', $c, ' '))")
+        if attr is not None:
+            conditions.append(f"@{attr}")
+        return f"[{' and '.join(conditions)}]" if conditions else ""
+
+    def _xpath(self, expression):
+        # Compile each distinct query once and reuse it for every page
+        compiled = self.xpaths.get(expression)
+        if compiled is None:
+            compiled = self.xpaths[expression] = self.etree.XPath(expression)
+        return compiled
+
+    def find_all(self, node, tag, class_contains=None, class_is=None, attr=None):
+        condition = self._condition(class_contains, class_is, attr)
+        xpath = self._xpath(f".//{tag}{condition}")
+        return xpath(node, c=class_contains if class_contains is not None else (class_is or ""))
+
+    def find_next(self, node, tag, class_contains=None, class_is=None):
+        condition = self._condition(class_contains, class_is, None)
+        xpath = self._xpath(f"(descendant::{tag}{condition} | following::{tag}{condition})[1]")
+        matches = xpath(node, c=class_contains if class_contains is not None else (class_is or ""))
+        return matches[0] if matches else None
+
+    def text(self, node):
+        return "".join(part.strip() for part in node.xpath('.//text()'))
+
+    def raw_text(self, node):
+        return "".join(node.xpath('.//text()'))
+
+    def string(self, node):
+        children = list(node)
+        if not children:
+            return node.text
+        if len(children) == 1 and not node.text and not children[0].tail:
+            if not isinstance(children[0].tag, str):
+                return None
+            return self.string(children[0])
+        return None
+
+    def get(self, node, attr):
+        return node.get(attr)
+
+    def parent(self, node):
+        return node.getparent()
+
+    def children(self, node):
+        return [child for child in node if isinstance(child.tag, str)]
+
+    def tag(self, node):
+        return node.tag
+
+    def classes(self, node):
+        return " ".join((node.get('class') or '').split())
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax's lexbor engine with CSS selectors."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self.LexborHTMLParser = LexborHTMLParser
+
+    def load(self, html):
+        return self.LexborHTMLParser(html).root
+
+    def _selector(self, tag, class_contains, class_is, attr):
+        selector = tag
+        if class_contains is not None:
+            selector += f'[class*="{class_contains}"]'
+        elif class_is is not None:
+            selector += f'[class="{class_is}"]' if ' ' in class_is else f'[class~="{class_is}"]'
+        if attr is not None:
+            selector += f'[{attr}]'
+        return selector
+
+    def find_all(self, node, tag, class_contains=None, class_is=None, attr=None):
+        # CSS attribute selectors don't normalise whitespace inside the class
+        # attribute the way BeautifulSoup does, so multi-class filters are
+        # applied in Python on the normalised value
+        multi_class = class_contains if class_contains is not None else class_is
+        if multi_class is None or ' ' not in multi_class:
+            return node.css(self._selector(tag, class_contains, class_is, attr))
+
+        matches = []
+        for element in node.css(self._selector(tag, None, None, attr) + '[class]'):
+            classes = " ".join(element.attributes.get('class', '').split())
+            if (class_contains is not None and class_contains in classes) or classes == class_is:
+                matches.append(element)
+        return matches
+
+    def find_next(self, node, tag, class_contains=None, class_is=None):
+        # Walk the whole document in order and return the first match after node
+        candidates = {n.mem_id for n in node.parser.root.css(self._selector(tag, class_contains, class_is, None))}
+        seen = False
+        for element in node.parser.root.traverse():
+            if seen and element.mem_id in candidates:
+                return element
+            if element.mem_id == node.mem_id:
+                seen = True
+        return None
+
+    def text(self, node):
+        return node.text(deep=True, separator='', strip=True)
+
+    def raw_text(self, node):
+        return node.text(deep=True)
+
+    def string(self, node):
+        children = list(node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if child.tag == '-text':
+            return child.text(deep=False)
+        return self.string(child)
+
+    def get(self, node, attr):
+        return node.attributes.get(attr)
+
+    def parent(self, node):
+        return node.parent
+
+    def children(self, node):
+        return [child for child in node.iter() if not child.tag.startswith('-')]
+
+    def tag(self, node):
+        return node.tag
+
+    def classes(self, node):
+        return " ".join((node.attributes.get('class') or '').split())
+
+
+PARSER_BACKENDS = {
+    "html.parser": BeautifulSoupBackend,
+    "lxml": LxmlBackend,
+    "selectolax": SelectolaxBackend,
+}
+
+_backend_instances = {}
+
+
+def get_parser_backend(name=None):
+    """
+    Return a (cached) parser backend by name, defaulting to SUTRA_HTML_PARSER.
+    Falls back to html.parser if the requested library isn't installed.
+    """
+    name = name or DEFAULT_PARSER_BACKEND
+    if name not in PARSER_BACKENDS:
+        logger.warning(f"Unknown HTML parser backend '{name}', using html.parser")
+        name = "html.parser"
+
+    backend = _backend_instances.get(name)
+    if backend is None:
+        try:
+            backend = PARSER_BACKENDS[name]()
+        except ImportError as e:
+            if name == "html.parser":
+                raise
+            logger.warning(f"HTML parser backend '{name}' unavailable ({e}), using html.parser")
+            return get_parser_backend("html.parser")
+        _backend_instances[name] = backend
+    return backend
+
+
+def parse_bill_page(html, backend=None):
+    """Parse a SUTRA bill page with the selected backend."""
+    return get_parser_backend(backend).parse(html)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    # Compare backends on a saved bill page: python3 bill_page_parser.py page.html
+    parser = argparse.ArgumentParser(description="Parse a saved SUTRA bill page with every parser backend")
+    parser.add_argument("html_file", help="Saved bill page HTML")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="RUNS",
+                        help="Time RUNS parses per backend instead of printing the result")
+    parser.add_argument("--budget", type=float, default=2.0,
+                        help="Time budget in seconds a single parse must stay within")
+    args = parser.parse_args()
+
+    with open(args.html_file, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    results = {}
+    timings = {}
+    for backend_name in PARSER_BACKENDS:
+        try:
+            backend = get_parser_backend(backend_name)
+            if backend.name != backend_name:
+                results[backend_name] = {"error": "backend unavailable"}
+                continue
+            runs = max(args.benchmark, 1)
+            start_time = time.time()
+            for _ in range(runs):
+                results[backend_name] = backend.parse(html)
+            timings[backend_name] = (time.time() - start_time) / runs
+        except Exception as e:
+            results[backend_name] = {"error": str(e)}
+
+    reference = results["html.parser"]
+    matches = {name: result == reference for name, result in results.items()}
+
+    if args.benchmark:
+        print(json.dumps({
+            "runs": args.benchmark,
+            "budget_seconds": args.budget,
+            "backends": {
+                name: {
+                    "seconds_per_parse": timings.get(name),
+                    "events": len(results[name].get("events", [])),
+                    "documents": sum(len(e["documents"]) for e in results[name].get("events", [])),
+                    "within_budget": name in timings and timings[name] <= args.budget,
+                    "matches_html_parser": matches[name]
+                }
+                for name in results
+            }
+        }, indent=2))
+    else:
+        print(json.dumps({
+            "backends": list(results),
+            "matches_html_parser": matches,
+            "result": reference
+        }, ensure_ascii=False))
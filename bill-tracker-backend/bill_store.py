@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Bill Store - SQLite database of every bill the scrapers have seen
+Replaces the single scraped_data.json / result.json files that each run used
+to overwrite: every scrape upserts its bill (keyed by its SUTRA URL) into
+normalized tables for bills, eventos, votes, documents and commissions. The
+database runs in WAL mode, so the server's reads never block a scraper's write
+and concurrent worker processes can all write to it.
+
+Usage: bill_store.py URL | --measure MEASURE | --desde YYYY-MM-DD [--hasta YYYY-MM-DD]
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from single_flight import normalize_url
+
+logger = logging.getLogger(__name__)
+
+BILL_DB_PATH = os.environ.get("BILL_DB_PATH", "bills.db")
+# How long a writer waits for another process's transaction before giving up
+BILL_DB_BUSY_TIMEOUT = float(os.environ.get("BILL_DB_BUSY_TIMEOUT", 30))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    sutra_id TEXT,
+    measure_number TEXT,
+    title TEXT,
+    status TEXT,
+    filing_date TEXT,
+    filing_date_iso TEXT,
+    authors TEXT,
+    origin_chamber TEXT,
+    current_chamber TEXT,
+    topic TEXT,
+    other_data TEXT,
+    source TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    detail_scraped_at REAL
+);
+CREATE INDEX IF NOT EXISTS bills_measure_number ON bills (measure_number);
+CREATE INDEX IF NOT EXISTS bills_filing_date ON bills (filing_date_iso);
+
+CREATE TABLE IF NOT EXISTS commissions (
+    id INTEGER PRIMARY KEY,
+    bill_id INTEGER NOT NULL REFERENCES bills (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS commissions_bill ON commissions (bill_id);
+CREATE INDEX IF NOT EXISTS commissions_name ON commissions (name);
+
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY,
+    bill_id INTEGER NOT NULL REFERENCES bills (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tipo TEXT,
+    descripcion TEXT,
+    fecha TEXT,
+    fecha_iso TEXT,
+    comision TEXT,
+    camara TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS eventos_bill ON eventos (bill_id, position);
+CREATE INDEX IF NOT EXISTS eventos_fecha ON eventos (fecha_iso);
+
+CREATE TABLE IF NOT EXISTS votes (
+    evento_id INTEGER NOT NULL REFERENCES eventos (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    vote_type TEXT NOT NULL,
+    count INTEGER,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS votes_evento ON votes (evento_id);
+
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    bill_id INTEGER NOT NULL REFERENCES bills (id) ON DELETE CASCADE,
+    evento_id INTEGER REFERENCES eventos (id) ON DELETE CASCADE,
+    commission_id INTEGER REFERENCES commissions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    link_url TEXT NOT NULL,
+    description TEXT,
+    filepath TEXT,
+    text_filepath TEXT,
+    downloaded INTEGER NOT NULL DEFAULT 0,
+    text_extracted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS documents_bill ON documents (bill_id);
+CREATE INDEX IF NOT EXISTS documents_evento ON documents (evento_id);
+CREATE INDEX IF NOT EXISTS documents_link_url ON documents (link_url);
+"""
+
+# Bill fields stored as-is (authors and other_data are stored as JSON)
+BILL_COLUMNS = ("measure_number", "title", "status", "filing_date", "origin_chamber", "current_chamber", "topic")
+# Evento fields with a column of their own; anything else goes in "extra"
+EVENTO_COLUMNS = ("tipo", "descripcion", "fecha", "comision", "camara")
+EVENTO_NESTED = ("documents", "votes")
+
+
+def to_iso_date(date_str):
+    """SUTRA's MM/DD/YYYY as YYYY-MM-DD (sortable), or None."""
+    if not date_str:
+        return None
+    try:
+        return datetime.strptime(date_str.strip(), "%m/%d/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+class BillStore:
+    """One SQLite database shared by every thread (own connection each) and process."""
+
+    def __init__(self, path=BILL_DB_PATH):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {"upserts": 0, "reads": 0}
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # Transactions are opened explicitly (BEGIN IMMEDIATE) below
+            conn = sqlite3.connect(self.path, timeout=BILL_DB_BUSY_TIMEOUT, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self.local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Write transaction; takes the write lock up front so it can't deadlock on upgrade."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    # --- Writing ---
+
+    def upsert_bill(self, url, data, source):
+        """
+        Insert or update one bill from a scraper result.
+
+        source is "full" (Selenium scrape), "fast" (requests scrape) or
+        "search" (a date-search listing). Fields the result doesn't have keep
+        their stored values, so a search listing never wipes a scraped bill's
+        timeline. A result with eventos replaces the stored timeline, keeping
+        the download paths of documents it lists without them. Commissions
+        are only replaced by a full scrape (or a result that lists some).
+        """
+        with self.transaction() as conn:
+            bill_id = self._upsert_bill(conn, url, data, source)
+        self._count("upserts")
+        return bill_id
+
+    def upsert_bills(self, bills, source):
+        """upsert_bill for many listings (each with its "url") in one transaction."""
+        with self.transaction() as conn:
+            for bill in bills:
+                if bill.get("url"):
+                    self._upsert_bill(conn, bill["url"], bill, source)
+        self._count("upserts", len(bills))
+
+    def _upsert_bill(self, conn, url, data, source):
+        now = time.time()
+        authors = data.get("authors")
+        # Search listings carry authors as one string
+        if isinstance(authors, str):
+            authors = [authors]
+        row = {column: data.get(column) for column in BILL_COLUMNS}
+        row.update({
+            "url": normalize_url(url),
+            "sutra_id": data.get("id"),
+            "filing_date_iso": data.get("filing_date_iso") or to_iso_date(data.get("filing_date")),
+            "authors": json.dumps(authors, ensure_ascii=False) if authors else None,
+            "other_data": json.dumps(data["other_data"], ensure_ascii=False) if data.get("other_data") else None,
+            "source": source,
+            "scraped_at": now,
+            "detail_scraped_at": now if "eventos" in data else None,
+        })
+        columns = list(row)
+        # Keep what we had for anything this result doesn't know. A search
+        # listing only fills gaps (its authors and measure formats differ from
+        # the bill page's), apart from the status, which it has fresh
+        if source == "search":
+            merged = {column: f"COALESCE(bills.{column}, excluded.{column})" for column in columns}
+            merged["status"] = "COALESCE(excluded.status, bills.status)"
+        else:
+            merged = {column: f"COALESCE(excluded.{column}, bills.{column})" for column in columns}
+        updates = ", ".join(f"{column} = {merged[column]}"
+                            for column in columns if column not in ("url", "source", "scraped_at"))
+        bill_id = conn.execute(
+            f"INSERT INTO bills ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT (url) DO UPDATE SET {updates}, scraped_at = excluded.scraped_at, "
+            # A listing seen after a full scrape doesn't make the bill a listing
+            f"source = CASE WHEN excluded.detail_scraped_at IS NULL AND bills.detail_scraped_at IS NOT NULL "
+            f"THEN bills.source ELSE excluded.source END "
+            f"RETURNING id",
+            [row[column] for column in columns]).fetchone()[0]
+
+        if "eventos" in data:
+            self._replace_children(conn, bill_id, data, source)
+        return bill_id
+
+    def _replace_children(self, conn, bill_id, data, source):
+        # Downloads are tracked per document URL; a rescrape without downloads keeps them
+        known = {row["link_url"]: dict(row) for row in conn.execute(
+            "SELECT link_url, filepath, text_filepath, downloaded, text_extracted FROM documents "
+            "WHERE bill_id = ? AND downloaded = 1", (bill_id,))}
+        # Only the full scrape reads the commission tab; an empty list from the
+        # fast scrape means "not looked at", so the stored commissions stay
+        replace_commissions = source == "full" or bool(data.get("comisiones"))
+        conn.execute("DELETE FROM eventos WHERE bill_id = ?", (bill_id,))
+        if replace_commissions:
+            conn.execute("DELETE FROM commissions WHERE bill_id = ?", (bill_id,))
+            conn.execute("DELETE FROM documents WHERE bill_id = ?", (bill_id,))
+        else:
+            conn.execute("DELETE FROM documents WHERE bill_id = ? AND commission_id IS NULL", (bill_id,))
+
+        for position, comision in enumerate((data.get("comisiones") or []) if replace_commissions else []):
+            commission_id = conn.execute(
+                "INSERT INTO commissions (bill_id, position, name) VALUES (?, ?, ?)",
+                (bill_id, position, comision.get("comision"))).lastrowid
+            self._insert_documents(conn, bill_id, comision.get("documents"), known, commission_id=commission_id)
+
+        for position, evento in enumerate(data.get("eventos") or []):
+            extra = {key: value for key, value in evento.items()
+                     if key not in EVENTO_COLUMNS and key not in EVENTO_NESTED}
+            evento_id = conn.execute(
+                "INSERT INTO eventos (bill_id, position, tipo, descripcion, fecha, fecha_iso, comision, camara, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (bill_id, position, evento.get("tipo"), evento.get("descripcion"), evento.get("fecha"),
+                 to_iso_date(evento.get("fecha")), evento.get("comision"), evento.get("camara"),
+                 json.dumps(extra, ensure_ascii=False) if extra else None)).lastrowid
+            for vote_position, (vote_type, value) in enumerate((evento.get("votes") or {}).items()):
+                conn.execute(
+                    "INSERT INTO votes (evento_id, position, vote_type, count, value) VALUES (?, ?, ?, ?, ?)",
+                    (evento_id, vote_position, vote_type,
+                     value if isinstance(value, int) else None,
+                     None if isinstance(value, int) else str(value)))
+            self._insert_documents(conn, bill_id, evento.get("documents"), known, evento_id=evento_id)
+
+    def _insert_documents(self, conn, bill_id, documents, known, evento_id=None, commission_id=None):
+        for position, doc in enumerate(documents or []):
+            state = doc
+            if not doc.get("downloaded") and doc["link_url"] in known:
+                state = known[doc["link_url"]]
+            conn.execute(
+                "INSERT INTO documents (bill_id, evento_id, commission_id, position, link_url, description, "
+                "filepath, text_filepath, downloaded, text_extracted) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (bill_id, evento_id, commission_id, position, doc["link_url"], doc.get("description"),
+                 state.get("filepath"), state.get("text_filepath"),
+                 int(bool(state.get("downloaded"))), int(bool(state.get("text_extracted")))))
+
+    def update_document(self, link_url, **fields):
+        """Record a download or text extraction on every stored reference to link_url."""
+        allowed = {key: value for key, value in fields.items()
+                   if key in ("filepath", "text_filepath", "downloaded", "text_extracted")}
+        if not allowed:
+            return
+        assignments = ", ".join(f"{key} = ?" for key in allowed)
+        values = [int(value) if isinstance(value, bool) else value for value in allowed.values()]
+        with self.transaction() as conn:
+            conn.execute(f"UPDATE documents SET {assignments} WHERE link_url = ?", values + [link_url])
+
+    # --- Reading ---
+
+    def get_bill(self, url=None, measure_number=None):
+        """A stored bill in the shape the scrapers return it, or None."""
+        conn = self.connection()
+        if url:
+            row = conn.execute("SELECT * FROM bills WHERE url = ?", (normalize_url(url),)).fetchone()
+        else:
+            row = conn.execute("SELECT * FROM bills WHERE measure_number = ? ORDER BY scraped_at DESC LIMIT 1",
+                               (measure_number,)).fetchone()
+        self._count("reads")
+        if row is None:
+            return None
+        return self._assemble(conn, row)
+
+    def list_bills(self, desde=None, hasta=None, limit=500):
+        """Bill summaries (no timeline) filed between desde and hasta (YYYY-MM-DD), newest first."""
+        conn = self.connection()
+        clauses, params = [], []
+        if desde:
+            clauses.append("filing_date_iso >= ?")
+            params.append(desde)
+        if hasta:
+            clauses.append("filing_date_iso <= ?")
+            params.append(hasta)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = conn.execute(f"SELECT * FROM bills {where} ORDER BY filing_date_iso DESC, id DESC LIMIT ?",
+                            params + [limit]).fetchall()
+        self._count("reads")
+        return [self._bill_fields(row) for row in rows]
+
+    def _bill_fields(self, row):
+        bill = {column: row[column] for column in BILL_COLUMNS}
+        bill["authors"] = json.loads(row["authors"]) if row["authors"] else []
+        bill["other_data"] = json.loads(row["other_data"]) if row["other_data"] else {}
+        bill.update({
+            "url": row["url"],
+            "id": row["sutra_id"],
+            "filing_date_iso": row["filing_date_iso"],
+            "source": row["source"],
+            "scraped_at": row["scraped_at"],
+            "detail_scraped_at": row["detail_scraped_at"],
+        })
+        return bill
+
+    def _assemble(self, conn, row):
+        bill = self._bill_fields(row)
+        bill_id = row["id"]
+
+        documents = {"evento": {}, "commission": {}}
+        for doc in conn.execute("SELECT * FROM documents WHERE bill_id = ? ORDER BY position", (bill_id,)):
+            entry = {
+                "link_url": doc["link_url"],
+                "description": doc["description"],
+                "downloaded": bool(doc["downloaded"]),
+                "text_extracted": bool(doc["text_extracted"]),
+            }
+            if doc["filepath"]:
+                entry["filepath"] = doc["filepath"]
+                entry["text_filepath"] = doc["text_filepath"]
+            if doc["evento_id"] is not None:
+                documents["evento"].setdefault(doc["evento_id"], []).append(entry)
+            else:
+                documents["commission"].setdefault(doc["commission_id"], []).append(entry)
+
+        votes = {}
+        for vote in conn.execute(
+                "SELECT votes.* FROM votes JOIN eventos ON eventos.id = votes.evento_id "
+                "WHERE eventos.bill_id = ? ORDER BY votes.position", (bill_id,)):
+            votes.setdefault(vote["evento_id"], {})[vote["vote_type"]] = (
+                vote["count"] if vote["count"] is not None else vote["value"])
+
+        bill["comisiones"] = [
+            {"comision": commission["name"], "documents": documents["commission"].get(commission["id"], [])}
+            for commission in conn.execute(
+                "SELECT * FROM commissions WHERE bill_id = ? ORDER BY position", (bill_id,))]
+
+        bill["eventos"] = []
+        for evento in conn.execute("SELECT * FROM eventos WHERE bill_id = ? ORDER BY position", (bill_id,)):
+            entry = {column: evento[column] for column in EVENTO_COLUMNS if evento[column] is not None}
+            if evento["extra"]:
+                entry.update(json.loads(evento["extra"]))
+            entry["documents"] = documents["evento"].get(evento["id"], [])
+            if evento["id"] in votes:
+                entry["votes"] = votes[evento["id"]]
+            bill["eventos"].append(entry)
+        return bill
+
+    def health(self):
+        conn = self.connection()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("bills", "eventos", "documents", "votes", "commissions")}
+        with self.lock:
+            return {"path": self.path, **counts, **self.stats}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bill_store():
+    """Process-wide bill store, created (with its schema) on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BillStore()
+        return _store
+
+
+def bill_store_stats():
+    return _store.health() if _store is not None else None
+
+
+def save_bill(url, data, source):
+    """Upsert a scraper result, logging instead of failing the scrape if the database is unavailable."""
+    try:
+        get_bill_store().upsert_bill(url, data, source)
+    except sqlite3.Error as e:
+        logger.error(f"Could not save {url} to the bill store: {e}")
+
+
+def save_listings(bills, source="search"):
+    try:
+        get_bill_store().upsert_bills(bills, source)
+    except sqlite3.Error as e:
+        logger.error(f"Could not save {len(bills)} listings to the bill store: {e}")
+
+
+def record_document(doc_info):
+    """Store where a document was downloaded and whether its text was extracted."""
+    if not doc_info.get("downloaded"):
+        return
+    try:
+        get_bill_store().update_document(
+            doc_info["link_url"], filepath=doc_info.get("filepath"), text_filepath=doc_info.get("text_filepath"),
+            downloaded=True, text_extracted=bool(doc_info.get("text_extracted")))
+    except sqlite3.Error as e:
+        logger.error(f"Could not record document {doc_info['link_url']} in the bill store: {e}")
+
+
+def get_stored_bill(url=None, measure_number=None):
+    """Worker entry point: a stored bill without re-scraping it."""
+    if not url and not measure_number:
+        return {"success": False, "error": "url or measure_number is required"}
+    bill = get_bill_store().get_bill(url=url, measure_number=measure_number)
+    if bill is None:
+        return {"success": False, "error": "Bill not in store", "not_found": True}
+    return {"success": True, **bill}
+
+
+def list_stored_bills(desde=None, hasta=None, limit=500):
+    """Worker entry point: stored bills filed in a date range."""
+    bills = get_bill_store().list_bills(desde, hasta, limit)
+    return {"success": True, "bills": bills, "count": len(bills), "desde": desde, "hasta": hasta}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print(json.dumps({"success": False, "error": "A bill URL, --measure MEASURE or --desde DATE is required"}))
+        sys.exit(1)
+
+    if args[0] == "--measure" and len(args) > 1:
+        result = get_stored_bill(measure_number=args[1])
+    elif args[0] == "--desde" and len(args) > 1:
+        hasta_param = args[3] if len(args) > 3 and args[2] == "--hasta" else None
+        result = list_stored_bills(args[1], hasta_param)
+    else:
+        result = get_stored_bill(url=args[0])
+
+    print(json.dumps(result, ensure_ascii=False))
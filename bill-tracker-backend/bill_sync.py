@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Bill Sync - Incremental poll for newly filed bills
+Keeps a persistent watermark (the latest filing date seen plus a fingerprint
+of every bill filed since then) and only searches SUTRA from that date to
+today, so a steady-state poll is one small search request. Only bills that
+are new, or whose listing changed since the last sync, are returned.
+
+Usage: bill_sync.py [--since YYYY-MM-DD] [--dry-run]
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+from date_search_scraper import scrape_bills_by_date_range
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_FILE = os.environ.get("SYNC_STATE_FILE", "bill_sync_state.json")
+# Days searched on the very first sync, when there is no watermark yet
+SYNC_INITIAL_DAYS = int(os.environ.get("SYNC_INITIAL_DAYS", 7))
+# Days before the watermark searched again, for bills SUTRA indexes late
+SYNC_LOOKBACK_DAYS = int(os.environ.get("SYNC_LOOKBACK_DAYS", 1))
+
+STATE_VERSION = 1
+
+
+def bill_key(bill):
+    """Stable identity for a bill: the SUTRA medida id, or the measure number."""
+    return bill.get("id") or bill.get("measure_number")
+
+
+def bill_fingerprint(bill):
+    """Hash of the listing fields, so a changed status or title is noticed."""
+    payload = json.dumps(bill, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_state(path=SYNC_STATE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable sync state {path}: {e}")
+        return None
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(state, path=SYNC_STATE_FILE):
+    """Write the watermark atomically so a crash never leaves it half written."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"), ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def state_lock(path=SYNC_STATE_FILE):
+    """One sync at a time, so two pollers never both report the same bills as new."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def sync_new_bills(since=None, dry_run=False, state_file=SYNC_STATE_FILE):
+    """
+    Fetches bills filed since the watermark and advances it.
+
+    Args:
+        since: YYYY-MM-DD to search from instead of the watermark (resets it)
+        dry_run: Report what's new without saving the watermark
+        state_file: Where the watermark is kept
+
+    Returns:
+        Dictionary with the "new" and "changed" bills and the updated watermark
+    """
+    today = datetime.now()
+
+    with state_lock(state_file):
+        state = None if since else load_state(state_file)
+
+        if since:
+            try:
+                start_date = datetime.strptime(since, '%Y-%m-%d')
+            except ValueError:
+                return {"success": False, "error": f"Invalid since date: {since}. Expected format: YYYY-MM-DD",
+                        "new": [], "changed": []}
+            seen = {}
+        elif state:
+            watermark = datetime.strptime(state["last_filing_date"], '%Y-%m-%d')
+            start_date = watermark - timedelta(days=SYNC_LOOKBACK_DAYS)
+            seen = state["seen"]
+        else:
+            start_date = today - timedelta(days=SYNC_INITIAL_DAYS)
+            seen = {}
+
+        # A watermark in the future (clock skew) would make an empty range
+        start_date = min(start_date, today)
+        desde, hasta = start_date.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
+        logger.info(f"Syncing bills filed from {desde} to {hasta} ({len(seen)} already seen)")
+
+        # Recent days must come from SUTRA, not the date-search cache
+        result = scrape_bills_by_date_range(desde, hasta, use_cache=False)
+        if not result["success"]:
+            return {"success": False, "error": result.get("error"), "new": [], "changed": []}
+
+        new_bills, changed_bills = [], []
+        fingerprints = {}
+        last_filing_date = state["last_filing_date"] if state else desde
+        for bill in result["bills"]:
+            key = bill_key(bill)
+            if not key or key in fingerprints:
+                continue
+            fingerprint = bill_fingerprint(bill)
+            previous = seen.get(key)
+            if previous is None:
+                new_bills.append(bill)
+            elif previous["fingerprint"] != fingerprint:
+                changed_bills.append(bill)
+
+            filing_date = bill.get("filing_date_iso")
+            fingerprints[key] = {"fingerprint": fingerprint, "filing_date": filing_date}
+            if filing_date and filing_date > last_filing_date:
+                last_filing_date = filing_date
+
+        # Keep only the bills the next poll's search window will cover again
+        next_start = (datetime.strptime(last_filing_date, '%Y-%m-%d')
+                      - timedelta(days=SYNC_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        current = set(fingerprints)
+        fingerprints = {key: entry for key, entry in {**seen, **fingerprints}.items()
+                        if key in current or (entry.get("filing_date") or "") >= next_start}
+
+        new_state = {
+            "version": STATE_VERSION,
+            "last_filing_date": last_filing_date,
+            "seen": fingerprints,
+            "synced_at": time.time(),
+        }
+        if not dry_run:
+            save_state(new_state, state_file)
+
+    logger.info(f"Sync found {len(new_bills)} new and {len(changed_bills)} changed bills; "
+                f"watermark now {last_filing_date}")
+    return {
+        "success": True,
+        "new": new_bills,
+        "changed": changed_bills,
+        "new_count": len(new_bills),
+        "changed_count": len(changed_bills),
+        "desde": desde,
+        "hasta": hasta,
+        "watermark": {"last_filing_date": last_filing_date, "seen": len(fingerprints)},
+        "search_urls": result["search_urls"],
+        "pages_processed": result["pages_processed"],
+        "dry_run": dry_run
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    since_param = None
+    if "--since" in args:
+        index = args.index("--since")
+        if index + 1 >= len(args):
+            print(json.dumps({"success": False, "error": "--since requires a date (YYYY-MM-DD)"}))
+            sys.exit(1)
+        since_param = args[index + 1]
+
+    result = sync_new_bills(since=since_param, dry_run="--dry-run" in args)
+
+    # Output JSON result for the Node.js server to parse
+    print(json.dumps(result))
+    sys.exit(0 if result["success"] else 1)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Chrome Pool - Pre-launched headless Chrome drivers for the Selenium scraper
+Browser cold start dominates a full scrape, so long-lived processes (the
+scraper worker) keep a few drivers warm and lend them out per page.
+"""
+
+import contextlib
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHROME_POOL_SIZE = int(os.environ.get("CHROME_POOL_SIZE", 2))
+# Recycle a driver after this many pages...
+CHROME_MAX_PAGES = int(os.environ.get("CHROME_MAX_PAGES", 50))
+# ...or once the page's JS heap grows past this many MB
+CHROME_MAX_MEMORY_MB = int(os.environ.get("CHROME_MAX_MEMORY_MB", 512))
+
+# Block fonts, stylesheets and third-party scripts through CDP; the scraper only
+# needs the DOM that SUTRA's own scripts render
+CHROME_BLOCK_RESOURCES = os.environ.get("CHROME_BLOCK_RESOURCES", "1") != "0"
+BLOCKED_URL_PATTERNS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*cloudflareinsights.com*",
+]
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def get_chromedriver_path():
+    """
+    Resolve the chromedriver binary once per process.
+    CHROMEDRIVER_PATH wins; otherwise webdriver_manager installs/looks it up.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = os.environ.get("CHROMEDRIVER_PATH")
+            if not _driver_path:
+                from webdriver_manager.chrome import ChromeDriverManager
+                logger.info("Installing ChromeDriver...")
+                _driver_path = ChromeDriverManager().install()
+            logger.info(f"Using ChromeDriver at {_driver_path}")
+        return _driver_path
+
+
+def build_chrome_options():
+    """Headless Chrome options used by the scraper."""
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless=new")  # Updated headless mode
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    # Add user agent to appear more like a normal browser
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    # Configure Chrome to block images and other resources
+    options.add_argument('--blink-settings=imagesEnabled=false')
+
+    # Add proxy if needed (uncomment if you have a proxy service)
+    # options.add_argument('--proxy-server=http://your-proxy-server:port')
+    return options
+
+
+def launch_driver():
+    """Start a new headless Chrome driver."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    service = ChromeService(executable_path=get_chromedriver_path())
+    logger.info("Initializing Chrome WebDriver...")
+    driver = webdriver.Chrome(service=service, options=build_chrome_options())
+    driver.set_page_load_timeout(180)  # 3 minutes timeout
+    if CHROME_BLOCK_RESOURCES:
+        block_heavy_resources(driver)
+    return driver
+
+
+def block_heavy_resources(driver):
+    """Have Chrome drop requests for fonts, stylesheets and third-party scripts."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        logger.warning(f"Could not enable CDP resource blocking: {e}")
+
+
+class PooledDriver:
+    """A driver plus the bookkeeping the pool needs to decide when to recycle it."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled Chrome driver failed health check: {e}")
+            return False
+
+    def memory_mb(self):
+        try:
+            used = self.driver.execute_script(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0")
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting Chrome driver: {e}")
+
+
+class ChromeDriverPool:
+    """
+    Fixed-size pool of warm Chrome drivers with checkout/return semantics.
+
+    Drivers are health-checked on checkout and recycled on return once they
+    have served max_pages pages or their JS heap exceeds max_memory_mb.
+    """
+
+    def __init__(self, size=CHROME_POOL_SIZE, max_pages=CHROME_MAX_PAGES, max_memory_mb=CHROME_MAX_MEMORY_MB):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.launched = 0
+        self.closed = False
+        self.stats = {"checkouts": 0, "launches": 0, "recycled": 0, "discarded": 0}
+
+    def start(self):
+        """Pre-launch every driver in parallel so the first scrapes don't wait."""
+        threads = [threading.Thread(target=self._add_driver_quietly) for _ in range(self.size - self.launched)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Chrome pool ready with {self.idle.qsize()} drivers")
+
+    def _add_driver(self):
+        """Launch one more driver into the pool. Returns False if the pool is already full."""
+        with self.lock:
+            if self.launched >= self.size:
+                return False
+            self.launched += 1
+        try:
+            pooled = PooledDriver(launch_driver())
+        except Exception:
+            with self.lock:
+                self.launched -= 1
+            raise
+        with self.lock:
+            self.stats["launches"] += 1
+        self.idle.put(pooled)
+        return True
+
+    def _add_driver_quietly(self):
+        try:
+            self._add_driver()
+        except Exception as e:
+            logger.error(f"Failed to launch Chrome driver: {e}")
+
+    def _retire(self, pooled, reason):
+        pooled.quit()
+        with self.lock:
+            self.launched -= 1
+            self.stats[reason] += 1
+
+    def checkout(self, timeout=300):
+        """Borrow a healthy driver, launching one if the pool isn't full yet."""
+        deadline = time.time() + timeout
+        while True:
+            if self.closed:
+                raise RuntimeError("Chrome pool is closed")
+            try:
+                pooled = self.idle.get_nowait()
+            except queue.Empty:
+                if self.launched < self.size:
+                    self._add_driver()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled Chrome driver")
+                try:
+                    pooled = self.idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+            if pooled.is_healthy():
+                with self.lock:
+                    self.stats["checkouts"] += 1
+                return pooled
+            self._retire(pooled, "discarded")
+
+    def worn_out(self, pooled, pages=0):
+        """Whether pooled is due for recycling once it has served pages more pages."""
+        return pooled.pages + pages >= self.max_pages
+
+    def checkin(self, pooled, broken=False, pages=1):
+        """
+        Return a driver that served `pages` pages while checked out; broken or
+        worn-out drivers are replaced.
+        """
+        pooled.pages += pages
+        if broken:
+            self._retire(pooled, "discarded")
+        elif self.worn_out(pooled):
+            logger.info(f"Recycling Chrome driver after {pooled.pages} pages")
+            self._retire(pooled, "recycled")
+        elif pooled.memory_mb() > self.max_memory_mb:
+            logger.info(f"Recycling Chrome driver using {pooled.memory_mb():.0f} MB")
+            self._retire(pooled, "recycled")
+        elif self.closed:
+            self._retire(pooled, "recycled")
+            return
+        else:
+            # Leave the tab blank so the next borrower starts clean
+            try:
+                pooled.driver.get("about:blank")
+            except Exception:
+                self._retire(pooled, "discarded")
+                return
+            self.idle.put(pooled)
+            return
+
+        # Keep the pool warm
+        if not self.closed:
+            threading.Thread(target=self._add_driver_quietly, daemon=True).start()
+
+    @contextlib.contextmanager
+    def driver(self, timeout=300):
+        """
+        with pool.driver() as driver: ...
+        Any exception inside the block marks the driver broken.
+        """
+        pooled = self.checkout(timeout)
+        try:
+            yield pooled.driver
+        except BaseException:
+            self.checkin(pooled, broken=True)
+            raise
+        self.checkin(pooled)
+
+    def health(self):
+        with self.lock:
+            return {
+                "size": self.size,
+                "launched": self.launched,
+                "idle": self.idle.qsize(),
+                **self.stats
+            }
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                pooled = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(pooled, "recycled")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool(size=None):
+    """
+    Process-wide Chrome pool, launched on first use.
+    size only applies to the call that creates the pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import atexit
+            _pool = ChromeDriverPool(size=size or CHROME_POOL_SIZE)
+            _pool.start()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def driver_pool_health():
+    """Pool stats for health checks, or None if no pool has been started."""
+    return _pool.health() if _pool is not None else None
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Date Search Cache - Persistent per-day cache of date-search results
+Bills filed on a day well in the past never change, so once a day older than
+the immutable horizon has been crawled it is served from disk forever; recent
+days are kept for a short TTL. Each cuatrienio's days live in one gzipped JSON
+file so the calendar view can open past dates without touching SUTRA.
+"""
+
+import contextlib
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DATE_CACHE_DIR = os.environ.get("DATE_CACHE_DIR", "date_search_cache")
+# Days at least this old are treated as immutable
+DATE_CACHE_IMMUTABLE_DAYS = int(os.environ.get("DATE_CACHE_IMMUTABLE_DAYS", 30))
+# Seconds a more recent day stays cached
+DATE_CACHE_RECENT_TTL = float(os.environ.get("DATE_CACHE_RECENT_TTL", 600))
+
+CACHE_VERSION = 1
+
+
+class DateSearchCache:
+    """Bills per filing day, stored in one compact file per cuatrienio."""
+
+    def __init__(self, cache_dir=DATE_CACHE_DIR, immutable_days=DATE_CACHE_IMMUTABLE_DAYS,
+                 recent_ttl=DATE_CACHE_RECENT_TTL):
+        self.cache_dir = cache_dir
+        self.immutable_days = immutable_days
+        self.recent_ttl = recent_ttl
+        self.lock = threading.Lock()
+        self.files = {}  # cuatrienio_id -> (mtime, days)
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stored": 0}
+
+    def path(self, cuatrienio_id):
+        return os.path.join(self.cache_dir, f"{cuatrienio_id}.json.gz")
+
+    def is_immutable(self, day):
+        return day.date() <= (datetime.now() - timedelta(days=self.immutable_days)).date()
+
+    @contextlib.contextmanager
+    def file_lock(self, cuatrienio_id):
+        """Serialize read-merge-write cycles on one cuatrienio file across processes."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.path(cuatrienio_id) + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, cuatrienio_id):
+        path = self.path(cuatrienio_id)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable date cache {path}: {e}")
+            return {}
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("days", {})
+
+    def _days(self, cuatrienio_id):
+        """In-memory copy of a cuatrienio's days, reloaded when another process rewrote the file."""
+        try:
+            mtime = os.path.getmtime(self.path(cuatrienio_id))
+        except OSError:
+            mtime = None
+        cached = self.files.get(cuatrienio_id)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, self._read(cuatrienio_id))
+            self.files[cuatrienio_id] = cached
+        return cached[1]
+
+    def get(self, cuatrienio_id, day):
+        """Cached bills for day (a datetime), or None on a miss."""
+        key = day.strftime('%Y-%m-%d')
+        with self.lock:
+            entry = self._days(cuatrienio_id).get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if not entry.get("immutable") and time.time() - entry["fetched_at"] > self.recent_ttl:
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry["bills"]
+
+    def put_many(self, cuatrienio_id, days):
+        """Store {datetime day: bills} for one cuatrienio."""
+        if not days:
+            return
+        now = time.time()
+        with self.lock, self.file_lock(cuatrienio_id):
+            # Merge into what's on disk now, in case another worker added days
+            stored = self._read(cuatrienio_id)
+            for day, bills in days.items():
+                stored[day.strftime('%Y-%m-%d')] = {
+                    "fetched_at": now,
+                    "immutable": self.is_immutable(day),
+                    "bills": bills,
+                }
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path(cuatrienio_id)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "days": stored}, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self.files[cuatrienio_id] = (os.path.getmtime(path), stored)
+            self.stats["stored"] += len(days)
+
+    def health(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_date_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DateSearchCache()
+        return _cache
+
+
+def date_cache_stats():
+    return _cache.health() if _cache is not None else None
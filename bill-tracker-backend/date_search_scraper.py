@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 """
-SUTRA Date Search Scraper - Extracts bills filed on a specific date
+SUTRA Date Search Scraper - Extracts bills filed on a specific date or date range
 """
 
-import requests
 from bs4 import BeautifulSoup
 import json
 import sys
+import os
 import re
 import logging
+import concurrent.futures
 from datetime import datetime, timedelta
+from http_client import get_session
+from date_search_cache import get_date_cache
+from bill_store import save_listings
 
 # Set up logging
 logging.basicConfig(
@@ -19,6 +23,354 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Result pages fetched at once after the first one (the adaptive rate limiter
+# in the shared session still paces the actual requests)
+DATE_SEARCH_WORKERS = int(os.environ.get("DATE_SEARCH_WORKERS", 4))
+
+PAGE_NUMBER_PATTERNS = [
+    re.compile(r'[?&]page=(\d+)'),
+    re.compile(r'gotoPage\((\d+)'),
+    re.compile(r'p[áa]gina\s+(\d+)', re.IGNORECASE),
+    re.compile(r'page\s+(\d+)', re.IGNORECASE),
+]
+
+def parse_filing_date(filing_date):
+    """Parse a SUTRA filing date (MM/DD/YYYY or YYYY-MM-DD); None if missing or unparseable."""
+    if not filing_date:
+        return None
+    try:
+        # Sometimes the date formats can be different, handle both MM/DD/YYYY and YYYY-MM-DD
+        if '/' in filing_date:
+            return datetime.strptime(filing_date, '%m/%d/%Y')
+        return datetime.strptime(filing_date, '%Y-%m-%d')
+    except ValueError:
+        # If we can't parse the date, callers include the bill anyway
+        logger.warning(f"Couldn't parse filing date: {filing_date}")
+        return None
+
+def parse_bill_item(item):
+    """Extract one bill from a search result <li>."""
+    bill_data = {}
+    
+    # Extract bill number/identifier
+    bill_number_elem = item.find('h1', class_=lambda c: c and 'text-2xl' in c)
+    if bill_number_elem:
+        # Find the "Medida:" text
+        medida_span = bill_number_elem.find('span', class_='font-bold')
+        if medida_span and "Medida:" in medida_span.get_text():
+            # Get the text content and clean it
+            bill_measure = bill_number_elem.get_text(strip=True)
+            bill_data['measure_number'] = bill_measure.replace("Medida:", "").strip()
+    
+    # Extract filing date
+    filing_date_elem = item.find('strong', string=lambda s: s and 'Radicada:' in s)
+    if filing_date_elem and filing_date_elem.parent:
+        filing_date = filing_date_elem.parent.get_text(strip=True)
+        bill_data['filing_date'] = filing_date.replace("Radicada:", "").strip()
+    
+    # Extract authors
+    authors_elem = item.find('strong', string=lambda s: s and 'Autor(es):' in s)
+    if authors_elem and authors_elem.parent:
+        authors_span = authors_elem.parent.find('span', class_='text-xs')
+        if authors_span:
+            bill_data['authors'] = authors_span.get_text(strip=True)
+    
+    # Extract title
+    title_elem = item.find('strong', string=lambda s: s and 'Título:' in s)
+    if title_elem and title_elem.parent:
+        title_text = title_elem.parent.get_text(strip=True)
+        bill_data['title'] = title_text.replace("Título:", "").strip()
+    
+    # Extract URL
+    link_elem = item.parent if item.name == 'li' else item
+    if link_elem.name == 'a' and link_elem.has_attr('href'):
+        bill_url = link_elem['href']
+        if not bill_url.startswith('http'):
+            bill_url = f"https://sutra.oslpr.org{bill_url}"
+        bill_data['url'] = bill_url
+        
+        # Extract bill ID from URL
+        bill_id_match = re.search(r'medidas/(\d+)', bill_url)
+        if bill_id_match:
+            bill_data['id'] = bill_id_match.group(1)
+    
+    # Extract status
+    status_elem = item.find('span', class_='text-xs font-bold text-white')
+    if status_elem:
+        bill_data['status'] = status_elem.get_text(strip=True)
+    
+    return bill_data
+
+def parse_results_page(html):
+    """
+    Parse one page of search results.
+    Returns (bills, number of result items, has_next_page, soup).
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Find all bill items on the page
+    bill_items = soup.find_all('li', class_=lambda c: c and 'relative border border-zinc-400' in c)
+    bills = []
+    for item in bill_items:
+        bill_data = parse_bill_item(item)
+        if bill_data and bill_data.get('measure_number'):  # Only add if we have at least a measure number
+            bills.append(bill_data)
+    
+    # Check if there's a "next page" link
+    next_page_link = soup.find('a', attrs={'aria-label': 'Página Siguiente'})
+    has_next_page = bool(next_page_link) and 'disabled' not in next_page_link.get('class', [])
+    return bills, len(bill_items), has_next_page, soup
+
+def find_page_count(soup, has_next_page):
+    """
+    Total number of result pages according to the pagination links, or None
+    if there is a next page but the pagination doesn't say how many.
+    """
+    if not has_next_page:
+        return 1
+    next_page_link = soup.find('a', attrs={'aria-label': 'Página Siguiente'})
+    pagination = next_page_link.find_parent('nav') if next_page_link else None
+    scope = pagination or soup
+    
+    pages = set()
+    for elem in scope.find_all(['a', 'button', 'span']):
+        # The next link only points one page ahead
+        if elem is next_page_link:
+            continue
+        values = [elem.get('href', ''), elem.get('wire:click', ''), elem.get('aria-label', '')]
+        for value in values:
+            for pattern in PAGE_NUMBER_PATTERNS:
+                match = pattern.search(value)
+                if match:
+                    pages.add(int(match.group(1)))
+        # Plain numbered buttons inside the pagination bar
+        if pagination is not None:
+            text = elem.get_text(strip=True)
+            if text.isdigit():
+                pages.add(int(text))
+    
+    # Page 2 must exist since there is a next link; anything less means we
+    # couldn't read the pagination
+    page_count = max(pages) if pages else None
+    return page_count if page_count and page_count >= 2 else None
+
+def fetch_results_page(base_url, page_number):
+    """Fetch and parse one result page."""
+    # Construct URL with page parameter if needed
+    page_url = f"{base_url}&page={page_number}" if page_number > 1 else base_url
+    logger.info(f"Scraping page {page_number}: {page_url}")
+    
+    # Make the request over the shared keep-alive session
+    response = get_session().get(page_url, timeout=30)
+    response.raise_for_status()  # Raise exception for HTTP errors
+    return parse_results_page(response.content)
+
+def crawl_search_pages(base_url, workers=DATE_SEARCH_WORKERS):
+    """
+    Yield (page_number, bills) for every result page of a search, in page
+    order, with bills already seen on earlier pages (by medida id) removed.
+    
+    The page count comes from the first page's pagination so the remaining
+    pages can be fetched concurrently; if it can't be read, pages are walked
+    one at a time following the "Página Siguiente" link.
+    """
+    seen_ids = set()
+    
+    def dedupe(bills):
+        unique = []
+        for bill in bills:
+            key = bill.get('id') or bill.get('measure_number')
+            if key in seen_ids:
+                continue
+            seen_ids.add(key)
+            unique.append(bill)
+        return unique
+    
+    bills, item_count, has_next_page, soup = fetch_results_page(base_url, 1)
+    logger.info(f"Found {item_count} bill items on page 1")
+    yield 1, dedupe(bills)
+    if item_count == 0:
+        return
+    
+    page_number = 1
+    page_count = find_page_count(soup, has_next_page)
+    if page_count is not None and page_count > 1:
+        logger.info(f"Fetching pages 2-{page_count} with {workers} workers")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() hands results back in page order however they complete
+            pages = executor.map(lambda n: fetch_results_page(base_url, n), range(2, page_count + 1))
+            for page_number, (bills, item_count, has_next_page, _) in enumerate(pages, start=2):
+                logger.info(f"Found {item_count} bill items on page {page_number}")
+                yield page_number, dedupe(bills)
+        if has_next_page:
+            # The pagination bar showed fewer pages than there are
+            logger.warning(f"Page {page_count} still has a next link; continuing one page at a time")
+    elif page_count is None:
+        # Serial fallback: follow the next link until it disappears
+        logger.info("Couldn't determine the page count; walking pages one at a time")
+    
+    while has_next_page:
+        page_number += 1
+        bills, item_count, has_next_page, _ = fetch_results_page(base_url, page_number)
+        logger.info(f"Found {item_count} bill items on page {page_number}")
+        if item_count == 0:
+            logger.info(f"No more bills found on page {page_number}")
+            break
+        yield page_number, dedupe(bills)
+    logger.info(f"No next page link found, stopping at page {page_number}")
+
+def cuatrienio_for_date(date):
+    """
+    SUTRA's cuatrienio_id for a date: the year the four-year legislative term
+    containing it began. Terms start in January after each election year
+    (..., 2017, 2021, 2025, ...).
+    """
+    return date.year - ((date.year - 1) % 4)
+
+def split_by_cuatrienio(start_date, end_date):
+    """Split [start_date, end_date] into (cuatrienio_id, start, end) pieces, one per term."""
+    pieces = []
+    piece_start = start_date
+    while piece_start <= end_date:
+        cuatrienio_id = cuatrienio_for_date(piece_start)
+        term_end = datetime(cuatrienio_id + 4, 1, 1) - timedelta(days=1)
+        piece_end = min(end_date, term_end)
+        pieces.append((cuatrienio_id, piece_start, piece_end))
+        piece_start = piece_end + timedelta(days=1)
+    return pieces
+
+def search_url(cuatrienio_id, desde_date, hasta_date):
+    return f"https://sutra.oslpr.org/medidas?cuatrienio_id={cuatrienio_id}&fecha_radicacion_desde={desde_date}&fecha_radicacion_hasta={hasta_date}"
+
+def crawl_date_range(start_date, end_date, state):
+    """
+    Crawl every bill filed between start_date and end_date (inclusive) with one
+    paginated search per legislative term. Bills whose filing date falls
+    outside the range are dropped; bills with an unparseable date are kept.
+    Progress is recorded in state so callers can report partial results.
+    """
+    for cuatrienio_id, piece_start, piece_end in split_by_cuatrienio(start_date, end_date):
+        # SUTRA's desde bound is searched from the day before so the first
+        # day's bills aren't lost; the date filter below trims the extra day
+        desde_date = (piece_start - timedelta(days=1)).strftime('%Y-%m-%d')
+        hasta_date = piece_end.strftime('%Y-%m-%d')
+        base_url = search_url(cuatrienio_id, desde_date, hasta_date)
+        state["search_urls"].append(base_url)
+        logger.info(f"Cuatrienio {cuatrienio_id}: from {desde_date} to {hasta_date}")
+        logger.info(f"Base URL: {base_url}")
+        
+        # Crawl every result page (in parallel when the page count is known)
+        for page_number, page_bills in crawl_search_pages(base_url):
+            state["pages_processed"] += 1
+            for bill_data in page_bills:
+                filing_date_obj = parse_filing_date(bill_data.get('filing_date'))
+                if filing_date_obj and not (start_date.date() <= filing_date_obj.date() <= end_date.date()):
+                    logger.warning(f"Bill {bill_data.get('measure_number', 'unknown')} has filing date {bill_data['filing_date']} outside {start_date.date()}..{end_date.date()}")
+                    continue
+                bill_data['filing_date_iso'] = filing_date_obj.strftime('%Y-%m-%d') if filing_date_obj else None
+                state["bills"].append(bill_data)
+
+def parse_search_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {value}. Expected format: YYYY-MM-DD")
+
+def scrape_bills_by_date_range(desde, hasta, use_cache=True):
+    """
+    Scrapes bills introduced between two dates (inclusive) from SUTRA.
+    
+    Days already in the date-search cache are served from disk; SUTRA is only
+    crawled for the span of days that are missing or expired.
+    
+    Args:
+        desde: First date, YYYY-MM-DD
+        hasta: Last date, YYYY-MM-DD
+        use_cache: Set False to force a fresh crawl of the whole range
+    
+    Returns:
+        Dictionary with every bill in the range (in filing date order) plus
+        the same bills bucketed by filing date ("by_date", one key per day)
+    """
+    try:
+        start_date = parse_search_date(desde, "desde")
+        end_date = parse_search_date(hasta, "hasta")
+        if start_date > end_date:
+            raise ValueError(f"desde ({desde}) is after hasta ({hasta})")
+    except ValueError as e:
+        logger.error(str(e))
+        return {"success": False, "error": str(e), "bills": [], "by_date": {}}
+    
+    logger.info(f"Searching for bills introduced from {desde} to {hasta}")
+    cache = get_date_cache() if use_cache else None
+    state = {"bills": [], "search_urls": [], "pages_processed": 0}
+    
+    # Every day in the range gets a key; fill in what the cache already has
+    by_date = {}
+    missing_days = []
+    day = start_date
+    while day <= end_date:
+        cached = cache.get(cuatrienio_for_date(day), day) if cache else None
+        if cached is None:
+            missing_days.append(day)
+        by_date[day.strftime('%Y-%m-%d')] = cached or []
+        day += timedelta(days=1)
+    
+    undated = []
+    if missing_days:
+        crawl_start, crawl_end = missing_days[0], missing_days[-1]
+        logger.info(f"{len(by_date) - len(missing_days)} days cached; crawling {crawl_start.date()} to {crawl_end.date()}")
+        try:
+            crawl_date_range(crawl_start, crawl_end, state)
+        except Exception as e:
+            logger.error(f"Error scraping search results: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "bills": state["bills"],  # Return any bills we managed to scrape before the error
+                "count": len(state["bills"])
+            }
+        
+        # Bucket crawled bills by day in a single pass
+        crawled = {day: [] for day in missing_days}
+        crawled_keys = {day.strftime('%Y-%m-%d'): day for day in missing_days}
+        for bill in state["bills"]:
+            key = bill['filing_date_iso']
+            if key in crawled_keys:
+                crawled[crawled_keys[key]].append(bill)
+            elif key not in by_date:
+                undated.append(bill)
+            # Otherwise the day was served from the cache already
+        for day, bills in crawled.items():
+            by_date[day.strftime('%Y-%m-%d')] = bills
+        save_listings(state["bills"])
+        
+        # Bills without a usable date can't be put in a day's bucket, so a
+        # crawl that produced any isn't cached
+        if cache and not undated:
+            by_cuatrienio = {}
+            for day, bills in crawled.items():
+                by_cuatrienio.setdefault(cuatrienio_for_date(day), {})[day] = bills
+            for cuatrienio_id, days in by_cuatrienio.items():
+                cache.put_many(cuatrienio_id, days)
+    
+    all_bills = [bill for key in sorted(by_date) for bill in by_date[key]] + undated
+    logger.info(f"Total bills collected: {len(all_bills)} over {len(by_date)} days")
+    
+    return {
+        "success": True,
+        "bills": all_bills,
+        "count": len(all_bills),
+        "by_date": by_date,
+        "undated_count": len(undated),
+        "desde": desde,
+        "hasta": hasta,
+        "search_urls": state["search_urls"],
+        "pages_processed": state["pages_processed"],
+        "days_cached": len(by_date) - len(missing_days),
+        "days_crawled": len(missing_days)
+    }
+
 def scrape_bills_by_date(date_str):
     """
     Scrapes bills introduced on a specific date from SUTRA.
@@ -29,23 +381,8 @@ def scrape_bills_by_date(date_str):
     Returns:
         Dictionary with scraped bill data
     """
-    
-    # Validate the date format
     try:
-        # Parse the date to validate format
-        target_date = datetime.strptime(date_str, '%Y-%m-%d')
-        
-        # Get the day before for desde_date
-        day_before = target_date - timedelta(days=1)
-        
-        # Format dates for URL
-        desde_date = day_before.strftime('%Y-%m-%d')
-        hasta_date = target_date.strftime('%Y-%m-%d')
-        
-        # Get current year for cuatrienio_id - usually a 4-year legislative term
-        current_year = datetime.now().year
-        cuatrienio_id = current_year
-        
+        parse_search_date(date_str, "date")
     except ValueError:
         logger.error(f"Invalid date format: {date_str}. Expected format: YYYY-MM-DD")
         return {
@@ -54,158 +391,21 @@ def scrape_bills_by_date(date_str):
             "bills": []
         }
     
-    # Base URL for search
-    base_url = f"https://sutra.oslpr.org/medidas?cuatrienio_id={cuatrienio_id}&fecha_radicacion_desde={desde_date}&fecha_radicacion_hasta={hasta_date}"
-    
-    logger.info(f"Searching for bills introduced on {date_str}")
-    logger.info(f"Date range: from {desde_date} to {hasta_date}")
-    logger.info(f"Base URL: {base_url}")
-    
-    all_bills = []
-    
-    try:
-        # Set up headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        # Start with page 1
-        current_page = 1
-        has_more_pages = True
-        
-        # Process pages until we've gone through all of them
-        while has_more_pages:
-            # Construct URL with page parameter if needed
-            page_url = f"{base_url}&page={current_page}" if current_page > 1 else base_url
-            
-            logger.info(f"Scraping page {current_page}: {page_url}")
-            
-            # Make the request
-            response = requests.get(page_url, headers=headers, timeout=30)
-            response.raise_for_status()  # Raise exception for HTTP errors
-            
-            # Parse the HTML content
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find all bill items on the page
-            bill_items = soup.find_all('li', class_=lambda c: c and 'relative border border-zinc-400' in c)
-            
-            logger.info(f"Found {len(bill_items)} bill items on page {current_page}")
-            
-            # If no bills found on this page, we've reached the end
-            if len(bill_items) == 0:
-                has_more_pages = False
-                logger.info(f"No more bills found on page {current_page}")
-                break
-                
-            # Process bills on this page
-            for item in bill_items:
-                bill_data = {}
-                
-                # Extract bill number/identifier
-                bill_number_elem = item.find('h1', class_=lambda c: c and 'text-2xl' in c)
-                if bill_number_elem:
-                    # Find the "Medida:" text
-                    medida_span = bill_number_elem.find('span', class_='font-bold')
-                    if medida_span and "Medida:" in medida_span.get_text():
-                        # Get the text content and clean it
-                        bill_measure = bill_number_elem.get_text(strip=True)
-                        bill_data['measure_number'] = bill_measure.replace("Medida:", "").strip()
-                
-                # Extract filing date
-                filing_date_elem = item.find('strong', string=lambda s: s and 'Radicada:' in s)
-                if filing_date_elem and filing_date_elem.parent:
-                    filing_date = filing_date_elem.parent.get_text(strip=True)
-                    bill_data['filing_date'] = filing_date.replace("Radicada:", "").strip()
-                    
-                    # Validate this bill was actually filed on our target date
-                    try:
-                        # Sometimes the date formats can be different, handle both MM/DD/YYYY and YYYY-MM-DD
-                        if '/' in bill_data['filing_date']:
-                            filing_date_obj = datetime.strptime(bill_data['filing_date'], '%m/%d/%Y')
-                        else:
-                            filing_date_obj = datetime.strptime(bill_data['filing_date'], '%Y-%m-%d')
-                            
-                        # Skip this bill if it wasn't filed on our target date
-                        if filing_date_obj.date() != target_date.date():
-                            logger.warning(f"Bill {bill_data.get('measure_number', 'unknown')} has filing date {bill_data['filing_date']} which doesn't match target date {date_str}")
-                            continue
-                    except ValueError:
-                        # If we can't parse the date, include it anyway
-                        logger.warning(f"Couldn't parse filing date: {bill_data['filing_date']}")
-                
-                # Extract authors
-                authors_elem = item.find('strong', string=lambda s: s and 'Autor(es):' in s)
-                if authors_elem and authors_elem.parent:
-                    authors_span = authors_elem.parent.find('span', class_='text-xs')
-                    if authors_span:
-                        bill_data['authors'] = authors_span.get_text(strip=True)
-                
-                # Extract title
-                title_elem = item.find('strong', string=lambda s: s and 'Título:' in s)
-                if title_elem and title_elem.parent:
-                    title_text = title_elem.parent.get_text(strip=True)
-                    bill_data['title'] = title_text.replace("Título:", "").strip()
-                
-                # Extract URL
-                link_elem = item.parent if item.name == 'li' else item
-                if link_elem.name == 'a' and link_elem.has_attr('href'):
-                    bill_url = link_elem['href']
-                    if not bill_url.startswith('http'):
-                        bill_url = f"https://sutra.oslpr.org{bill_url}"
-                    bill_data['url'] = bill_url
-                    
-                    # Extract bill ID from URL
-                    bill_id_match = re.search(r'medidas/(\d+)', bill_url)
-                    if bill_id_match:
-                        bill_data['id'] = bill_id_match.group(1)
-                
-                # Extract status
-                status_elem = item.find('span', class_='text-xs font-bold text-white')
-                if status_elem:
-                    bill_data['status'] = status_elem.get_text(strip=True)
-                
-                if bill_data and bill_data.get('measure_number'):  # Only add if we have at least a measure number
-                    all_bills.append(bill_data)
-            
-            # Check if there's a "next page" link
-            next_page_link = soup.find('a', attrs={'aria-label': 'Página Siguiente'})
-            if not next_page_link or 'disabled' in next_page_link.get('class', []):
-                has_more_pages = False
-                logger.info(f"No next page link found, stopping at page {current_page}")
-            else:
-                current_page += 1
-                logger.info(f"Moving to page {current_page}")
-                
-                # # Add a small delay between pages to be respectful
-                # time.sleep(1)
-        
-        logger.info(f"Total bills collected: {len(all_bills)}")
-        
-        result = {
-            "success": True,
-            "bills": all_bills,
-            "count": len(all_bills),
-            "search_date": date_str,
-            "search_url": base_url,
-            "pages_processed": current_page
-        }
-        
+    result = scrape_bills_by_date_range(date_str, date_str)
+    if not result["success"]:
         return result
-        
-    except Exception as e:
-        logger.error(f"Error scraping search results: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e),
-            "bills": all_bills,  # Return any bills we managed to scrape before the error
-            "count": len(all_bills)
-        }
+    
+    target_date = parse_search_date(date_str, "date")
+    return {
+        "success": True,
+        "bills": result["bills"],
+        "count": result["count"],
+        "search_date": date_str,
+        "search_url": search_url(cuatrienio_for_date(target_date),
+                                 (target_date - timedelta(days=1)).strftime('%Y-%m-%d'), date_str),
+        "pages_processed": result["pages_processed"],
+        "cached": result["days_cached"] == 1
+    }
      
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -213,7 +413,11 @@ if __name__ == "__main__":
         sys.exit(1)
         
     date_param = sys.argv[1]
-    result = scrape_bills_by_date(date_param)
+    if len(sys.argv) > 2:
+        # Two dates: desde and hasta
+        result = scrape_bills_by_date_range(date_param, sys.argv[2])
+    else:
+        result = scrape_bills_by_date(date_param)
     
     # Output JSON result for the Node.js server to parse
-    print(json.dumps(result))
\ No newline at end of file
+    print(json.dumps(result))
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Doc Converter - Resident LibreOffice service for legacy .doc files
+Converting a .doc used to start a fresh `soffice --headless` per document,
+paying LibreOffice's multi-second cold start every time. Conversions now go
+to a long-lived unoserver (a headless LibreOffice listening over UNO) through
+a single-job queue, so each one runs at warm-process speed. An unoserver
+already listening on DOC_CONVERTER_PORT is used as-is; otherwise the first
+worker that needs one starts it, and the other workers share it.
+
+Without unoserver installed, each job falls back to a one-shot soffice with a
+private profile. Either way the output path is the one the caller asked for;
+soffice names its output after the input file, which the old code missed.
+
+Usage: doc_converter.py FILE.doc [txt|docx]
+"""
+
+import atexit
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DOC_CONVERTER_HOST = os.environ.get("DOC_CONVERTER_HOST", "127.0.0.1")
+DOC_CONVERTER_PORT = int(os.environ.get("DOC_CONVERTER_PORT", 2003))
+DOC_CONVERTER_UNO_PORT = int(os.environ.get("DOC_CONVERTER_UNO_PORT", 2002))
+# Start unoserver when none is listening (set to 0 when it runs as its own service)
+DOC_CONVERTER_AUTOSTART = os.environ.get("DOC_CONVERTER_AUTOSTART", "1") != "0"
+# Seconds for one conversion, time in the queue included, and for unoserver to come up
+DOC_CONVERTER_TIMEOUT = float(os.environ.get("DOC_CONVERTER_TIMEOUT", 120))
+DOC_CONVERTER_START_TIMEOUT = float(os.environ.get("DOC_CONVERTER_START_TIMEOUT", 60))
+# After unoserver fails to start, use one-shot soffice for this long before trying again
+DOC_CONVERTER_RETRY_AFTER = float(os.environ.get("DOC_CONVERTER_RETRY_AFTER", 300))
+# Conversions allowed to wait behind the running one
+DOC_CONVERTER_MAX_QUEUED = int(os.environ.get("DOC_CONVERTER_MAX_QUEUED", 8))
+SOFFICE_PATH = os.environ.get("SOFFICE_PATH", "soffice")
+UNOSERVER_PATH = os.environ.get("UNOSERVER_PATH", "unoserver")
+
+# Output formats: LibreOffice export filter and its options
+FORMATS = {
+    "txt": ("Text (encoded)", "UTF8"),
+    "docx": ("MS Word 2007 XML", None),
+}
+
+
+class ConversionError(Exception):
+    """LibreOffice could not convert a document."""
+
+
+class ConverterUnavailable(ConversionError):
+    """Neither unoserver nor soffice is available."""
+
+
+class ConversionBusy(ConversionError):
+    """Too many conversions are already waiting."""
+
+
+def port_open(host, port, timeout=1.0):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class DocConverter:
+    """One conversion at a time on a resident unoserver, falling back to one-shot soffice."""
+
+    def __init__(self, host=DOC_CONVERTER_HOST, port=DOC_CONVERTER_PORT, max_queued=DOC_CONVERTER_MAX_QUEUED):
+        self.host = host
+        self.port = port
+        self.max_queued = max_queued
+        # LibreOffice converts one document at a time anyway; a single thread is the queue
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-converter")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.process = None     # unoserver started by this process, if any
+        self.start_failed_at = None
+        self.profile_dir = os.path.join(tempfile.gettempdir(), f"bill-tracker-lo-{os.getpid()}")
+        self.stats = {"converted": 0, "failed": 0, "timeouts": 0, "rejected": 0, "server_starts": 0,
+                      "oneshot": 0, "seconds": 0.0}
+
+    @contextlib.contextmanager
+    def start_lock(self):
+        """Only one worker process starts unoserver; the rest wait and then share it."""
+        if fcntl is None:
+            yield
+            return
+        lock_path = os.path.join(tempfile.gettempdir(), f"bill-tracker-unoserver-{self.port}.lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _client(self):
+        """An unoserver client if one is (or can be made) reachable, else None."""
+        try:
+            from unoserver.client import UnoClient
+        except ImportError:
+            return None
+        if not port_open(self.host, self.port) and not self._start_server():
+            return None
+        return UnoClient(server=self.host, port=str(self.port))
+
+    def _start_server(self):
+        if not DOC_CONVERTER_AUTOSTART or shutil.which(UNOSERVER_PATH) is None:
+            return False
+        if self.start_failed_at is not None and time.time() - self.start_failed_at < DOC_CONVERTER_RETRY_AFTER:
+            return False
+        if self._launch():
+            self.start_failed_at = None
+            return True
+        self.start_failed_at = time.time()
+        return False
+
+    def _launch(self):
+        with self.start_lock():
+            if port_open(self.host, self.port):
+                return True
+            command = [
+                UNOSERVER_PATH, "--interface", self.host, "--port", str(self.port),
+                "--uno-port", str(DOC_CONVERTER_UNO_PORT), "--executable", shutil.which(SOFFICE_PATH) or SOFFICE_PATH,
+                "--conversion-timeout", str(int(DOC_CONVERTER_TIMEOUT)),
+            ]
+            logger.info(f"Starting unoserver on {self.host}:{self.port}")
+            self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                            start_new_session=True)
+            with self.lock:
+                self.stats["server_starts"] += 1
+            deadline = time.time() + DOC_CONVERTER_START_TIMEOUT
+            while time.time() < deadline:
+                if port_open(self.host, self.port):
+                    return True
+                if self.process.poll() is not None:
+                    logger.error(f"unoserver exited with code {self.process.returncode} while starting")
+                    self.process = None
+                    return False
+                time.sleep(0.25)
+            logger.error(f"unoserver did not start listening within {DOC_CONVERTER_START_TIMEOUT:g}s")
+            self.stop()
+            return False
+
+    def stop(self):
+        """Stop the unoserver this process started (one started elsewhere is left alone)."""
+        process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def _convert_oneshot(self, input_path, output_path, convert_to):
+        soffice = shutil.which(SOFFICE_PATH)
+        if soffice is None:
+            raise ConverterUnavailable("Neither unoserver nor soffice is installed")
+        filter_name, options = FORMATS[convert_to]
+        target = f"{convert_to}:{filter_name}" + (f":{options}" if options else "")
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(output_path) or None) as outdir:
+            command = [soffice, f"-env:UserInstallation=file://{self.profile_dir}", "--headless", "--norestore",
+                       "--convert-to", target, "--outdir", outdir, input_path]
+            result = subprocess.run(command, capture_output=True, text=True, timeout=DOC_CONVERTER_TIMEOUT)
+            # soffice names the output after the input: report.doc -> report.txt
+            produced = os.path.join(outdir, os.path.splitext(os.path.basename(input_path))[0] + "." + convert_to)
+            if not os.path.exists(produced):
+                raise ConversionError(f"soffice produced no output (exit {result.returncode}): {result.stderr.strip()}")
+            os.replace(produced, output_path)
+        with self.lock:
+            self.stats["oneshot"] += 1
+
+    def _run(self, input_path, output_path, convert_to):
+        """Runs on the converter thread."""
+        client = self._client()
+        if client is None:
+            self._convert_oneshot(input_path, output_path, convert_to)
+            return
+        filter_name, options = FORMATS[convert_to]
+        try:
+            client.convert(inpath=input_path, outpath=output_path, convert_to=convert_to,
+                           filtername=filter_name, filter_options=[options] if options else [])
+        except Exception as e:
+            # unoserver exits after a conversion timeout; the next job restarts it
+            raise ConversionError(f"unoserver could not convert {input_path}: {e}") from e
+
+    def convert(self, input_path, output_path, convert_to, timeout=DOC_CONVERTER_TIMEOUT):
+        """
+        Convert input_path to convert_to ("txt" or "docx"), written at output_path.
+        Returns output_path. Raises ConversionBusy when the queue is full and
+        ConversionError when the conversion fails or takes longer than timeout.
+        """
+        if convert_to not in FORMATS:
+            raise ValueError(f"Unsupported output format: {convert_to}")
+        input_path, output_path = os.path.abspath(input_path), os.path.abspath(output_path)
+        started = time.time()
+
+        with self.lock:
+            if self.pending > self.max_queued:
+                self.stats["rejected"] += 1
+                raise ConversionBusy(f"{self.pending} conversions already queued")
+            self.pending += 1
+        try:
+            future = self.executor.submit(self._run, input_path, output_path, convert_to)
+            try:
+                future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                with self.lock:
+                    self.stats["timeouts"] += 1
+                raise ConversionError(f"Converting {input_path} took longer than {timeout:g}s")
+            except ConversionError:
+                with self.lock:
+                    self.stats["failed"] += 1
+                raise
+            except (OSError, subprocess.SubprocessError) as e:
+                with self.lock:
+                    self.stats["failed"] += 1
+                raise ConversionError(str(e)) from e
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+        if not os.path.exists(output_path):
+            raise ConversionError(f"Conversion reported success but {output_path} is missing")
+        elapsed = time.time() - started
+        with self.lock:
+            self.stats["converted"] += 1
+            self.stats["seconds"] += elapsed
+        logger.info(f"Converted {os.path.basename(input_path)} to {convert_to} in {elapsed:.2f}s")
+        return output_path
+
+    def health(self):
+        with self.lock:
+            return {
+                "server": f"{self.host}:{self.port}",
+                "server_owned": self.process is not None and self.process.poll() is None,
+                "pending": self.pending,
+                **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.stats.items()},
+            }
+
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def get_doc_converter():
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            _converter = DocConverter()
+            atexit.register(_converter.stop)
+        return _converter
+
+
+def doc_converter_stats():
+    return _converter.health() if _converter is not None else None
+
+
+def convert_doc_to_text(filepath):
+    """Text of a .doc file, converted by LibreOffice."""
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(filepath))) as work_dir:
+        output_path = get_doc_converter().convert(filepath, os.path.join(work_dir, "converted.txt"), "txt")
+        with open(output_path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+
+def convert_doc_to_docx(doc_url, output_dir="scraped_data"):
+    """
+    Worker entry point: fetch a .doc into the document store and convert it to
+    .docx next to the stored object, reusing an earlier conversion.
+    """
+    from document_store import fetch_document, converted_path
+
+    try:
+        filepath, _ = fetch_document(doc_url, output_dir)
+        docx_path = converted_path(filepath, ".docx")
+        cached = os.path.exists(docx_path)
+        if not cached:
+            tmp_path = f"{docx_path}.{os.getpid()}.tmp.docx"
+            get_doc_converter().convert(filepath, tmp_path, "docx")
+            os.replace(tmp_path, docx_path)
+    except Exception as e:
+        logger.error(f"Could not convert {doc_url} to docx: {e}")
+        return {"success": False, "error": str(e)}
+    return {"success": True, "filepath": filepath, "docx_path": docx_path, "cached": cached}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(json.dumps({"success": False, "error": "A .doc file is required"}))
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    source = sys.argv[1]
+    target_format = sys.argv[2] if len(sys.argv) > 2 else "txt"
+    try:
+        output = get_doc_converter().convert(source, os.path.splitext(source)[0] + "." + target_format, target_format)
+        print(json.dumps({"success": True, "output": output}))
+    except ConversionError as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Document Store - Content-addressed storage for downloaded bill documents
+Every document is stored once under the SHA-256 of its bytes, in sharded
+directories (objects/ab/cd/<digest>.pdf), no matter how many URLs or bills
+point at it. An index (objects/index.db, SQLite) maps each URL to the digest
+it last served; an object whose last URL moves to different content is
+deleted. Extracted text sits next to its object (as does a .docx conversion
+of a .doc), so identical attachments are also extracted only once.
+
+The digest is computed while the body streams to disk, so storing a document
+costs no extra read.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+from file_download import download_to_file, hash_file, is_valid_file, discard_partial, DownloadValidationError
+
+logger = logging.getLogger(__name__)
+
+# Subdirectory of the scraper's output_dir that holds the store
+DOCUMENT_STORE_SUBDIR = os.environ.get("DOCUMENT_STORE_SUBDIR", "objects")
+
+# How long an index writer waits for another process's transaction
+DOCUMENT_INDEX_BUSY_TIMEOUT = float(os.environ.get("DOCUMENT_INDEX_BUSY_TIMEOUT", 30))
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    extraction TEXT
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL
+);
+CREATE INDEX IF NOT EXISTS urls_digest ON urls (digest);
+"""
+
+
+def url_extension(url):
+    """File extension to store a document under, from its URL."""
+    extension = os.path.splitext(url.split('?', 1)[0])[1].lower()
+    return extension if extension and len(extension) <= 6 else '.bin'
+
+
+def digest_of(path):
+    """The digest a stored object (or a file derived from it) is named after."""
+    return os.path.basename(path).split(".", 1)[0]
+
+
+def converted_path(filepath, extension):
+    """Where a file derived from a stored document (its text, a .docx rendering) lives."""
+    return filepath + extension
+
+
+def text_path(filepath):
+    """Where the extracted text for a stored document lives."""
+    return converted_path(filepath, ".txt")
+
+
+class DocumentStore:
+    """
+    Content-addressed objects plus a url -> digest index. An object's
+    reference count is the number of URLs in the index that point at it.
+
+    The index is a SQLite database (WAL mode, like the bill store), so each
+    lookup or update touches only its own rows and worker processes read
+    while another one writes.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, "index.db")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "released": 0, "bytes_saved": 0}
+        self.connection().executescript(INDEX_SCHEMA)
+        self._import_json_index()
+
+    def object_path(self, digest, extension):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + extension)
+
+    def staging_path(self, url):
+        """Stable per-URL download path, so an interrupted download resumes."""
+        name = hashlib.sha256(url.encode()).hexdigest()[:32]
+        return os.path.join(self.root, "incoming", name + url_extension(url))
+
+    def staging_lock_path(self, url):
+        return self.staging_path(url) + ".lock"
+
+    @contextlib.contextmanager
+    def staging_lock(self, url):
+        """
+        Exclusive use of url's staging file. flock is per open file, so this
+        excludes other threads as well as other processes.
+        """
+        if fcntl is None:
+            yield
+            return
+        path = self.staging_lock_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            # Transactions are opened explicitly (BEGIN IMMEDIATE) below
+            conn = sqlite3.connect(self.index_path, timeout=DOCUMENT_INDEX_BUSY_TIMEOUT, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Write transaction. It holds the database's write lock, which also
+        serializes the object file moves and deletes made inside it across
+        worker processes.
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def _import_json_index(self):
+        """Move the index of a store written before the SQLite index into it, once."""
+        json_path = os.path.join(self.root, "index.json")
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable document index {json_path}: {e}")
+            return
+        with self.transaction() as conn:
+            for digest, obj in data.get("objects", {}).items():
+                extraction = obj.get("extraction")
+                conn.execute(
+                    "INSERT OR IGNORE INTO objects (digest, ext, size, extraction) VALUES (?, ?, ?, ?)",
+                    (digest, obj["ext"], obj["size"], json.dumps(extraction) if extraction else None))
+            for url, entry in data.get("urls", {}).items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO urls (url, digest, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, entry["digest"], entry.get("etag"), entry.get("last_modified"), entry.get("fetched_at")))
+            os.replace(json_path, json_path + ".imported")
+        logger.info(f"Imported document index {json_path} into {self.index_path}")
+
+    def lookup(self, url):
+        """(path, index entry) for url's stored document, or None if it has none."""
+        row = self.connection().execute(
+            "SELECT urls.digest, etag, last_modified, fetched_at, ext FROM urls "
+            "JOIN objects ON objects.digest = urls.digest WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(row["digest"], row["ext"])
+        # Someone may have cleaned the directory by hand
+        if not is_valid_file(path):
+            return None
+        return path, {key: row[key] for key in ("digest", "etag", "last_modified", "fetched_at")}
+
+    def touch(self, url, headers=None):
+        """Record that url was just revalidated (a 304) without changing its content."""
+        headers = headers or {}
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE urls SET fetched_at = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), headers.get("ETag"), headers.get("Last-Modified"), url))
+
+    def commit(self, url, staging, digest, headers=None):
+        """
+        Move a finished download into the store under its digest and point url
+        at it. If the content is already stored the download is dropped.
+        headers are the response's, for revalidating later. Returns the object's path.
+        """
+        headers = headers or {}
+        size = os.path.getsize(staging)
+        with self.transaction() as conn:
+            existing = conn.execute("SELECT ext FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if existing:
+                path = self.object_path(digest, existing["ext"])
+            else:
+                path = self.object_path(digest, os.path.splitext(staging)[1])
+
+            if existing and os.path.exists(path):
+                os.remove(staging)
+                self._count("deduplicated")
+                self._count("bytes_saved", size)
+                logger.info(f"Already stored as {digest[:12]}: {url}")
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(staging, path)
+                conn.execute(
+                    "INSERT INTO objects (digest, ext, size) VALUES (?, ?, ?) ON CONFLICT (digest) "
+                    "DO UPDATE SET ext = excluded.ext, size = excluded.size, extraction = NULL",
+                    (digest, os.path.splitext(path)[1], size))
+                self._count("stored")
+
+            previous = conn.execute("SELECT digest FROM urls WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT INTO urls (url, digest, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET digest = excluded.digest, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, fetched_at = excluded.fetched_at",
+                (url, digest, headers.get("ETag"), headers.get("Last-Modified"), time.time()))
+            if previous and previous["digest"] != digest:
+                self._unref(conn, previous["digest"])
+        return path
+
+    def extraction(self, path):
+        """What was recorded about extracting the text of the object at path, or None."""
+        row = self.connection().execute(
+            "SELECT extraction FROM objects WHERE digest = ?", (digest_of(path),)).fetchone()
+        return json.loads(row["extraction"]) if row and row["extraction"] else None
+
+    def record_extraction(self, path, metadata):
+        """Remember how the object at path had its text extracted; dropped with the object."""
+        with self.transaction() as conn:
+            conn.execute("UPDATE objects SET extraction = ? WHERE digest = ?",
+                         (json.dumps(metadata), digest_of(path)))
+
+    def release(self, url):
+        """Forget url; its document is deleted once no other URL references it."""
+        with self.transaction() as conn:
+            row = conn.execute("DELETE FROM urls WHERE url = ? RETURNING digest", (url,)).fetchone()
+            if row is not None:
+                self._unref(conn, row["digest"])
+
+    def _unref(self, conn, digest):
+        """Delete digest's object if no URL references it any more. Caller holds the transaction."""
+        if conn.execute("SELECT 1 FROM urls WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        obj = conn.execute("DELETE FROM objects WHERE digest = ? RETURNING ext", (digest,)).fetchone()
+        if obj is None:
+            return
+        path = self.object_path(digest, obj["ext"])
+        for stale in (path, text_path(path), converted_path(path, ".docx")):
+            if os.path.exists(stale):
+                os.remove(stale)
+        self._count("released")
+        logger.info(f"Deleted unreferenced document {digest[:12]}")
+
+    def health(self):
+        conn = self.connection()
+        objects, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+        with self.lock:
+            stats = dict(self.stats)
+        return {
+            "urls": conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0],
+            "objects": objects,
+            "bytes": size,
+            **stats,
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(output_dir):
+    """The process-wide store living under output_dir."""
+    root = os.path.join(output_dir, DOCUMENT_STORE_SUBDIR)
+    key = os.path.abspath(root)
+    with _stores_lock:
+        if key not in _stores:
+            # Paths stay relative to output_dir, like the rest of the scraped data
+            _stores[key] = DocumentStore(root)
+        return _stores[key]
+
+
+def store_stats():
+    with _stores_lock:
+        stores = dict(_stores)
+    return {root: store.health() for root, store in stores.items()}
+
+
+def fetch_document(url, output_dir, timeout=60, ttl=None, **kwargs):
+    """
+    Path of url's document in the store, downloading it if needed.
+
+    A stored document is used as-is unless ttl (seconds) is given and has
+    passed, in which case it is revalidated with a conditional GET. Returns
+    (path, outcome) with outcome "cached", "revalidated" or "downloaded".
+    """
+    store = get_store(output_dir)
+    found = store.lookup(url)
+    headers = {}
+    if found:
+        path, entry = found
+        if ttl is None or time.time() - entry.get("fetched_at", 0) < ttl:
+            return path, "cached"
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    # Every downloader of url (this one, the async downloader, other workers)
+    # writes the same staging file, so only one may be at it at a time
+    with store.staging_lock(url):
+        if not found:
+            # It may have been stored while we waited for the lock
+            stored = store.lookup(url)
+            if stored:
+                return stored[0], "cached"
+
+        staging = store.staging_path(url)
+        # A leftover complete file (crash between download and commit) is hashed as-is
+        if os.path.exists(staging) and is_valid_file(staging) and not found:
+            discard_partial(staging)
+            return store.commit(url, staging, hash_file(hashlib.sha256(), staging).hexdigest()), "downloaded"
+
+        hasher = hashlib.sha256()
+        response = download_to_file(url, staging, timeout=timeout, headers=headers, hasher=hasher, **kwargs)
+        if response.status_code == 304:
+            if not found:
+                # We sent no validators, so this shouldn't happen; treat it as a miss
+                raise DownloadValidationError(f"Unexpected 304 for {url}")
+            store.touch(url, response.headers)
+            return found[0], "revalidated"
+        return store.commit(url, staging, hasher.hexdigest(), response.headers), "downloaded"
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Extraction Cache - Extracted text keyed by content and extractor version
+A document's text is cached under (content digest, extractor, extractor
+version). The digest comes from the document store, so identical documents
+behind different URLs share one extraction and a document whose content
+changes gets a new one. The extractor version is the library's version plus
+a revision kept here, so upgrading pdfminer or changing how text is produced
+re-extracts on next use instead of needing a manual purge.
+
+The text stays in the .txt sidecar next to the stored object; the key and
+metadata (pages, characters, seconds taken) are recorded in the document
+store's index and go away with the object.
+
+Usage: extraction_cache.py FILE [OUTPUT_DIR]
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from importlib import metadata as importlib_metadata
+
+from document_store import get_store, text_path
+
+logger = logging.getLogger(__name__)
+
+# extension -> (extractor name, distribution whose version it depends on, revision).
+# Bump a revision when a change alters the text that extractor produces.
+EXTRACTORS = {
+    ".pdf": ("pdfminer", "pdfminer.six", 1),
+    ".docx": ("python-docx", "python-docx", 1),
+    ".doc": ("libreoffice", None, 1),
+    ".txt": ("plain", None, 1),
+}
+
+# Extractors that stand in when an extension's own one fails: name -> (distribution, revision).
+# Their text is recorded under their own name, so it is never taken for the
+# usual extractor's and is re-extracted once that one works again.
+FALLBACK_EXTRACTORS = {
+    "antiword": (None, 1),
+}
+
+_stats = {"hits": 0, "misses": 0, "stale": 0, "stored": 0, "seconds_saved": 0.0}
+_stats_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _distribution_version(distribution):
+    try:
+        return importlib_metadata.version(distribution)
+    except importlib_metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def extractor_for(filepath):
+    """(name, version) of the extractor that handles filepath, or None if none does."""
+    entry = EXTRACTORS.get(os.path.splitext(filepath)[1].lower())
+    if entry is None:
+        return None
+    name, distribution, revision = entry
+    return name, _version(distribution, revision)
+
+
+def _version(distribution, revision):
+    return f"{_distribution_version(distribution)}+r{revision}" if distribution else f"r{revision}"
+
+
+def _fallback_extractor(name):
+    distribution, revision = FALLBACK_EXTRACTORS[name]
+    return name, _version(distribution, revision)
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def cached_extraction(filepath, output_dir):
+    """
+    (text, metadata) cached for the stored document at filepath by its
+    current extractor, or None. Runs before any extraction work.
+    """
+    extractor = extractor_for(filepath)
+    recorded = get_store(output_dir).extraction(filepath)
+    if extractor is None or recorded is None:
+        _count("misses")
+        return None
+    if (recorded.get("extractor"), recorded.get("version")) != extractor:
+        logger.info(f"Cached text of {os.path.basename(filepath)} is from {recorded.get('extractor')} "
+                    f"{recorded.get('version')}; re-extracting with {extractor[0]} {extractor[1]}")
+        _count("stale")
+        return None
+    try:
+        with open(text_path(filepath), "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        _count("misses")
+        return None
+    _count("hits")
+    _count("seconds_saved", recorded.get("seconds") or 0.0)
+    return text, recorded
+
+
+def has_current_extraction(filepath, output_dir):
+    """Whether filepath's cached text is from its current extractor, without reading the text."""
+    extractor = extractor_for(filepath)
+    recorded = get_store(output_dir).extraction(filepath)
+    return (extractor is not None and recorded is not None
+            and (recorded.get("extractor"), recorded.get("version")) == extractor
+            and os.path.exists(text_path(filepath)))
+
+
+def save_extraction(filepath, output_dir, text, seconds, pages=None, fallback=None):
+    """
+    Write filepath's text sidecar (atomically; documents are shared) and
+    record its key. fallback names the FALLBACK_EXTRACTORS entry that produced
+    the text when filepath's own extractor did not. Returns the metadata.
+    """
+    if fallback is not None:
+        name, version = _fallback_extractor(fallback)
+    else:
+        name, version = extractor_for(filepath) or ("unknown", "unknown")
+    text_filepath = text_path(filepath)
+    tmp_text_filepath = f"{text_filepath}.{os.getpid()}.tmp"
+    with open(tmp_text_filepath, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_text_filepath, text_filepath)
+
+    recorded = {
+        "extractor": name,
+        "version": version,
+        "pages": pages,
+        "chars": len(text),
+        "seconds": round(seconds, 3),
+        "extracted_at": time.time(),
+    }
+    get_store(output_dir).record_extraction(filepath, recorded)
+    _count("stored")
+    return recorded
+
+
+def text_pages(filepath, text):
+    """Pages in extracted text: PDF text ends every page with a form feed."""
+    return text.count("\f") if filepath.lower().endswith(".pdf") else None
+
+
+def extract_cached(filepath, output_dir, extract):
+    """
+    Text of the stored document at filepath, from the cache or by calling
+    extract(filepath), which returns (text, fallback) with fallback as in
+    save_extraction. Empty text is not cached, so it is retried next time.
+    Returns (text, metadata, cached); metadata is None when nothing was cached.
+    """
+    found = cached_extraction(filepath, output_dir)
+    if found is not None:
+        return found[0], found[1], True
+
+    started = time.time()
+    text, fallback = extract(filepath)
+    if not text:
+        return text, None, False
+    return text, save_extraction(filepath, output_dir, text, time.time() - started, text_pages(filepath, text),
+                                 fallback), False
+
+
+def extraction_cache_stats():
+    with _stats_lock:
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in _stats.items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(json.dumps({"success": False, "error": "A stored document path is required"}))
+        sys.exit(1)
+
+    path = sys.argv[1]
+    found = cached_extraction(path, sys.argv[2] if len(sys.argv) > 2 else "scraped_data")
+    print(json.dumps({"success": True, "extractor": extractor_for(path), "cached": found is not None,
+                      "metadata": found[1] if found else None}))
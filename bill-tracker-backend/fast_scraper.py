@@ -6,7 +6,6 @@ or using Selenium for a much faster response.
 """
 
 import requests
-from bs4 import BeautifulSoup
 import json
 import re
 import os
@@ -14,6 +13,11 @@ import logging
 import sys
 import time
 from urllib.parse import urlparse
+from bill_page_parser import parse_bill_page
+from http_cache import cached_get, DOCUMENT_TTL
+from document_store import fetch_document
+from bill_store import save_bill
+from single_flight import coalesce
 
 # Set up logging
 logging.basicConfig(
@@ -28,8 +32,12 @@ def fast_scrape(url, output_dir="scraped_data"):
     Performs a lightweight scrape focused on speed - gets only essential data
     without downloading any documents or using Selenium.
     
-    Returns structured data within 2 seconds or less.
+    Returns structured data within 2 seconds or less. Concurrent calls for the
+    same bill share a single scrape.
     """
+    return coalesce("fast_scrape", url, _fast_scrape, url, output_dir)
+
+def _fast_scrape(url, output_dir):
     start_time = time.time()
     logger.info(f"FAST SCRAPE: Starting rapid scrape of {url}")
     
@@ -49,18 +57,10 @@ def fast_scrape(url, output_dir="scraped_data"):
     }
     
     try:
-        # Use requests with a short timeout instead of Selenium
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        # Use a very short timeout to ensure fast response
-        response = requests.get(url, headers=headers, timeout=1.5)
+        # Fetch through the revalidating disk cache with a short timeout instead
+        # of Selenium; repeat views are served from disk or cost only a 304
+        response = cached_get(url, timeout=1.5)
+        logger.info(f"Bill page served from {response.source}")
         
         if response.status_code != 200:
             logger.error(f"Failed to fetch page: {response.status_code}")
@@ -70,169 +70,54 @@ def fast_scrape(url, output_dir="scraped_data"):
             }
             
         html_content = response.text
-        soup = BeautifulSoup(html_content, 'html.parser')
+        page = parse_bill_page(html_content)
         
         # Extract critical bill information
-        # Extract measure number from heading
-        header = soup.find('h1', class_=lambda c: c and "text-2xl" in c)
-        if header:
-            data["measure_number"] = header.get_text(strip=True)
-            
-        # Extract filing date
-        filing_date_elem = soup.find('span', string=lambda s: s and "Fecha de Radicación" in s)
-        if filing_date_elem:
-            date_span = filing_date_elem.find_next('span', class_=lambda c: c and "text-xs" in c)
-            if date_span:
-                data["filing_date"] = date_span.get_text(strip=True)
-        
-        # Extract title
-        title_elem = soup.find('span', string=lambda s: s and "Título" in s)
-        if title_elem:
-            title_span = title_elem.find_next('span', class_="text-balance")
-            if title_span:
-                data["title"] = title_span.get_text(strip=True)
-        
-        # Extract authors (simplified)
-        authors_div = soup.find(lambda tag: tag.name == 'div' and tag.get_text(strip=True) == 'Autores')
-        if authors_div:
-            author_spans = authors_div.find_next('div').find_all('span')
-            for span in author_spans:
-                if span.get_text(strip=True) and not any(kw in span.get_text().lower() for kw in ["autor", "fecha"]):
-                    data["authors"].append(span.get_text(strip=True))
+        data["measure_number"] = page["measure_number"]
+        data["filing_date"] = page["filing_date"]
+        data["title"] = page["title"]
+        data["authors"] = page["authors"]
                     
-        # Extract events efficiently (limit processing time)
-        # This is the most important part for the timeline view
-        event_items = soup.find_all('li', class_=lambda c: c and "relative flex justify-between" in c)
+        # Extract events - this is the most important part for the timeline view.
+        # The parser walks each event once, so every event is returned with
+        # its full fields well within the time budget.
+        event_items = page["events"]
         logger.info(f"Found {len(event_items)} event items")
         
-        # Process only a limited number of events if there are too many
-        # to ensure we stay within the time budget
-        MAX_EVENTS_INITIAL = 15  # Limit initial processing 
-        for i, event_item in enumerate(event_items[:MAX_EVENTS_INITIAL]):
-            # Extract event title/type
-            event_title_elem = event_item.find('span', class_="text-sutra-primary")
-            if not event_title_elem:
-                continue
-                
-            event_title = event_title_elem.get_text(strip=True)
-            
+        for event in event_items:
             # Initialize event data with lightweight metadata only
             event_data = {
-                "descripcion": event_title,
-                "fecha": None,
+                "descripcion": event["descripcion"],
+                "fecha": event["fecha"],
                 "documents": [],  # Start with empty documents, will load on-demand later
                 "tipo": "tramite"  # Default type
             }
             
-            # Extract date - critical for timeline
-            date_elem = event_item.find('span', string=lambda s: s and "Fecha:" in s)
-            if date_elem:
-                date_parent = date_elem.parent
-                event_data["fecha"] = date_parent.get_text(strip=True).replace("Fecha:", "").strip()
-            
-            # Extract commission information (lightweight)
-            all_paragraphs = event_item.find_all('p', class_="mt-1 flex text-xs leading-5 text-gray-500")
-            for p in all_paragraphs:
-                if p.find('span', string=lambda s: s and "Fecha:" in s) or p.find('a'):
-                    continue
-                
-                commission_text = p.get_text(strip=True)
-                if commission_text and "Comisión" in commission_text:
-                    event_data["comision"] = commission_text
-                    break
+            if "comision" in event:
+                event_data["comision"] = event["comision"]
                     
             # For document links, only collect URLs and descriptions - NO DOWNLOADING
             # This is critical for speed
-            doc_links = event_item.find_all('a', href=True)
-            for link in doc_links:
-                doc_url = link['href']
-                # Skip User-Manual files
-                if "User-Manual" in doc_url:
-                    continue
-                    
-                # Make sure URL is absolute
-                if not doc_url.startswith("http"):
-                    doc_url = "https://sutra.oslpr.org" + doc_url
-                    
-                # Get description but keep it minimal
-                doc_desc_elem = link.find('span', class_=lambda c: c and "text-sutra-secondary" in c)
-                doc_desc = doc_desc_elem.get_text(strip=True) if doc_desc_elem else "Document"
-                
-                # Store only URL and description - no file downloading
+            for doc in event["documents"]:
                 event_data["documents"].append({
-                    "link_url": doc_url,
-                    "description": doc_desc,
+                    "link_url": doc["link_url"],
+                    "description": doc["description"],
                     "downloaded": False,  # Mark as not downloaded
                     "text_extracted": False
                 })
             
-            # Determine if this is a vote event and collect basic vote data
-            if "Votación" in event_title or "Aprobado" in event_title:
+            # Vote events carry their basic vote data
+            if "votes" in event:
                 event_data["tipo"] = "votacion"
-                
-                # Try to extract vote counts if they exist
-                vote_counts = {}
-                vote_elements = event_item.find_all('span', string=lambda s: s and any(x in s for x in ["Votos a favor", "Votos en contra", "Votos abstenidos", "Votos ausentes"]))
-                
-                for vote_elem in vote_elements:
-                    vote_type = vote_elem.get_text(strip=True).rstrip(":")
-                    vote_value_elem = vote_elem.parent
-                    if vote_value_elem:
-                        try:
-                            vote_text = vote_value_elem.get_text(strip=True).replace(vote_type, "").strip()
-                            vote_counts[vote_type] = int(vote_text) if vote_text.isdigit() else vote_text
-                        except:
-                            pass
-                
-                event_data["votes"] = vote_counts if vote_counts else None
-                event_data["camara"] = "Senado" if "Senado" in event_title else "Cámara"
+                event_data["votes"] = event["votes"]
+                event_data["camara"] = "Senado" if "Senado" in event["descripcion"] else "Cámara"
                 
             # Add event to the eventos array
             data["eventos"].append(event_data)
             
-        # Check remaining time budget
         elapsed_time = time.time() - start_time
         logger.info(f"Processed {len(data['eventos'])} events in {elapsed_time:.2f} seconds")
         
-        # If we still have time, try to process more events
-        if elapsed_time < 1.0 and len(event_items) > MAX_EVENTS_INITIAL:
-            remaining_events = event_items[MAX_EVENTS_INITIAL:]
-            logger.info(f"Processing {len(remaining_events)} additional events with remaining time")
-            
-            # Process as many as we can in the remaining time
-            for event_item in remaining_events:
-                # Check time after each event to ensure we don't exceed budget
-                if time.time() - start_time > 1.8:  # Stop if we're getting close to 2 seconds
-                    logger.info("Time budget nearly exceeded, stopping event processing")
-                    break
-                    
-                # Same extraction logic as above but simplified even further for speed
-                event_title_elem = event_item.find('span', class_="text-sutra-primary")
-                if not event_title_elem:
-                    continue
-                    
-                event_title = event_title_elem.get_text(strip=True)
-                event_data = {
-                    "descripcion": event_title,
-                    "fecha": None,
-                    "documents": [],
-                    "tipo": "votacion" if "Votación" in event_title or "Aprobado" in event_title else "tramite"
-                }
-                
-                # Extract only critical date information
-                date_elem = event_item.find('span', string=lambda s: s and "Fecha:" in s)
-                if date_elem and date_elem.parent:
-                    event_data["fecha"] = date_elem.parent.get_text(strip=True).replace("Fecha:", "").strip()
-                
-                # Add placeholder for document count instead of full document data
-                doc_links = event_item.find_all('a', href=True)
-                doc_count = len([link for link in doc_links if any(ext in link['href'].lower() 
-                                                               for ext in ['.pdf', '.doc', '.docx'])])
-                if doc_count > 0:
-                    event_data["document_count"] = doc_count
-                    
-                data["eventos"].append(event_data)
-        
         # Sort eventos by fecha (date) with most recent first - critical for timeline view
         def parse_date(date_str):
             if not date_str:
@@ -256,6 +141,9 @@ def fast_scrape(url, output_dir="scraped_data"):
         logger.info(f"FAST SCRAPE: Completed in {total_time:.2f} seconds")
         data["scrape_time"] = total_time
         
+        # Keep it in the bill store, so the server can serve it without a scrape
+        save_bill(url, data, "fast")
+        
         # Return the data
         return data
         
@@ -279,54 +167,24 @@ def fast_scrape(url, output_dir="scraped_data"):
 def on_demand_document_processor(doc_url, output_dir="scraped_data"):
     """
     Process a single document on-demand when a user wants to view it.
+    Concurrent requests for the same document share one download.
     """
+    return coalesce(f"document:{os.path.abspath(output_dir)}", doc_url, _process_document, doc_url, output_dir)
+
+def _process_document(doc_url, output_dir):
     try:
         # Use the URL as-is without sanitization
-        # Generate a safe filename from the URL
-        import hashlib
-        
-        # Create a safe filename based on the URL hash + original extension
-        url_hash = hashlib.md5(doc_url.encode()).hexdigest()
-        extension = os.path.splitext(doc_url)[1]
-        if not extension:
-            extension = '.bin'  # Default extension if none found
-        safe_filename = f"{url_hash}{extension}"
-        
-        filepath = os.path.join(output_dir, safe_filename)
-        
         # Create directory if it doesn't exist
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
             
-        # Check if file already exists
-        if os.path.exists(filepath):
-            return {
-                "link_url": doc_url,
-                "description": os.path.basename(doc_url),
-                "filepath": filepath,
-                "downloaded": True,
-                "text_extracted": False
-            }
-            
-        # Download the file
-        logger.info(f"Downloading document on demand: {doc_url}")
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        })
-        
+        # Stored under the SHA-256 of its content, shared with any other URL
+        # serving the same file; an old copy is revalidated before reuse
+        logger.info(f"Fetching document on demand: {doc_url}")
+
         # Use a longer timeout for larger documents
-        response = session.get(doc_url, stream=True, timeout=30, verify=False)
-        response.raise_for_status()
-        
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                
-        logger.info(f"Successfully downloaded document to {filepath}")
+        filepath, outcome = fetch_document(doc_url, output_dir, timeout=30, ttl=DOCUMENT_TTL, verify=False)
+        logger.info(f"Document {outcome}: {filepath}")
         
         return {
             "link_url": doc_url,
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+File Download - Resumable, atomic document downloads
+Bodies are streamed into "<file>.part" and only renamed over the final path once
+the size matches Content-Length and the first bytes look like the promised file
+type. An interrupted transfer leaves the .part behind and the next attempt picks
+it up with an HTTP Range request, so a large PDF is never fetched twice and a
+truncated one is never served.
+"""
+
+import json
+import logging
+import os
+import re
+
+import requests
+
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes expected for each document type. SUTRA serves some ".doc" files
+# that are really RTF or DOCX, so those are accepted too.
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_MAGIC = b'PK\x03\x04'
+MAGIC_BYTES = {
+    '.pdf': (b'%PDF',),
+    '.docx': (ZIP_MAGIC,),
+    '.doc': (OLE_MAGIC, ZIP_MAGIC, b'{\\rtf'),
+    '.rtf': (b'{\\rtf',),
+}
+# Some PDFs carry junk before the header; readers accept it within the first KB
+MAGIC_SEARCH_BYTES = 1024
+
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+class DownloadValidationError(requests.exceptions.RequestException):
+    """The downloaded body is truncated or is not the file type it claims to be."""
+
+
+def partial_path(filepath):
+    return filepath + ".part"
+
+
+def _partial_meta_path(filepath):
+    return filepath + ".part.json"
+
+
+def check_magic(filepath, head):
+    """True if head (the first bytes of the file) matches its extension, or the type is unchecked."""
+    expected = MAGIC_BYTES.get(os.path.splitext(filepath)[1].lower())
+    if not expected:
+        return True
+    window = head[:MAGIC_SEARCH_BYTES]
+    if filepath.lower().endswith('.pdf'):
+        return b'%PDF' in window
+    return any(head.startswith(magic) for magic in expected)
+
+
+def is_valid_file(filepath):
+    """Cheap sanity check for a file already on disk: non-empty with the right magic bytes."""
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(MAGIC_SEARCH_BYTES)
+    except OSError:
+        return False
+    return bool(head) and check_magic(filepath, head)
+
+
+def validate_download(filepath, part, expected_size):
+    """Raise DownloadValidationError unless part is complete and of the right type."""
+    size = os.path.getsize(part)
+    if expected_size is not None and size != expected_size:
+        raise DownloadValidationError(f"Incomplete download: got {size} of {expected_size} bytes")
+    with open(part, 'rb') as f:
+        head = f.read(MAGIC_SEARCH_BYTES)
+    if not head:
+        raise DownloadValidationError("Downloaded file is empty")
+    if not check_magic(filepath, head):
+        raise DownloadValidationError(
+            f"Downloaded file does not look like a {os.path.splitext(filepath)[1]} (starts with {head[:16]!r})")
+
+
+def load_partial_meta(filepath):
+    try:
+        with open(_partial_meta_path(filepath), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_partial_meta(filepath, meta):
+    with open(_partial_meta_path(filepath), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def discard_partial(filepath):
+    for path in (partial_path(filepath), _partial_meta_path(filepath)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def resume_headers(filepath):
+    """Range/If-Range headers for continuing an interrupted download of filepath, if any."""
+    part = partial_path(filepath)
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    if not offset:
+        return {}, 0
+    headers = {"Range": f"bytes={offset}-"}
+    # If-Range makes the server send the whole file instead if it changed since
+    meta = load_partial_meta(filepath)
+    validator = meta.get("etag") or meta.get("last_modified")
+    if validator:
+        headers["If-Range"] = validator
+    return headers, offset
+
+
+def expected_total_size(status, headers, offset):
+    """Full file size promised by a 200/206 response, or None if the server didn't say."""
+    if status == 206:
+        match = CONTENT_RANGE_RE.match(headers.get("Content-Range", ""))
+        if match and match.group(3) != '*':
+            return int(match.group(3))
+        length = headers.get("Content-Length")
+        return offset + int(length) if length and length.isdigit() else None
+    length = headers.get("Content-Length")
+    # A compressed body's Content-Length is not the size we end up writing
+    if headers.get("Content-Encoding", "identity") not in ("", "identity"):
+        return None
+    return int(length) if length and length.isdigit() else None
+
+
+def start_partial(filepath, status, headers, offset):
+    """
+    Decide where the body of a 200/206 response goes in the .part file.
+    Returns (write offset, expected total size).
+    """
+    if status == 206:
+        match = CONTENT_RANGE_RE.match(headers.get("Content-Range", ""))
+        if not match or int(match.group(1)) != offset:
+            discard_partial(filepath)
+            raise DownloadValidationError(f"Server resumed at the wrong offset: {headers.get('Content-Range')}")
+    else:
+        # Full body: any earlier partial data is obsolete
+        offset = 0
+    save_partial_meta(filepath, {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    })
+    return offset, expected_total_size(status, headers, offset)
+
+
+def finish_partial(filepath, expected_size):
+    """Validate the .part file and atomically move it into place."""
+    part = partial_path(filepath)
+    try:
+        validate_download(filepath, part, expected_size)
+    except DownloadValidationError:
+        # Corrupt or wrong content; start from scratch next time
+        discard_partial(filepath)
+        raise
+    os.replace(part, filepath)
+    if os.path.exists(_partial_meta_path(filepath)):
+        os.remove(_partial_meta_path(filepath))
+
+
+def hash_file(hasher, path, length=None):
+    """Feed the first length bytes of path (all of it if None) into hasher."""
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher
+
+
+def download_to_file(url, filepath, timeout=60, headers=None, session=None, hasher=None, **kwargs):
+    """
+    Stream url into filepath atomically, resuming an earlier partial download.
+
+    Extra headers (e.g. conditional-GET validators) are sent along; a 304 is
+    returned untouched without writing anything. If hasher (a hashlib object)
+    is given, every byte of the file is fed through it as it is written,
+    including the part kept from an earlier attempt. Returns the response.
+    """
+    session = session or get_session()
+    request_headers, offset = resume_headers(filepath)
+    # Byte ranges and Content-Length only line up with what we write if the
+    # body isn't compressed in transit
+    request_headers["Accept-Encoding"] = "identity"
+    request_headers.update(headers or {})
+    if offset:
+        logger.info(f"Resuming {url} from byte {offset}")
+
+    response = session.get(url, headers=request_headers, stream=True, timeout=timeout, **kwargs)
+    with response:
+        if response.status_code == 304:
+            return response
+        if response.status_code == 416 and offset:
+            # Nothing left to fetch, or the partial is bogus; the size check decides
+            match = re.match(r'bytes \*/(\d+)', response.headers.get("Content-Range", ""))
+            finish_partial(filepath, int(match.group(1)) if match else None)
+            if hasher is not None:
+                hash_file(hasher, filepath)
+            return response
+        response.raise_for_status()
+
+        offset, expected_size = start_partial(filepath, response.status_code, response.headers, offset)
+        if hasher is not None and offset:
+            hash_file(hasher, partial_path(filepath), offset)
+        with open(partial_path(filepath), 'r+b' if offset else 'wb') as f:
+            f.seek(offset)
+            f.truncate()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+    finish_partial(filepath, expected_size)
+    return response
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+HTTP Cache - On-disk conditional-GET cache for SUTRA pages
+Stores ETag/Last-Modified with every response and revalidates with
+If-None-Match/If-Modified-Since, so a repeat view of an unchanged bill costs a
+304 instead of a full page transfer. Bill pages are served stale while a
+background refetch revalidates them. (Documents are revalidated the same way
+by document_store.)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "http_cache")
+# Bill pages younger than this are served without touching the network...
+BILL_PAGE_TTL = float(os.environ.get("BILL_PAGE_TTL", 60))
+# ...and up to this old they are served immediately while revalidating in the background
+BILL_PAGE_STALE_WHILE_REVALIDATE = float(os.environ.get("BILL_PAGE_STALE_WHILE_REVALIDATE", 24 * 3600))
+# Documents rarely change once filed; revalidate them at most this often
+DOCUMENT_TTL = float(os.environ.get("DOCUMENT_TTL", 24 * 3600))
+
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+_stats = {"fresh": 0, "stale": 0, "revalidated": 0, "fetched": 0, "stale_on_error": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+class CachedResponse:
+    """The parts of a requests.Response the scrapers use, plus where it came from."""
+
+    def __init__(self, url, status_code, content, headers=None, source="network"):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.source = source  # network, fresh, stale, revalidated, stale_on_error
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get("Content-Type", "")
+        if "charset=" in content_type:
+            return content_type.split("charset=")[-1].split(";")[0].strip()
+        return "utf-8"
+
+
+def cache_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def _meta_path(url, cache_dir):
+    return os.path.join(cache_dir, cache_key(url) + ".json")
+
+
+def load_meta(url, cache_dir=HTTP_CACHE_DIR):
+    try:
+        with open(_meta_path(url, cache_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_meta(url, meta, cache_dir=HTTP_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _meta_path(url, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def validator_headers(meta):
+    """If-None-Match / If-Modified-Since for a cached entry."""
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def response_meta(url, response, body_file=None):
+    return {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_type": response.headers.get("Content-Type"),
+        "fetched_at": time.time(),
+        "body_file": body_file,
+    }
+
+
+def _body_path(url, cache_dir):
+    return os.path.join(cache_dir, cache_key(url) + ".body")
+
+
+def _read_body(meta):
+    try:
+        with open(meta["body_file"], 'rb') as f:
+            return f.read()
+    except (OSError, KeyError, TypeError):
+        return None
+
+
+def _from_meta(url, meta, body, source):
+    _count(source)
+    headers = {"Content-Type": meta.get("content_type") or ""}
+    return CachedResponse(url, 200, body, headers=headers, source=source)
+
+
+def _revalidate(url, meta, timeout, cache_dir, **kwargs):
+    """Conditional GET for url. Returns a CachedResponse or the raw non-200 response."""
+    response = get_session().get(url, headers=validator_headers(meta), timeout=timeout, **kwargs)
+
+    if response.status_code == 304 and meta:
+        body = _read_body(meta)
+        if body is not None:
+            meta["fetched_at"] = time.time()
+            save_meta(url, meta, cache_dir)
+            return _from_meta(url, meta, body, "revalidated")
+        # Validators survived but the body didn't; fall back to a full fetch
+        response = get_session().get(url, timeout=timeout, **kwargs)
+
+    if response.status_code != 200:
+        return response
+
+    body_file = _body_path(url, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{body_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp_path, body_file)
+    save_meta(url, response_meta(url, response, body_file), cache_dir)
+    _count("fetched")
+    return CachedResponse(url, 200, response.content, headers=response.headers, source="network")
+
+
+def _revalidate_in_background(url, meta, timeout, cache_dir, **kwargs):
+    with _revalidating_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+
+    def run():
+        try:
+            _revalidate(url, meta, timeout, cache_dir, **kwargs)
+        except Exception as e:
+            logger.warning(f"Background revalidation of {url} failed: {e}")
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(url)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def cached_get(url, timeout=30, ttl=BILL_PAGE_TTL, stale_while_revalidate=BILL_PAGE_STALE_WHILE_REVALIDATE,
+               cache_dir=HTTP_CACHE_DIR, **kwargs):
+    """
+    GET through the disk cache.
+
+    - younger than ttl: served from disk, no request
+    - younger than ttl + stale_while_revalidate: served from disk, refetched in the background
+    - older: conditional GET; a 304 is served from disk
+    If the network fails and any cached copy exists, the stale copy is served.
+    Non-200 responses are returned as-is and never cached.
+    """
+    meta = load_meta(url, cache_dir)
+    body = _read_body(meta) if meta else None
+
+    if body is not None:
+        age = time.time() - meta.get("fetched_at", 0)
+        if age < ttl:
+            return _from_meta(url, meta, body, "fresh")
+        if age < ttl + stale_while_revalidate:
+            _revalidate_in_background(url, dict(meta), timeout, cache_dir, **kwargs)
+            return _from_meta(url, meta, body, "stale")
+    else:
+        meta = None
+
+    try:
+        return _revalidate(url, meta, timeout, cache_dir, **kwargs)
+    except Exception as e:
+        if body is None:
+            raise
+        logger.warning(f"Fetching {url} failed ({e}); serving cached copy")
+        return _from_meta(url, meta, body, "stale_on_error")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - One pooled requests.Session shared by every scraper module
+Keeps connections to sutra.oslpr.org alive between requests so each page or
+document only pays for TCP+TLS setup when the pool actually needs a new socket.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from chrome_pool import USER_AGENT
+from rate_limiter import get_limiter, is_retryable_status, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Sockets kept open per host; should cover the download thread pools
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+# Distinct hosts to keep pools for (SUTRA plus the odd external document host)
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", 4))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 2))
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+_stats = {"requests": 0, "new_connections": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count("new_connections")
+        return super()._new_conn()
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count("new_connections")
+        return super()._new_conn()
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools count every socket they open, and which
+    sends each request through the host's adaptive rate limiter.
+
+    Connection failures are retried by urllib3; throttling and 5xx responses
+    are retried here so the limiter sees them and Retry-After is honored.
+    Other 4xx responses are returned immediately. A streamed response keeps
+    its slot until its body is read to the end or the response is closed.
+    """
+
+    def __init__(self, *args, status_retries=HTTP_MAX_RETRIES, **kwargs):
+        self.status_retries = status_retries
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        limiter = get_limiter(request.url)
+        for attempt in range(self.status_retries + 1):
+            limiter.acquire()
+            start_time = time.monotonic()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                limiter.release(error=True)
+                raise
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            outcome = {"status": response.status_code, "latency": time.monotonic() - start_time,
+                       "retry_after": retry_after}
+            if kwargs.get("stream"):
+                release_when_done(response, lambda: limiter.release(**outcome))
+            else:
+                limiter.release(**outcome)
+
+            if not is_retryable_status(response.status_code) or attempt == self.status_retries:
+                return response
+            logger.warning(f"HTTP {response.status_code} from {request.url}, retrying")
+            response.close()
+            # With a Retry-After the limiter already holds the next acquire back
+            if retry_after is None:
+                time.sleep(2 ** attempt)
+        return response
+
+
+def release_when_done(response, release):
+    """
+    Call release once, when a streamed response's connection goes back to the
+    pool (body read to the end), the response is closed, or it is garbage
+    collected unclosed.
+    """
+    raw = response.raw
+    released = threading.Lock()
+
+    def finish():
+        if released.acquire(blocking=False):
+            release()
+
+    for name in ("release_conn", "close"):
+        original = getattr(raw, name)
+
+        def wrapped(*args, _original=original, **kwargs):
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                finish()
+
+        setattr(raw, name, wrapped)
+    weakref.finalize(raw, finish)
+
+
+def build_retry_policy(total=HTTP_MAX_RETRIES):
+    """Retry connection failures on idempotent requests; statuses are handled by the adapter."""
+    return Retry(
+        total=total,
+        connect=total,
+        read=total,
+        status=0,
+        backoff_factor=1,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+
+
+def build_session(pool_size=HTTP_POOL_SIZE, retries=HTTP_MAX_RETRIES):
+    """A requests.Session with a sized keep-alive pool, retry policy and browser headers."""
+    session = requests.Session()
+    adapter = CountingHTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=pool_size,
+        max_retries=build_retry_policy(retries),
+        status_retries=retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    session.hooks["response"].append(lambda response, *args, **kwargs: _count("requests"))
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide pooled session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+            logger.info(f"HTTP session ready (pool size {HTTP_POOL_SIZE}, {HTTP_MAX_RETRIES} retries)")
+        return _session
+
+
+def connection_stats():
+    """Requests sent vs sockets opened; reused = requests that rode an existing connection."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["reused"] = max(stats["requests"] - stats["new_connections"], 0)
+    stats["reuse_ratio"] = round(stats["reused"] / stats["requests"], 3) if stats["requests"] else None
+    return stats
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+PDF Extractor - Page-parallel PDF text extraction on a process pool
+pdfminer is pure Python and CPU-bound, so a several-hundred-page committee
+report used to hold one core (and the calling thread) for a long time. Here a
+PDF is split into page ranges that worker processes extract in parallel; the
+ranges are joined back in page order, giving the same text pdfminer's
+extract_text returns for the whole file.
+
+Each document has a deadline, enforced inside the workers so a pathological
+page frees its process. Only PDF_MAX_DOCUMENTS documents are extracted at
+once and at most PDF_MAX_QUEUED more may wait, so a burst of extraction
+requests can't oversubscribe the machine. PDF_WORKERS is the process budget
+for the whole host; each of the SCRAPER_WORKER_POOL_SIZE scraper workers
+gets its share.
+
+Usage: pdf_extractor.py FILE.pdf
+"""
+
+import concurrent.futures
+import contextlib
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Extraction processes for the whole host (defaults to one per core). Every
+# scraper worker runs its own pool, so each gets an equal share of them
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", 0)) or os.cpu_count() or 1
+SCRAPER_WORKER_POOL_SIZE = int(os.environ.get("SCRAPER_WORKER_POOL_SIZE", 1))
+PDF_WORKERS_PER_POOL = max(PDF_WORKERS // max(SCRAPER_WORKER_POOL_SIZE, 1), 1)
+# Smallest page range handed to one worker; below this, process overhead wins
+PDF_MIN_PAGES_PER_CHUNK = int(os.environ.get("PDF_MIN_PAGES_PER_CHUNK", 10))
+# Seconds allowed for one document, waiting in the queue included
+PDF_EXTRACT_TIMEOUT = float(os.environ.get("PDF_EXTRACT_TIMEOUT", 120))
+# Documents extracted at once, and documents allowed to wait for a slot
+PDF_MAX_DOCUMENTS = int(os.environ.get("PDF_MAX_DOCUMENTS", 2))
+PDF_MAX_QUEUED = int(os.environ.get("PDF_MAX_QUEUED", 8))
+
+
+class ExtractionTimeout(Exception):
+    """A document took longer than its deadline."""
+
+
+class ExtractionBusy(Exception):
+    """Too many documents are already waiting to be extracted."""
+
+
+def _init_pool_process():
+    """Pool processes share the scraper worker's stdout, its protocol channel; keep prints off it."""
+    sys.stdout = sys.stderr
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout("Page range extraction timed out")
+
+
+def extract_page_range(path, first_page, last_page, deadline):
+    """
+    Runs in a worker process: text of pages first_page..last_page-1 (0-based).
+    Gives up at deadline (a time.time() value) so the worker is freed.
+    """
+    from pdfminer.high_level import extract_text
+
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise ExtractionTimeout("Deadline passed before extraction started")
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return extract_text(path, page_numbers=range(first_page, last_page))
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def count_pages(path):
+    """Pages in a PDF, from its page tree (no page content is parsed)."""
+    from pdfminer.pdfpage import PDFPage
+
+    with open(path, "rb") as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+
+def page_ranges(pages, workers, min_pages=PDF_MIN_PAGES_PER_CHUNK):
+    """Split pages into contiguous (first, last) ranges, about one per worker."""
+    size = max(min_pages, math.ceil(pages / max(workers, 1)))
+    return [(first, min(first + size, pages)) for first in range(0, pages, size)]
+
+
+def streaming_page_ranges(pages, workers, min_pages=PDF_MIN_PAGES_PER_CHUNK):
+    """
+    Like page_ranges, but the ranges start at one page and double up to
+    page_ranges' size, so the first pages come back quickly.
+    """
+    largest = max(min_pages, math.ceil(pages / max(workers, 1)))
+    ranges = []
+    first, size = 0, 1
+    while first < pages:
+        ranges.append((first, min(first + size, pages)))
+        first += size
+        size = min(size * 2, largest)
+    return ranges
+
+
+def split_pages(text):
+    """Split extracted text into pages; each page keeps the form feed pdfminer ends it with."""
+    pages = text.split("\f")
+    tail = pages.pop()
+    return [page + "\f" for page in pages] + ([tail] if tail else [])
+
+
+class PDFExtractor:
+    """A process pool shared by every extraction in this process, with admission control."""
+
+    def __init__(self, workers=PDF_WORKERS_PER_POOL, max_documents=PDF_MAX_DOCUMENTS, max_queued=PDF_MAX_QUEUED):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.slots = threading.BoundedSemaphore(max_documents)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.waiting = 0
+        self.stats = {"documents": 0, "pages": 0, "chunks": 0, "timeouts": 0, "rejected": 0, "failed": 0,
+                      "seconds": 0.0}
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                # spawn: forking a process that runs request threads can copy held locks
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_pool_process)
+                logger.info(f"PDF extraction pool started with {self.workers} processes")
+            return self.executor
+
+    def _reset_executor(self):
+        """Drop a pool whose workers died; the next extraction starts a fresh one."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, path, timeout=PDF_EXTRACT_TIMEOUT):
+        """
+        Text of the PDF at path, pages in order. Raises ExtractionTimeout if it
+        takes longer than timeout seconds (queueing included) and
+        ExtractionBusy if too many documents are already waiting.
+        """
+        started = time.time()
+        deadline = started + timeout
+
+        with self.slot(timeout):
+            pages, ranges, texts = self._extract_ranges(path, deadline, timeout, page_ranges)
+            text = "".join(texts)
+
+        elapsed = time.time() - started
+        self._record(pages, len(ranges), elapsed)
+        logger.info(f"Extracted {pages} pages in {len(ranges)} ranges from {path} in {elapsed:.2f}s")
+        return text
+
+    def iter_pages(self, path, timeout=PDF_EXTRACT_TIMEOUT):
+        """
+        Yields the text of each page of the PDF at path, in order, as soon as
+        the range holding it is extracted. The pages are extracted on the pool
+        under the same slots and deadline as extract(), and joined they are
+        exactly its text. Closing the generator early gives the slot back.
+        """
+        started = time.time()
+        deadline = started + timeout
+
+        with self.slot(timeout):
+            pages, ranges, texts = self._extract_ranges(path, deadline, timeout, streaming_page_ranges)
+            with contextlib.closing(texts):
+                for text in texts:
+                    yield from split_pages(text)
+
+        elapsed = time.time() - started
+        self._record(pages, len(ranges), elapsed)
+        logger.info(f"Streamed {pages} pages in {len(ranges)} ranges from {path} in {elapsed:.2f}s")
+
+    @contextlib.contextmanager
+    def slot(self, timeout):
+        """
+        Hold one of the max_documents extraction slots. Raises ExtractionBusy
+        if too many documents are already waiting and ExtractionTimeout if no
+        slot frees up within timeout seconds.
+        """
+        with self.lock:
+            if self.waiting >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise ExtractionBusy(f"{self.waiting} documents already waiting for PDF extraction")
+            self.waiting += 1
+        try:
+            acquired = self.slots.acquire(timeout=timeout)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        if not acquired:
+            with self.lock:
+                self.stats["timeouts"] += 1
+            raise ExtractionTimeout(f"Waited {timeout:g}s for a PDF extraction slot")
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+    def _extract_ranges(self, path, deadline, timeout, split):
+        """
+        Submit the page ranges split(pages, workers) gives to the pool. Returns
+        (pages, ranges, texts), texts being an iterator over each range's text
+        in page order. Caller holds a slot.
+        """
+        try:
+            pages = count_pages(path)
+            ranges = split(pages, self.workers)
+            executor = self._get_executor()
+            futures = [executor.submit(extract_page_range, path, first, last, deadline) for first, last in ranges]
+        except Exception:
+            with self.lock:
+                self.stats["failed"] += 1
+            raise
+        return pages, ranges, self._results(futures, pages, deadline, timeout)
+
+    def _results(self, futures, pages, deadline, timeout):
+        """Each future's result in order, within the deadline; the rest are cancelled if one fails."""
+        try:
+            for future in futures:
+                yield future.result(timeout=max(deadline - time.time(), 0))
+        except (concurrent.futures.TimeoutError, ExtractionTimeout):
+            with self.lock:
+                self.stats["timeouts"] += 1
+            raise ExtractionTimeout(f"Extracting {pages} pages took longer than {timeout:g}s")
+        except Exception as e:
+            if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                self._reset_executor()
+            with self.lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            # Nothing left to do if we finished; otherwise free the pool for others
+            for future in futures:
+                future.cancel()
+
+    def _record(self, pages, chunks, elapsed):
+        with self.lock:
+            self.stats["documents"] += 1
+            self.stats["pages"] += pages
+            self.stats["chunks"] += chunks
+            self.stats["seconds"] += elapsed
+
+    def health(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "running": self.executor is not None,
+                "waiting": self.waiting,
+                **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.stats.items()},
+            }
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_pdf_extractor():
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = PDFExtractor()
+        return _extractor
+
+
+def pdf_extractor_stats():
+    return _extractor.health() if _extractor is not None else None
+
+
+def extract_pdf_text(path, timeout=PDF_EXTRACT_TIMEOUT):
+    """Text of the PDF at path, extracted page-parallel on the shared pool."""
+    return get_pdf_extractor().extract(path, timeout=timeout)
+
+
+def iter_pdf_pages(path, timeout=PDF_EXTRACT_TIMEOUT):
+    """The PDF at path page by page (each ending in a form feed), extracted on the shared pool."""
+    return get_pdf_extractor().iter_pages(path, timeout=timeout)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: pdf_extractor.py FILE.pdf", file=sys.stderr)
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(extract_pdf_text(sys.argv[1]))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Adaptive concurrency and pacing for requests to SUTRA
+Each host gets an AIMD limiter: concurrency and request rate grow slowly while
+responses come back fast and clean, and are cut in half on 429/5xx, errors or
+rising latency. A token bucket paces request starts and Retry-After pauses the
+host entirely, so bulk jobs run as fast as the server tolerates without
+tripping its throttling.
+"""
+
+import asyncio
+import email.utils
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Requests per second (token refill) and burst size per host
+SUTRA_RATE = float(os.environ.get("SUTRA_RATE", 5))
+SUTRA_MIN_RATE = float(os.environ.get("SUTRA_MIN_RATE", 0.5))
+SUTRA_MAX_RATE = float(os.environ.get("SUTRA_MAX_RATE", 20))
+SUTRA_BURST = int(os.environ.get("SUTRA_BURST", 5))
+# Requests in flight per host
+SUTRA_CONCURRENCY = int(os.environ.get("SUTRA_CONCURRENCY", 4))
+SUTRA_MIN_CONCURRENCY = int(os.environ.get("SUTRA_MIN_CONCURRENCY", 1))
+SUTRA_MAX_CONCURRENCY = int(os.environ.get("SUTRA_MAX_CONCURRENCY", 8))
+# Time to response headers above which the server counts as struggling
+SUTRA_TARGET_LATENCY = float(os.environ.get("SUTRA_TARGET_LATENCY", 2.0))
+# Longest Retry-After pause we honor
+SUTRA_MAX_RETRY_AFTER = float(os.environ.get("SUTRA_MAX_RETRY_AFTER", 120))
+
+# Statuses that mean "slow down"; also the only ones worth retrying
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Don't cut limits more than once per this many seconds, so one burst of
+# failures doesn't collapse them to the floor
+DECREASE_COOLDOWN = 1.0
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0)
+
+
+def is_retryable_status(status):
+    return status in RETRYABLE_STATUSES
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit plus a token bucket for one host."""
+
+    def __init__(self, name, rate=SUTRA_RATE, burst=SUTRA_BURST, concurrency=SUTRA_CONCURRENCY,
+                 min_rate=SUTRA_MIN_RATE, max_rate=SUTRA_MAX_RATE,
+                 min_concurrency=SUTRA_MIN_CONCURRENCY, max_concurrency=SUTRA_MAX_CONCURRENCY,
+                 target_latency=SUTRA_TARGET_LATENCY):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.limit = float(concurrency)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "slow": 0, "decreases": 0, "waited": 0.0}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def try_acquire(self):
+        """Take a slot if one is free. Returns 0 on success, otherwise seconds to wait before trying again."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return 0.05
+            self._refill(now)
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.in_flight += 1
+            self.stats["requests"] += 1
+            return 0
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                break
+            time.sleep(min(wait, 1.0))
+        self._record_wait(started)
+
+    async def acquire_async(self):
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                break
+            await asyncio.sleep(min(wait, 1.0))
+        self._record_wait(started)
+
+    def _record_wait(self, started):
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            with self.lock:
+                self.stats["waited"] += waited
+
+    def release(self, status=None, latency=None, retry_after=None, error=False):
+        """Hand the slot back and adapt limits to how the request went."""
+        with self.lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+            now = time.monotonic()
+
+            if retry_after:
+                retry_after = min(retry_after, SUTRA_MAX_RETRY_AFTER)
+                self.paused_until = max(self.paused_until, now + retry_after)
+                logger.warning(f"{self.name} asked us to wait {retry_after:.1f}s")
+
+            if error or is_retryable_status(status):
+                self.stats["errors" if error else "throttled"] += 1
+                self._decrease(now, 0.5)
+            elif latency is not None and latency > self.target_latency:
+                self.stats["slow"] += 1
+                self._decrease(now, 0.75)
+            else:
+                # Additive increase: about +1 concurrency per window of successes
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / max(self.limit, 1.0))
+                self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def _decrease(self, now, factor):
+        if now - self.last_decrease < DECREASE_COOLDOWN:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit * factor)
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.stats["decreases"] += 1
+        logger.info(f"{self.name} limits cut to {int(self.limit)} concurrent, {self.rate:.1f} req/s")
+
+    def health(self):
+        with self.lock:
+            return {
+                "concurrency": round(self.limit, 2),
+                "rate": round(self.rate, 2),
+                "in_flight": self.in_flight,
+                "paused_for": round(max(self.paused_until - time.monotonic(), 0), 2),
+                **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.stats.items()},
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url):
+    """The process-wide limiter for url's host."""
+    host = urlparse(url).netloc or url
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = AdaptiveLimiter(host)
+        return _limiters[host]
+
+
+def limiter_stats():
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {host: limiter.health() for host, limiter in limiters.items()}
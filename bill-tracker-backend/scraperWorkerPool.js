@@ -0,0 +1,198 @@
+const { spawn } = require('child_process');
+const readline = require('readline');
+const path = require('path');
+
+// Pool of long-lived Python workers (scraper_worker.py) speaking JSON lines
+// over stdin/stdout, so API calls don't pay interpreter startup and imports.
+class ScraperWorkerPool {
+  constructor(options = {}) {
+    this.size = options.size || parseInt(process.env.SCRAPER_WORKER_POOL_SIZE || '2', 10);
+    this.threads = options.threads || parseInt(process.env.SCRAPER_WORKER_THREADS || '4', 10);
+    this.python = options.python || process.env.PYTHON || 'python3';
+    this.script = path.join(__dirname, 'scraper_worker.py');
+    this.workers = [];
+    this.nextWorker = 0;
+    this.nextId = 1;
+    this.stopping = false;
+  }
+
+  start() {
+    for (let i = 0; i < this.size; i++) {
+      this.workers.push(this.spawnWorker());
+    }
+    console.log(`Started ${this.size} scraper workers (${this.threads} threads each)`);
+  }
+
+  spawnWorker() {
+    const child = spawn(this.python, [this.script, '--threads', String(this.threads)], {
+      cwd: __dirname,
+      // Workers split host-wide budgets (e.g. PDF_WORKERS) by the pool size
+      env: { ...process.env, SCRAPER_WORKER_POOL_SIZE: String(this.size) },
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    const worker = { child, pending: new Map(), ready: false, retiring: false, startedAt: Date.now() };
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (parseError) {
+        console.error(`Scraper worker ${child.pid} sent invalid JSON: ${line.substring(0, 200)}`);
+        return;
+      }
+
+      // The first message with no id is the worker announcing it is warm
+      if (message.id === null || message.id === undefined) {
+        if (message.result && message.result.ready) {
+          worker.ready = true;
+          console.log(`Scraper worker ${child.pid} ready`);
+        }
+        return;
+      }
+
+      const request = worker.pending.get(message.id);
+      if (!request) return;
+
+      // Streaming methods send partial results before the final one
+      if (message.partial !== undefined) {
+        if (request.onPartial) request.onPartial(message.partial);
+        return;
+      }
+      worker.pending.delete(message.id);
+      clearTimeout(request.timer);
+
+      if (message.error) {
+        request.reject(new Error(message.error));
+      } else {
+        request.resolve(message.result);
+      }
+    });
+
+    // Worker logging goes to stderr; pass it through to the server log
+    child.stderr.on('data', (data) => process.stderr.write(data));
+
+    child.on('exit', (code, signal) => {
+      console.log(`Scraper worker ${child.pid} exited (code ${code}, signal ${signal})`);
+
+      for (const request of worker.pending.values()) {
+        clearTimeout(request.timer);
+        request.reject(new Error('Scraper worker exited before responding'));
+      }
+      worker.pending.clear();
+
+      // Replace crashed workers; retired workers were already replaced
+      const index = this.workers.indexOf(worker);
+      if (index !== -1) {
+        if (this.stopping || worker.retiring) {
+          this.workers.splice(index, 1);
+        } else {
+          console.warn(`Respawning scraper worker ${child.pid}`);
+          this.workers[index] = this.spawnWorker();
+        }
+      }
+    });
+
+    return worker;
+  }
+
+  pickWorker() {
+    const candidates = this.workers.filter(w => !w.retiring);
+    if (candidates.length === 0) {
+      throw new Error('No scraper workers available');
+    }
+    const readyWorkers = candidates.filter(w => w.ready);
+    const pool = readyWorkers.length > 0 ? readyWorkers : candidates;
+    const worker = pool[this.nextWorker % pool.length];
+    this.nextWorker++;
+    return worker;
+  }
+
+  send(worker, method, params, timeout, onPartial) {
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++;
+      const timer = setTimeout(() => {
+        worker.pending.delete(id);
+        const error = new Error(`Scraper worker timed out after ${timeout}ms running ${method}`);
+        error.code = 'TIMEOUT';
+        reject(error);
+      }, timeout);
+
+      worker.pending.set(id, { resolve, reject, timer, onPartial });
+      worker.child.stdin.write(JSON.stringify({ id, method, params }) + '\n');
+    });
+  }
+
+  // Run a scraper function in the next available worker; onPartial receives
+  // each item a streaming method sends before its final result
+  call(method, params = {}, { timeout = 30000, onPartial = null } = {}) {
+    let worker;
+    try {
+      worker = this.pickWorker();
+    } catch (error) {
+      return Promise.reject(error);
+    }
+    return this.send(worker, method, params, timeout, onPartial);
+  }
+
+  async health() {
+    return Promise.all(this.workers.map(async (worker) => {
+      try {
+        const status = await this.send(worker, 'health', {}, 2000);
+        return { ...status, ready: worker.ready, retiring: worker.retiring };
+      } catch (error) {
+        return { status: 'unresponsive', pid: worker.child.pid, error: error.message };
+      }
+    }));
+  }
+
+  retire(worker) {
+    worker.retiring = true;
+    // The worker stops taking new requests, finishes in-flight ones, then exits
+    this.send(worker, 'shutdown', {}, 5000).catch(() => worker.child.kill('SIGTERM'));
+    worker.child.stdin.end();
+  }
+
+  // Graceful rolling restart: start a replacement before retiring each worker
+  restart() {
+    const oldWorkers = this.workers.slice();
+    for (const worker of oldWorkers) {
+      this.workers.push(this.spawnWorker());
+      this.retire(worker);
+    }
+    console.log(`Restarting ${oldWorkers.length} scraper workers`);
+  }
+
+  // Retire every worker and resolve once they have all exited; workers still
+  // running after timeout ms are killed
+  stop(timeout = 30000) {
+    this.stopping = true;
+    const workers = this.workers.slice();
+    const exited = workers.map((worker) => new Promise((resolve) => {
+      if (worker.child.exitCode !== null || worker.child.signalCode !== null) {
+        resolve();
+        return;
+      }
+      worker.child.once('exit', resolve);
+    }));
+    for (const worker of workers) {
+      this.retire(worker);
+    }
+
+    let timer;
+    const timedOut = new Promise((resolve) => {
+      timer = setTimeout(() => {
+        for (const worker of workers) {
+          if (worker.child.exitCode === null && worker.child.signalCode === null) {
+            console.warn(`Scraper worker ${worker.child.pid} did not stop within ${timeout}ms; killing it`);
+            worker.child.kill('SIGKILL');
+          }
+        }
+        resolve();
+      }, timeout);
+    });
+    return Promise.race([Promise.all(exited), timedOut]).finally(() => clearTimeout(timer));
+  }
+}
+
+module.exports = ScraperWorkerPool;
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Scraper Worker - Long-lived JSON-RPC process for the Node.js server
+Keeps the scraper modules imported between calls so each API request only
+pays for the work itself instead of interpreter startup and heavy imports.
+
+Protocol (one JSON object per line):
+  stdin:  {"id": 1, "method": "fast_scrape", "params": {"url": "..."}}
+  stdout: {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}
+Streaming methods (generators) first send {"id": 1, "partial": {...}} per item.
+"""
+
+import argparse
+import concurrent.futures
+import inspect
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# The protocol channel; set to the real stdout when the worker starts
+protocol_out = sys.stdout
+
+
+class WorkerStop(Exception):
+    """Raised from the SIGTERM handler to break out of the stdin read loop."""
+
+
+class ScraperWorker:
+    """Reads requests from stdin and runs them on a thread pool."""
+
+    def __init__(self, methods, service_stats, threads=4):
+        self.methods = methods
+        self.service_stats = service_stats
+        self.threads = threads
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+        self.write_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests_served = 0
+        self.in_flight = 0
+        self.shutting_down = False
+
+    def send(self, message):
+        line = json.dumps(message)
+        with self.write_lock:
+            protocol_out.write(line + "\n")
+            protocol_out.flush()
+
+    def health(self):
+        with self.stats_lock:
+            return {
+                "status": "draining" if self.shutting_down else "ok",
+                "pid": os.getpid(),
+                "uptime": time.time() - self.started_at,
+                "threads": self.threads,
+                "requests_served": self.requests_served,
+                "in_flight": self.in_flight,
+                **self.service_stats(),
+            }
+
+    def stream(self, request_id, generator):
+        """Send each item a streaming method yields as a partial message; what it returns is the result."""
+        while True:
+            try:
+                self.send({"id": request_id, "partial": next(generator)})
+            except StopIteration as stop:
+                return stop.value
+
+    def run_method(self, request_id, method, params):
+        start_time = time.time()
+        try:
+            result = self.methods[method](**params)
+            if inspect.isgenerator(result):
+                result = self.stream(request_id, result)
+            self.send({"id": request_id, "result": result})
+        except Exception as e:
+            logger.error(f"Worker error in {method}: {str(e)}")
+            self.send({"id": request_id, "error": f"Error: {str(e)}"})
+        finally:
+            with self.stats_lock:
+                self.in_flight -= 1
+                self.requests_served += 1
+            logger.info(f"Worker finished {method} in {time.time() - start_time:.2f} seconds")
+
+    def handle(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.send({"id": None, "error": f"Invalid JSON request: {str(e)}"})
+            return
+
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+
+        # Control methods are answered inline so they never queue behind scrapes
+        if method == "health":
+            self.send({"id": request_id, "result": self.health()})
+            return
+        if method == "shutdown":
+            self.shutting_down = True
+            self.send({"id": request_id, "result": self.health()})
+            return
+
+        if self.shutting_down:
+            self.send({"id": request_id, "error": "Worker is shutting down"})
+            return
+        if method not in self.methods:
+            self.send({"id": request_id, "error": f"Unknown method: {method}"})
+            return
+
+        with self.stats_lock:
+            self.in_flight += 1
+        self.executor.submit(self.run_method, request_id, method, params)
+
+    def serve(self):
+        logger.info(f"Scraper worker {os.getpid()} ready with {self.threads} threads")
+        try:
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    self.handle(line)
+                if self.shutting_down:
+                    break
+        except WorkerStop:
+            self.shutting_down = True
+
+        # Graceful stop: let in-flight requests finish and deliver their results
+        logger.info(f"Scraper worker {os.getpid()} draining {self.in_flight} in-flight requests")
+        self.executor.shutdown(wait=True)
+        logger.info(f"Scraper worker {os.getpid()} stopped after {self.requests_served} requests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-lived scraper worker speaking JSON lines on stdin/stdout")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("SCRAPER_WORKER_THREADS", 4)),
+                        help="Number of requests handled concurrently by this worker")
+    args = parser.parse_args()
+
+    # Everything the scrapers print must stay off the protocol channel, so keep a
+    # handle on the real stdout and send any stray prints to stderr instead
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    # The scraping stack is imported here rather than at the top: the PDF
+    # extraction pool's spawned processes re-run this file as __mp_main__,
+    # and they need none of it
+    import worker_methods
+
+    worker = ScraperWorker(worker_methods.METHODS, worker_methods.service_stats, threads=args.threads)
+
+    # SIGTERM from the server means "finish what you have, then exit"
+    def handle_sigterm(signum, frame):
+        raise WorkerStop()
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    # Tell the server we are warm and ready to take requests
+    worker.send({"id": None, "result": {"ready": True, "pid": os.getpid()}})
+    worker.serve()
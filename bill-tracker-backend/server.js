@@ -1,12 +1,15 @@
 const express = require('express');
-const { exec } = require('child_process');
-const util = require('util'); // For promisifying exec
 const cors = require('cors');
 const app = express();
 const port = process.env.PORT || 3001;
 const fs = require('fs');
 const path = require('path');
 const axios = require('axios');
+const ScraperWorkerPool = require('./scraperWorkerPool');
+
+// Long-lived Python workers for the fast scraper, document and date search calls
+const scraperWorkers = new ScraperWorkerPool();
+scraperWorkers.start();
 
 app.use(cors({
   // Adjust origin in production to your actual domain
@@ -20,14 +23,21 @@ app.use(cors({
 
 app.use(express.json());
 
-app.get('/api/health', (req, res) => {
+app.get('/api/health', async (req, res) => {
     res.json({ 
       status: 'up', 
       timestamp: new Date().toISOString(),
-      message: 'NEW CODE VERSION IS RUNNING!'
+      message: 'NEW CODE VERSION IS RUNNING!',
+      scraperWorkers: await scraperWorkers.health()
     });
   });
 
+// Graceful rolling restart of the Python scraper workers
+app.post('/api/scraper-workers/restart', (req, res) => {
+    scraperWorkers.restart();
+    res.json({ success: true, message: 'Scraper workers restarting' });
+  });
+
 app.post('/api/download-documents', (req, res) => {
     console.log("Received scraper request:", req.body);
     const { sutraUrl } = req.body;
@@ -47,44 +57,21 @@ app.post('/api/download-documents', (req, res) => {
 
     console.log(`Executing Python scraper with URL: ${sanitizedUrl}`);
     
-    console.log("*****************************************************");
-    console.log("EXECUTING PYTHON WITH COMMAND:", `python3 sutra_scraper_enhanced.py "${sanitizedUrl}" --no-extract`);
-    console.log("*****************************************************");
-
-    // Execute the Python scraper with the --no-extract flag to skip text extraction
-    exec(`python3 sutra_scraper_enhanced.py "${sanitizedUrl}" --no-extract`, (error, stdout, stderr) => {
-        if (error) {
-            console.error(`Exec error: ${error}`);
-            console.error(`Stderr: ${stderr}`);
-            return res.status(500).json({ success: false, error: 'Failed to download documents.', details: stderr });
-        }
-
-        try {
-            // The Python script should output JSON
-            console.log("Python script completed successfully");
-            
-            // Check if stdout is empty
-            if (!stdout || stdout.trim() === '') {
-                console.error('Python script returned empty output');
-                return res.status(500).json({ 
-                    success: false, 
-                    error: 'Scraper returned empty output.'
-                });
-            }
-            
-            const result = JSON.parse(stdout);
+    // Run the Selenium scraper in a warm worker (it borrows a pooled Chrome)
+    // without downloading documents or extracting text
+    scraperWorkers.call('scrape_and_download', {
+        url: sanitizedUrl,
+        output_dir: 'scraped_data',
+        skip_downloads: true
+    }, { timeout: 600000 })
+        .then((result) => {
             console.log(`Parsed result with ${result.eventos?.length || 0} eventos`);
             res.json(result);
-        } catch (parseError) {
-          console.error(`JSON parse error: ${parseError}`);
-          console.error(`Raw Python output: ${stdout}`);
-          res.status(500).json({ 
-              success: false, 
-              error: 'Failed to parse Python script output.', 
-              rawOutput: stdout.substring(0, 1000) // Limit output size
-          });
-      }
-  });
+        })
+        .catch((error) => {
+            console.error(`Scraper worker error: ${error.message}`);
+            res.status(500).json({ success: false, error: 'Failed to download documents.', details: error.message });
+        });
 });
 
 app.post('/api/extract-document-text', (req, res) => {
@@ -100,75 +87,24 @@ app.post('/api/extract-document-text', (req, res) => {
   
   console.log(`Extracting text from document on demand: ${sanitizedUrl}`);
   
-  // Create a temporary Python script file
-  const tempDir = path.join(__dirname, 'temp');
-  if (!fs.existsSync(tempDir)) {
-      fs.mkdirSync(tempDir);
-  }
-  
-  const tempFileName = path.join(tempDir, `extract_${Date.now()}.py`);
-  
-  // Write the Python code to the file
-  const pythonCode = `
-import sys
-sys.path.append('.')
-from sutra_scraper_enhanced import download_and_process_doc
-import json
-
-# Process the document WITH text extraction
-result = download_and_process_doc(
-  {"link_url": "${sanitizedUrl}"}, 
-  "scraped_data",
-  extract_text=True
-)
-
-# Print the result as JSON for the Node.js server to parse
-print(json.dumps(result))
-`;
-
-  fs.writeFileSync(tempFileName, pythonCode);
-  
-  // Execute the Python file
-  exec(`python3 ${tempFileName}`, (error, stdout, stderr) => {
-      // Clean up temp file
-      try {
-          fs.unlinkSync(tempFileName);
-      } catch (err) {
-          console.error(`Error removing temp file: ${err}`);
-      }
-      
-      if (error) {
-          console.error(`Exec error: ${error}`);
-          console.error(`Stderr: ${stderr}`);
-          return res.status(500).json({ 
-              success: false, 
-              error: 'Failed to extract document text.', 
-              details: stderr 
-          });
-      }
-
-      try {
-          if (!stdout || stdout.trim() === '') {
-              console.error('Python script returned empty output');
-              return res.status(500).json({ 
-                  success: false, 
-                  error: 'Document processor returned empty output.'
-              });
-          }
-          
-          const result = JSON.parse(stdout);
+  // Process the document WITH text extraction in a warm scraper worker
+  scraperWorkers.call('download_and_process_doc', {
+      doc_info: { link_url: sanitizedUrl },
+      output_dir: 'scraped_data',
+      extract_text: true
+  }, { timeout: 120000 })
+      .then((result) => {
           console.log(`Successfully extracted text from: ${sanitizedUrl}`);
           res.json(result);
-      } catch (parseError) {
-          console.error(`JSON parse error: ${parseError}`);
-          console.error(`Raw Python output: ${stdout}`);
+      })
+      .catch((error) => {
+          console.error(`Scraper worker error: ${error.message}`);
           res.status(500).json({ 
               success: false, 
-              error: 'Failed to parse text extraction output.', 
-              rawOutput: stdout.substring(0, 1000)
+              error: 'Failed to extract document text.', 
+              details: error.message 
           });
-      }
-  });
+      });
 });
 
 app.get('/api/proxy-document', async (req, res) => {
@@ -247,33 +183,9 @@ if (sanitizedUrl !== sutraUrl) {
 
 console.log(`Executing fast Python scraper with URL: ${sanitizedUrl}`);
 
-// Execute our new optimized fast scraper with a timeout
-exec(`python3 fast_scraper.py "${sanitizedUrl}" --fast`, { timeout: 3000 }, (error, stdout, stderr) => {
-    if (error) {
-        console.error(`Fast scraper exec error: ${error}`);
-        console.error(`Stderr: ${stderr}`);
-        return res.status(500).json({ 
-            success: false, 
-            error: 'Fast scraping failed.', 
-            details: stderr,
-            errorCode: error.code === 'ETIMEDOUT' ? 'TIMEOUT' : error.code
-        });
-    }
-
-    try {
-        // Parse the JSON output from the Python script
-        console.log("Fast scraper completed successfully");
-        
-        // Check if stdout is empty
-        if (!stdout || stdout.trim() === '') {
-            console.error('Fast scraper returned empty output');
-            return res.status(500).json({ 
-                success: false, 
-                error: 'Fast scraper returned empty output.'
-            });
-        }
-        
-        const result = JSON.parse(stdout);
+// Run the optimized fast scraper in a warm worker with a timeout
+scraperWorkers.call('fast_scrape', { url: sanitizedUrl }, { timeout: 3000 })
+    .then((result) => {
         console.log(`Fast scraper parsed result with ${result.eventos?.length || 0} eventos`);
         
         // Add timing info if not already present
@@ -283,16 +195,58 @@ exec(`python3 fast_scraper.py "${sanitizedUrl}" --fast`, { timeout: 3000 }, (err
         
         // Send the result to the client
         res.json(result);
-    } catch (parseError) {
-        console.error(`JSON parse error: ${parseError}`);
-        console.error(`Raw Python output: ${stdout}`);
+    })
+    .catch(async (error) => {
+        console.error(`Fast scraper worker error: ${error.message}`);
+
+        // Fall back to the last copy in the bill store, if there is one
+        try {
+            const stored = await scraperWorkers.call('get_stored_bill', { url: sanitizedUrl }, { timeout: 5000 });
+            if (stored.success) {
+                console.log(`Serving stored copy of ${sanitizedUrl}`);
+                return res.json({ ...stored, stale: true });
+            }
+        } catch (storeError) {
+            console.error(`Bill store lookup failed: ${storeError.message}`);
+        }
+
         res.status(500).json({ 
             success: false, 
-            error: 'Failed to parse Python script output.', 
-            rawOutput: stdout.substring(0, 1000) // Limit output size
+            error: 'Fast scraping failed.', 
+            details: error.message,
+            errorCode: error.code
         });
-    }
+    });
 });
+
+// Bills from the SQLite bill store, without scraping SUTRA
+app.get('/api/stored-bill', async (req, res) => {
+  const { url, measure } = req.query;
+
+  if (!url && !measure) {
+    return res.status(400).json({ success: false, error: 'url or measure parameter is required' });
+  }
+
+  try {
+    const result = await scraperWorkers.call('get_stored_bill', { url: url || null, measure_number: measure || null }, { timeout: 10000 });
+    res.status(result.success ? 200 : (result.not_found ? 404 : 400)).json(result);
+  } catch (error) {
+    console.error('Error reading bill store:', error);
+    res.status(500).json({ success: false, error: 'Failed to read bill store.' });
+  }
+});
+
+app.get('/api/stored-bills', async (req, res) => {
+  const { desde, hasta } = req.query; // YYYY-MM-DD
+  const limit = Math.min(parseInt(req.query.limit, 10) || 500, 5000);
+
+  try {
+    const result = await scraperWorkers.call('list_stored_bills', { desde: desde || null, hasta: hasta || null, limit }, { timeout: 10000 });
+    res.json(result);
+  } catch (error) {
+    console.error('Error reading bill store:', error);
+    res.status(500).json({ success: false, error: 'Failed to read bill store.' });
+  }
 });
 
 // On-demand document processing
@@ -310,76 +264,14 @@ const decodedForPython = decodeURIComponent(safeUrl);
 
 console.log(`Processing document on demand: ${safeUrl}`);
 
-// Create a temporary Python script to process just this document
-const tempFileName = path.join(__dirname, 'temp', `process_doc_${Date.now()}.py`);
-const tempDir = path.join(__dirname, 'temp');
-
-if (!fs.existsSync(tempDir)) {
-  fs.mkdirSync(tempDir);
-}
-
-// Write Python code to process just this document
-const pythonCode = `
-import sys
-sys.path.append('.')
-from fast_scraper import on_demand_document_processor
-import json
-import urllib3
-import urllib.parse
-
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# URL needs to be raw - we'll decode it in Python
-url = """${documentUrl}"""
-
-# Process just this document
-result = on_demand_document_processor(url, "scraped_data")
-
-# Print the result as JSON
-print(json.dumps(result))
-`;
-
-fs.writeFileSync(tempFileName, pythonCode);
-
-// Execute the Python code with a reasonable timeout
-exec(`python3 ${tempFileName}`, { timeout: 30000 }, (error, stdout, stderr) => {
-  // Clean up the temp file
-  try {
-    fs.unlinkSync(tempFileName);
-  } catch (err) {
-    console.error(`Error removing temp file: ${err}`);
-  }
-  
-  try {
-    // Parse the result
-    if (!stdout || stdout.trim() === '') {
-      console.error('Document processor returned empty output');
-      return res.status(500).json({
-        success: false,
-        error: 'Document processor returned empty output.'
-      });
-    }
-
-    // Log the raw output for debugging
-    console.log("Raw Python output:", stdout);
-
-    // Clean the output - find the first { and last } to extract valid JSON
-    let jsonStr = stdout.trim();
-    const firstBrace = jsonStr.indexOf('{');
-    const lastBrace = jsonStr.lastIndexOf('}');
-
-    if (firstBrace !== -1 && lastBrace !== -1) {
-      jsonStr = jsonStr.substring(firstBrace, lastBrace + 1);
-    }
-
-    // Try parsing the cleaned JSON
-    const result = JSON.parse(jsonStr);
+// Process just this document in a warm worker with a reasonable timeout
+scraperWorkers.call('on_demand_document_processor', { doc_url: documentUrl, output_dir: 'scraped_data' }, { timeout: 30000 })
+  .then((result) => {
     console.log(`Successfully processed document: ${documentUrl}`);
 
-    // **CHANGE: Send the PDF file instead of the JSON result**
+    // Send the PDF file instead of the JSON result
     if (result && result.downloaded && result.filepath) {
-      const filePath = result.filepath;
+      const filePath = path.resolve(__dirname, result.filepath);
 
       if (fs.existsSync(filePath)) {
         res.setHeader('Content-Type', 'application/pdf');
@@ -392,30 +284,15 @@ exec(`python3 ${tempFileName}`, { timeout: 30000 }, (error, stdout, stderr) => {
       console.error('PDF processing failed or filepath missing.');
       res.status(500).json({ success: false, error: 'PDF processing failed.' });
     }
-  } catch (parseError) {
-    console.error(`JSON parse error: ${parseError}`);
-    console.error(`Raw Python output: ${stdout}`);
-      
-      // Try to extract the JSON manually as a fallback
-      try {
-          // The rawOutput seems to contain valid JSON, let's extract it with a regex
-          const jsonMatch = stdout.match(/{[\s\S]*}/);
-          if (jsonMatch) {
-              const extractedJson = JSON.parse(jsonMatch[0]);
-              console.log("Successfully extracted JSON from output.");
-              return res.json(extractedJson);
-          }
-      } catch (extractError) {
-          console.error("Failed to extract JSON: ", extractError);
-      }
-      
-      return res.status(500).json({ 
-          success: false, 
-          error: 'Failed to parse document processor output.', 
-          rawOutput: stdout.substring(0, 1000)
-      });
-  }
-});
+  })
+  .catch((error) => {
+    console.error(`Document processor worker error: ${error.message}`);
+    res.status(500).json({ 
+        success: false, 
+        error: 'Document processor failed.', 
+        details: error.message
+    });
+  });
 });
 
 //Radicado Endpoint
@@ -435,34 +312,9 @@ app.post('/api/bills-by-introduction-date', async (req, res) => {
     
     console.log(`Searching for bills introduced on ${date}`);
     
-    // Execute the Python script with the date parameter
-    const { exec } = require('child_process');
-    exec(`python3 date_search_scraper.py "${date}"`, (error, stdout, stderr) => {
-      if (error) {
-        console.error(`Exec error: ${error}`);
-        console.error(`Stderr: ${stderr}`);
-        return res.status(500).json({ 
-          success: false, 
-          error: 'Failed to scrape search results.', 
-          details: stderr 
-        });
-      }
-
-      try {
-        // Parse the results
-        const searchResults = JSON.parse(stdout);
-        
-        res.json(searchResults);
-      } catch (parseError) {
-        console.error(`JSON parse error: ${parseError}`);
-        console.error(`Raw Python output: ${stdout}`);
-        res.status(500).json({ 
-          success: false, 
-          error: 'Failed to parse search results.', 
-          rawOutput: stdout.substring(0, 1000) // Limit output size
-        });
-      }
-    });
+    // Run the date search in a warm scraper worker
+    const searchResults = await scraperWorkers.call('scrape_bills_by_date', { date_str: date }, { timeout: 120000 });
+    res.json(searchResults);
   } catch (error) {
     console.error('Error processing search request:', error);
     res.status(500).json({ 
@@ -472,9 +324,101 @@ app.post('/api/bills-by-introduction-date', async (req, res) => {
   }
 });
 
-// DOC to DOCX Conversion Endpoint
-const execPromise = util.promisify(exec); // Promisify exec for async/await
+// Bills introduced over a date range, bucketed by filing date
+app.post('/api/bills-by-date-range', async (req, res) => {
+  let { desde, hasta } = req.body; // Expected format can be MM/DD/YYYY or YYYY-MM-DD
+
+  if (!desde || !hasta) {
+    return res.status(400).json({ success: false, error: 'desde and hasta are required.' });
+  }
+
+  // Convert dates to YYYY-MM-DD format if they're in MM/DD/YYYY format
+  const toIsoDate = (date) => {
+    if (!date.includes('/')) return date;
+    const parts = date.split('/');
+    return `${parts[2]}-${parts[0].padStart(2, '0')}-${parts[1].padStart(2, '0')}`;
+  };
+  desde = toIsoDate(desde);
+  hasta = toIsoDate(hasta);
+
+  try {
+    console.log(`Searching for bills introduced from ${desde} to ${hasta}`);
+
+    // One paginated crawl for the whole range, in a warm scraper worker
+    const searchResults = await scraperWorkers.call('scrape_bills_by_date_range', { desde, hasta }, { timeout: 300000 });
+    res.json(searchResults);
+  } catch (error) {
+    console.error('Error processing date range search:', error);
+    res.status(500).json({
+      success: false,
+      error: 'Failed to process search request.'
+    });
+  }
+});
+
+// Full-text search over extracted document text
+app.get('/api/search-documents', async (req, res) => {
+  const query = (req.query.q || '').trim();
+  const limit = Math.min(parseInt(req.query.limit, 10) || 20, 100);
+
+  if (!query) {
+    return res.status(400).json({ success: false, error: 'q parameter is required' });
+  }
 
+  try {
+    const result = await scraperWorkers.call('search_documents', { query, limit }, { timeout: 10000 });
+    res.json(result);
+  } catch (error) {
+    console.error('Error searching documents:', error);
+    res.status(500).json({ success: false, error: 'Failed to search documents.' });
+  }
+});
+
+// Document text page by page as NDJSON, so the viewer can show the first pages of a long PDF right away
+app.get('/api/document-text-stream', async (req, res) => {
+  const documentUrl = req.query.url;
+
+  if (!documentUrl) {
+    return res.status(400).json({ success: false, error: 'url parameter is required' });
+  }
+
+  res.setHeader('Content-Type', 'application/x-ndjson; charset=utf-8');
+  res.setHeader('Cache-Control', 'no-cache');
+  res.flushHeaders();
+  // The worker keeps extracting (and caches the text) even if the client goes away
+  const writeLine = (message) => {
+    if (!res.destroyed && !res.writableEnded) res.write(JSON.stringify(message) + '\n');
+  };
+
+  try {
+    const result = await scraperWorkers.call('stream_document_text', { doc_url: documentUrl, output_dir: 'scraped_data' },
+      { timeout: 300000, onPartial: writeLine });
+    writeLine({ done: true, ...result });
+  } catch (error) {
+    console.error('Error streaming document text:', error);
+    writeLine({ done: true, success: false, error: 'Failed to extract document text.' });
+  }
+  res.end();
+});
+
+// Incremental sync: only bills filed since the last sync (new or changed)
+app.post('/api/sync-new-bills', async (req, res) => {
+  const { since, dryRun } = req.body || {}; // since (YYYY-MM-DD) resets the watermark
+
+  try {
+    const syncResults = await scraperWorkers.call('sync_new_bills', { since: since || null, dry_run: !!dryRun }, { timeout: 300000 });
+    res.json(syncResults);
+  } catch (error) {
+    console.error('Error syncing new bills:', error);
+    res.status(500).json({
+      success: false,
+      error: 'Failed to sync new bills.'
+    });
+  }
+});
+
+// DOC to DOCX Conversion Endpoint
+// The worker fetches the .doc into the document store and converts it on the resident LibreOffice service
 app.get('/api/convert-doc-to-docx', async (req, res) => {
   const docUrl = req.query.docUrl;
 
@@ -485,33 +429,12 @@ app.get('/api/convert-doc-to-docx', async (req, res) => {
   console.log(`Converting DOC to DOCX for URL: ${docUrl}`);
 
   try {
-      const response = await axios.get(docUrl, {
-          responseType: 'arraybuffer' // Get binary data for DOC file
-      });
-
-      if (response.status !== 200) {
-          throw new Error(`Failed to download DOC file, status: ${response.status}`);
-      }
+      const result = await scraperWorkers.call('convert_doc_to_docx', { doc_url: docUrl, output_dir: 'scraped_data' }, { timeout: 180000 });
 
-      const docBuffer = Buffer.from(response.data);
-      const tempDir = path.join(__dirname, 'temp');
-      if (!fs.existsSync(tempDir)) {
-          fs.mkdirSync(tempDir);
+      if (!result.success) {
+          throw new Error(result.error || 'Conversion failed, DOCX file not created');
       }
-      const inputDocPath = path.join(tempDir, `input_${Date.now()}.doc`);
-      const outputDocxPath = path.join(tempDir, `output_${Date.now()}.docx`);
-
-      fs.writeFileSync(inputDocPath, docBuffer);
-
-      console.log(`Executing LibreOffice conversion: soffice --headless --convert-to docx ${inputDocPath} --outdir ${tempDir}`);
-      await execPromise(`soffice --headless --convert-to docx ${inputDocPath} --outdir ${tempDir}`);
-      console.log('DOC to DOCX conversion completed');
-
-      if (!fs.existsSync(outputDocxPath)) {
-          throw new Error('Conversion failed, DOCX file not created');
-      }
-
-      const docxBuffer = fs.readFileSync(outputDocxPath);
+      console.log(`DOC to DOCX conversion ${result.cached ? 'reused' : 'completed'}: ${result.docx_path}`);
 
       // Set appropriate headers for DOCX file
       res.setHeader('Content-Type', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document');
@@ -519,12 +442,7 @@ app.get('/api/convert-doc-to-docx', async (req, res) => {
       // res.setHeader('Content-Disposition', 'attachment; filename=converted.docx'); // For download
       res.setHeader('Content-Disposition', 'inline; filename=converted.docx'); // For inline display if possible
       res.setHeader('Cache-Control', 'no-cache');
-      res.send(docxBuffer);
-
-      // Clean up temporary files
-      fs.unlinkSync(inputDocPath);
-      fs.unlinkSync(outputDocxPath);
-      console.log('Temporary files cleaned up');
+      res.sendFile(path.resolve(__dirname, result.docx_path));
 
   } catch (error) {
       console.error('Error converting DOC to DOCX:', error);
@@ -532,9 +450,6 @@ app.get('/api/convert-doc-to-docx', async (req, res) => {
           error: 'Failed to convert DOC to DOCX',
           details: error.message
       });
-  } finally {
-      // Optional: Cleanup temp directory if needed more aggressively in production
-      // Example: fs.readdirSync(tempDir).forEach(file => fs.unlinkSync(path.join(tempDir, file)));
   }
 });
 
@@ -551,8 +466,12 @@ const { filename } = req.params;
 // Sanitize filename to prevent directory traversal attacks
 const sanitizedFilename = filename.replace(/[^a-zA-Z0-9_.-]/g, '');
 
-// Construct the full file path
-const filePath = path.join(__dirname, 'scraped_data', sanitizedFilename);
+// Construct the full file path. Documents named after their SHA-256 live in
+// the sharded content-addressed store (scraped_data/objects/ab/cd/<digest>.pdf)
+const digestMatch = sanitizedFilename.match(/^([0-9a-f]{2})([0-9a-f]{2})[0-9a-f]{60}\./);
+const filePath = digestMatch
+  ? path.join(__dirname, 'scraped_data', 'objects', digestMatch[1], digestMatch[2], sanitizedFilename)
+  : path.join(__dirname, 'scraped_data', sanitizedFilename);
 
 console.log(`Serving document from path: ${filePath}`);
 
@@ -593,4 +512,14 @@ fileStream.on('error', (err) => {
 
 app.listen(port, () => {
   console.log(`Bill Tracker server listening at http://localhost:${port}`);
-});
\ No newline at end of file
+});
+
+// Let the scraper workers finish in-flight requests before the server exits
+const workerStopTimeout = parseInt(process.env.SCRAPER_WORKER_STOP_TIMEOUT || '30000', 10);
+for (const signal of ['SIGINT', 'SIGTERM']) {
+  process.once(signal, async () => {
+    console.log(`Received ${signal}; waiting for scraper workers to finish`);
+    await scraperWorkers.stop(workerStopTimeout);
+    process.exit(0);
+  });
+}
\ No newline at end of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Single Flight - Coalesce concurrent identical fetches
+When several requests for the same bill or document arrive together, only the
+first one does the work; the others wait for it and share its result.
+
+Within a process, callers with the same key share one call. Across worker
+processes, a lock file per key serializes the calls, and the processes that
+waited find the result already in the on-disk caches (http_cache, the
+downloaded file) instead of going back to SUTRA.
+"""
+
+import contextlib
+import copy
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import quote, unquote, urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_DIR = os.environ.get("SINGLE_FLIGHT_DIR", os.path.join(tempfile.gettempdir(), "sutra_single_flight"))
+# Give up waiting for another process after this long and do the work anyway
+SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_LOCK_TIMEOUT", 300))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """
+    Canonical form of url for use as a key: lowercase scheme and host, no
+    default port or fragment, consistent percent-encoding and sorted query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs fn once per key at a time; concurrent callers with the same key share the result."""
+
+    def __init__(self, lock_dir=SINGLE_FLIGHT_DIR, lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT):
+        self.lock_dir = lock_dir
+        self.lock_timeout = lock_timeout
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.stats = {"leaders": 0, "shared": 0, "waited_on_process": 0}
+
+    @contextlib.contextmanager
+    def process_lock(self, key):
+        """Exclusive lock on key across processes (no-op without fcntl)."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = os.path.join(self.lock_dir, hashlib.sha256(key.encode()).hexdigest() + ".lock")
+        with open(path, "a") as lock_file:
+            deadline = time.monotonic() + self.lock_timeout
+            locked = False
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    break
+                except BlockingIOError:
+                    waited = True
+                    if time.monotonic() > deadline:
+                        logger.warning(f"Timed out waiting for another process on {key}; proceeding")
+                        break
+                    time.sleep(0.05)
+            if waited:
+                with self.lock:
+                    self.stats["waited_on_process"] += 1
+            try:
+                yield
+            finally:
+                if locked:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if not leader:
+            logger.info(f"Waiting for in-flight call: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            with self.process_lock(key):
+                result = fn(*args, **kwargs)
+            # Waiters get their own copy, taken before our caller can mutate it
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def health(self):
+        with self.lock:
+            return {"in_flight": len(self.calls), **self.stats}
+
+
+_flight = SingleFlight()
+
+
+def coalesce(namespace, url, fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) once for all concurrent callers with the same namespace and URL."""
+    return _flight.do(f"{namespace}:{normalize_url(url)}", fn, *args, **kwargs)
+
+
+def single_flight_stats():
+    return _flight.health()
@@ -5,6 +5,7 @@ import time
 import random
 import docx
 from pdfminer.high_level import extract_text
+from http_client import get_session
 
 def download_and_extract_sutra_docs(sutra_url, output_dir="poc_downloads"):
     """Downloads DOCX and PDF documents, extracts their text."""
@@ -13,7 +14,7 @@ def download_and_extract_sutra_docs(sutra_url, output_dir="poc_downloads"):
         os.makedirs(output_dir)
 
     try:
-        response = requests.get(sutra_url)
+        response = get_session().get(sutra_url)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -45,7 +46,7 @@ def download_and_extract_sutra_docs(sutra_url, output_dir="poc_downloads"):
         # Download and process each document
         for doc_link in doc_links:
             try:
-                doc_response = requests.get(doc_link, stream=True)
+                doc_response = get_session().get(doc_link, stream=True)
                 doc_response.raise_for_status()
 
                 filename = os.path.basename(doc_link)
@@ -151,7 +152,7 @@ if __name__ == "__main__":
             # Add this output directory to results
             results["download_dir"] = os.path.abspath(output_dir)
             
-            response = requests.get(sutra_url)
+            response = get_session().get(sutra_url)
             response.raise_for_status()
 
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -176,7 +177,7 @@ if __name__ == "__main__":
                     # Download and process each document
                     for doc_link in doc_links:
                         try:
-                            doc_response = requests.get(doc_link, stream=True)
+                            doc_response = get_session().get(doc_link, stream=True)
                             doc_response.raise_for_status()
 
                             filename = os.path.basename(doc_link)
@@ -1,23 +1,24 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, WebDriverException
 import os
 import time
 import random
-import docx
-from pdfminer.high_level import extract_text
 import subprocess
-from webdriver_manager.chrome import ChromeDriverManager
 import logging
 import concurrent.futures
+from collections import deque
 from functools import partial
 import sys
+from bill_page_parser import parse_bill_page
+from document_store import fetch_document, text_path
+from rate_limiter import get_limiter
+from single_flight import coalesce
+from bill_store import record_document, save_bill
+from text_index import index_extracted_text
+from doc_converter import convert_doc_to_text, ConversionError
+from extraction_cache import (cached_extraction, extract_cached, has_current_extraction, save_extraction,
+                              text_pages)
 
 # Set up logging
 logging.basicConfig(
@@ -27,54 +28,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def extract_text_from_document(filepath, output_dir):
+def extract_document_text(filepath, output_dir):
     """
     Extract text from a document based on its file type.
     This function is separated to be called on-demand.
+    Returns (text, fallback): fallback names the extraction_cache
+    fallback extractor that produced the text, or is None when the file
+    type's own extractor did. Failures give empty text, which is never cached.
     """
     try:
         extracted_text = ""
+        fallback = None
         if filepath.lower().endswith('.docx'):
             extracted_text = extract_text_from_docx(filepath)
         elif filepath.lower().endswith('.pdf'):
             extracted_text = extract_text_from_pdf(filepath)
         elif filepath.lower().endswith('.doc'):
-            # Try LibreOffice first (more reliable than antiword)
+            # Try LibreOffice first (more reliable than antiword), on the resident converter
             try:
-                temp_output = os.path.join(output_dir, "temp_converted.txt")
-                command = ["soffice", "--headless", "--convert-to", "txt:Text", "--outdir", output_dir, filepath]
-                result = subprocess.run(command, capture_output=True, text=True, timeout=60)
-                if os.path.exists(temp_output):
-                    with open(temp_output, 'r', encoding='utf-8', errors='replace') as f:
-                        extracted_text = f.read()
-                    os.remove(temp_output)
-            except (subprocess.SubprocessError, FileNotFoundError):
+                extracted_text = convert_doc_to_text(filepath)
+            except ConversionError as e:
+                logger.warning(f"LibreOffice could not convert {filepath}, trying antiword: {e}")
                 # Fallback to antiword
                 command = ["antiword", filepath]
                 result = subprocess.run(command, capture_output=True, text=True, timeout=30)
-                extracted_text = result.stdout
+                if result.returncode != 0:
+                    logger.error(f"antiword could not convert {filepath}: {result.stderr.strip()}")
+                    return "", None
+                extracted_text, fallback = result.stdout, "antiword"
         elif filepath.lower().endswith('.txt'):
             with open(filepath, 'r', encoding='utf-8', errors='replace') as txt_file:
                 extracted_text = txt_file.read()
         
-        return extracted_text
+        return extracted_text, fallback
     except FileNotFoundError:
-        return "Error: No conversion tool available. Please install LibreOffice or antiword."
+        logger.error(f"No conversion tool available for {filepath}. Please install LibreOffice or antiword.")
+        return "", None
     except subprocess.SubprocessError as e:
-        return f"Error extracting text: {e}"
+        logger.error(f"Error extracting text from {filepath}: {e}")
+        return "", None
     except Exception as e:
         logger.error(f"Unexpected error extracting text from {filepath}: {e}")
-        return ""
+        return "", None
+
+# Fields download_and_process_doc fills in on a document dict
+DOWNLOAD_RESULT_KEYS = ("filepath", "text_filepath", "downloaded", "text_extracted", "extracted_text", "extraction",
+                        "error")
 
 def download_and_process_doc(doc_info, output_dir, extract_text=False):
     """
     Downloads a document and optionally extracts text.
+    Concurrent calls for the same document and directory share one download.
     
     Parameters:
     - doc_info: Dictionary with document information
     - output_dir: Directory to save files
     - extract_text: If True, extract text from the document; if False, just download
     """
+    namespace = f"download:{os.path.abspath(output_dir)}:{'text' if extract_text else 'file'}"
+    result = coalesce(namespace, doc_info["link_url"], _download_and_process_doc, dict(doc_info), output_dir, extract_text)
+    record_document(result)
+    # Callers expect doc_info itself to be filled in; keep their own description
+    for key in DOWNLOAD_RESULT_KEYS:
+        if key in result:
+            doc_info[key] = result[key]
+    return doc_info
+
+def _download_and_process_doc(doc_info, output_dir, extract_text):
     doc_url = doc_info["link_url"]
     filename = os.path.basename(doc_url)
     
@@ -83,68 +103,46 @@ def download_and_process_doc(doc_info, output_dir, extract_text=False):
         logger.info(f"Skipping User-Manual file: {doc_url}")
         return doc_info
     
-    filepath = os.path.join(output_dir, filename)
-    text_filepath = os.path.join(output_dir, filename + ".txt")
-    doc_info["filepath"] = filepath
-    doc_info["text_filepath"] = text_filepath
-    doc_info["downloaded"] = os.path.exists(filepath)
-    doc_info["text_extracted"] = os.path.exists(text_filepath)
-
-    # If both files exist and we need text extraction, load the cached text
-    if os.path.exists(filepath) and os.path.exists(text_filepath) and extract_text:
-        logger.info(f"Using cached text for: {filename}")
-        try:
-            with open(text_filepath, 'r', encoding='utf-8', errors='replace') as f:
-                doc_info['extracted_text'] = f.read()
-        except Exception as e:
-            logger.warning(f"Error reading cached text for {filename}: {e}")
-            doc_info['extracted_text'] = ""
-        return doc_info
-
-    # If file exists but we don't need text, just return the info
-    if os.path.exists(filepath) and not extract_text:
-        logger.info(f"File exists, skipping download: {filename}")
-        return doc_info
+    doc_info["downloaded"] = False
+    doc_info["text_extracted"] = False
 
     # Use backoff strategy for downloads
     max_retries = 3
     for retry in range(max_retries):
         try:
-            logger.info(f"Downloading: {doc_url}")
-            # Use a session with appropriate headers
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-                'Pragma': 'no-cache',
-                'Cache-Control': 'no-cache',
-            })
-            
-            response = session.get(doc_url, stream=True, timeout=60)
-            response.raise_for_status()
-
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
+            # Documents live in the content-addressed store under output_dir:
+            # identical attachments on different bills (or behind different
+            # URLs) are stored, and their text extracted, only once. The
+            # shared session already retries connection errors and 5xx
+            # responses; this loop covers failures mid-body, which the next
+            # attempt resumes with a Range request.
+            filepath, outcome = fetch_document(doc_url, output_dir, timeout=60)
+            text_filepath = text_path(filepath)
+            if outcome == "cached":
+                logger.info(f"File exists, skipping download: {filename}")
+            else:
+                logger.info(f"Downloaded: {doc_url}")
+            doc_info["filepath"] = filepath
+            doc_info["text_filepath"] = text_filepath
             doc_info["downloaded"] = True
+            doc_info["text_extracted"] = has_current_extraction(filepath, output_dir)
 
-            # Only extract text if requested
+            # Only extract text if requested. The cache is keyed by content and
+            # extractor version, so it is checked before any extraction work
             if extract_text:
-                extracted_text = extract_text_from_document(filepath, output_dir)
-                
-                if extracted_text:
-                    with open(text_filepath, 'w', encoding='utf-8') as tf:
-                        tf.write(extracted_text)
-                    logger.info(f"Extracted text saved to: {text_filepath}")
+                extracted_text, extraction, cached = extract_cached(
+                    filepath, output_dir, lambda path: extract_document_text(path, output_dir))
+
+                if extraction:
+                    if cached:
+                        logger.info(f"Using cached text for: {filename}")
+                    else:
+                        logger.info(f"Extracted text saved to: {text_filepath}")
+                    # Text extracted before the search index existed (or for
+                    # another URL with the same content) gets indexed now
+                    index_extracted_text(doc_url, extracted_text, text_filepath)
                     doc_info['extracted_text'] = extracted_text
+                    doc_info["extraction"] = extraction
                     doc_info["text_extracted"] = True
                 else:
                     logger.warning(f"No text extracted from {filename}")
@@ -154,6 +152,13 @@ def download_and_process_doc(doc_info, output_dir, extract_text=False):
             # Successful download, break the retry loop
             break
             
+        except requests.exceptions.HTTPError as e:
+            # Not retried here: the session already retried throttling and 5xx
+            # responses, and a missing or forbidden document won't appear by asking again
+            logger.error(f"Failed to download {doc_url}: {e}")
+            doc_info['error'] = f"Error downloading {doc_url}: {e}"
+            doc_info["downloaded"] = False
+            break
         except requests.exceptions.RequestException as e:
             if retry < max_retries - 1:
                 wait_time = (2 ** retry) * 5  # Exponential backoff
@@ -172,75 +177,109 @@ def download_and_process_doc(doc_info, output_dir, extract_text=False):
     
     return doc_info
 
-def scrape_and_download(url, output_dir="scraped_data"):
-    """Scrapes structured data and downloads/extracts text from documents."""
-
-    from selenium.webdriver.chrome.service import Service as ChromeService
-
-    # --- 1. Selenium Setup (Enhanced Robustness) ---
-    options = Options()
-    options.add_argument("--headless=new")  # Updated headless mode
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-extensions")
-    # Add user agent to appear more like a normal browser
-    options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    # Configure Chrome to block images and other resources
-    options.add_argument('--blink-settings=imagesEnabled=false')
-    
-    # Add proxy if needed (uncomment if you have a proxy service)
-    # options.add_argument('--proxy-server=http://your-proxy-server:port')
-    
+def stream_document_text(doc_url, output_dir="scraped_data"):
+    """
+    Yields a document's text page by page ({"page": n, "text": ...}) for the
+    viewer, so the first pages show while a long PDF is still being read.
+    Text in the extraction cache is replayed from it. Once the last page is
+    out, the full text is cached and indexed like download_and_process_doc
+    does; the summary is the generator's return value.
+    """
+    filepath, _ = fetch_document(doc_url, output_dir, timeout=60)
+    text_filepath = text_path(filepath)
+
+    found = cached_extraction(filepath, output_dir)
+    if found is not None:
+        text, extraction = found
+        # PDF text ends every page with a form feed
+        pages = text.split('\f')
+        if len(pages) > 1 and not pages[-1].strip():
+            pages.pop()
+        for number, page_text in enumerate(pages, start=1):
+            yield {"page": number, "text": page_text}
+        index_extracted_text(doc_url, text, text_filepath)
+        return {"success": True, "pages": len(pages), "filepath": filepath, "text_filepath": text_filepath,
+                "cached": True, "extraction": extraction}
+
+    started = time.time()
+    if filepath.lower().endswith('.pdf'):
+        from pdf_extractor import iter_pdf_pages
+
+        # Pages come off the extraction pool, under its admission slots and
+        # deadline, so this request thread only waits for them
+        pages = []
+        for page_text in iter_pdf_pages(filepath):
+            pages.append(page_text)
+            yield {"page": len(pages), "text": page_text.rstrip('\f')}
+        text = "".join(pages)
+        fallback = None
+    else:
+        # Word documents have no pages until they are laid out; send them whole
+        text, fallback = extract_document_text(filepath, output_dir)
+        pages = [text] if text else []
+        if text:
+            yield {"page": 1, "text": text}
+
+    extraction = None
+    if text:
+        extraction = save_extraction(filepath, output_dir, text, time.time() - started, text_pages(filepath, text),
+                                     fallback)
+        index_extracted_text(doc_url, text, text_filepath)
+    else:
+        logger.warning(f"No text extracted from {doc_url}")
+    record_document({"link_url": doc_url, "filepath": filepath, "text_filepath": text_filepath,
+                     "downloaded": True, "text_extracted": bool(text)})
+    return {"success": True, "pages": len(pages), "filepath": filepath, "text_filepath": text_filepath,
+            "cached": False, "extraction": extraction}
+
+def scrape_and_download(url, output_dir="scraped_data", skip_downloads=False):
+    """
+    Scrapes structured data and downloads/extracts text from documents.
+    With skip_downloads=True only the document metadata is returned.
+    """
+
+    # Selenium is only needed for a full page scrape, so it is imported here
+    # instead of at module level to keep the download/extract entry points
+    # cheap to import
+    from selenium.common.exceptions import TimeoutException
+    from chrome_pool import get_driver_pool
+
+    # --- 1. Selenium Setup (borrow a warm driver from the pool) ---
+    pool = get_driver_pool()
+    pooled = None
     driver = None
     try:
-        logger.info("Installing ChromeDriver...")
-        driver_path = ChromeDriverManager().install()
-        
-        logger.info("Creating ChromeService...")
-        service = ChromeService(executable_path=driver_path)
-        
-        logger.info("Initializing Chrome WebDriver...")
-        driver = webdriver.Chrome(service=service, options=options)
-        
-        logger.info("Setting page load timeout...")
-        driver.set_page_load_timeout(180)  # 3 minutes timeout
+        logger.info("Borrowing Chrome driver from pool...")
+        pooled = pool.checkout()
+        driver = pooled.driver
         
         logger.info(f"Loading URL: {url}")
-        driver.get(url)
-        
-        # Wait for page to load with exponential backoff
-        max_attempts = 5
-        base_wait_time = 10
+        # Page loads count against SUTRA's adaptive rate limit like any other request
+        limiter = get_limiter(url)
+        limiter.acquire()
+        try:
+            driver.get(url)
+        except Exception:
+            limiter.release(error=True)
+            raise
+        limiter.release()
         
-        # Inside your function
+        # Wait until the timeline has rendered and stopped changing. A page that
+        # never renders gets one refresh before we give up.
+        max_attempts = 2
         for attempt in range(max_attempts):
-            try:
-                logger.info(f"Waiting for elements to load (attempt {attempt+1}/{max_attempts})...")
-                
-                WebDriverWait(driver, base_wait_time * (2 ** attempt)).until(
-                    lambda driver: (
-                        len(driver.find_elements(By.CLASS_NAME, "text-2xl")) > 0 or
-                        len(driver.find_elements(By.CLASS_NAME, "mt-12")) > 0 or
-                        len(driver.find_elements(By.XPATH, "//li[contains(@class, 'relative flex justify-between')]")) > 0
-                    )
-                )
-                
-                logger.info("Page loaded successfully.")
+            logger.info(f"Waiting for the timeline to settle (attempt {attempt+1}/{max_attempts})...")
+            readiness = wait_for_timeline(driver)
+            logger.info(f"Page readiness: {readiness}")
+            if readiness.get("status") != "not_ready":
                 break
-            except TimeoutException:
-                if attempt < max_attempts - 1:
-                    logger.warning(f"Timeout waiting for page to load. Retrying...")
-                    # Take a screenshot to see what's happening
-                    driver.save_screenshot(f"loading_attempt_{attempt+1}.png")
-                    # Refresh the page and try again
-                    driver.refresh()
-                else:
-                    raise
-        
-        # Add a short delay even after elements are found to ensure JavaScript has run
-        time.sleep(5)
+            if attempt < max_attempts - 1:
+                logger.warning("Page content never appeared. Refreshing...")
+                # Take a screenshot to see what's happening
+                driver.save_screenshot(f"loading_attempt_{attempt+1}.png")
+                driver.refresh()
+            else:
+                raise TimeoutException("Page content never appeared")
         
         page_source = driver.page_source
         
@@ -258,24 +297,32 @@ def scrape_and_download(url, output_dir="scraped_data"):
         except:
             logger.error(f"Selenium error: {e}. Could not save screenshot.")
         
-        try:
-            if driver:
-                driver.quit()
-        except:
-            pass
+        # Don't hand a driver that just failed to the next scrape
+        if pooled:
+            pool.checkin(pooled, broken=True)
             
         return {"error": f"Selenium error: {str(e)}"}
 
-    # --- 2. BeautifulSoup Parsing (Structured Data) ---
-    soup = BeautifulSoup(page_source, 'html.parser')
+    # The page source is all we need from the browser
+    pool.checkin(pooled)
+
+    return build_bill_data(page_source, output_dir, skip_downloads, url=url)
 
+def build_bill_data(page_source, output_dir="scraped_data", skip_downloads=False, url=None):
+    """
+    Turns a rendered bill page into the scraper's result dict and downloads
+    its documents (unless skip_downloads is set). With the page's url the
+    result is also upserted into the bill store.
+    """
+    # --- 2. HTML Parsing (Structured Data) ---
     # Check if we got a meaningful page
     if len(page_source) < 1000 or "Access Denied" in page_source:
         logger.error("Page access denied or returned minimal content")
-        if driver:
-            driver.quit()
         return {"error": "Page access denied or returned minimal content"}
 
+    # Parse with the configured backend (SUTRA_HTML_PARSER)
+    page = parse_bill_page(page_source)
+
     data = {
         "measure_number": None,
         "title": None,
@@ -293,252 +340,153 @@ def scrape_and_download(url, output_dir="scraped_data"):
     }
 
     # Extract measure number from heading
-    header = soup.find('h1', class_=lambda c: c and "text-2xl" in c)
-    if header:
-        data["measure_number"] = header.get_text(strip=True)
+    if page["measure_number"]:
+        data["measure_number"] = page["measure_number"]
         logger.info(f"Found measure number: {data['measure_number']}")
     
     # Extract filing date
-    filing_date_elem = soup.find('span', string=lambda s: s and "Fecha de Radicación" in s)
-    if filing_date_elem:
-        date_span = filing_date_elem.find_next('span', class_=lambda c: c and "text-xs" in c)
-        if date_span:
-            data["filing_date"] = date_span.get_text(strip=True)
-            logger.info(f"Found filing date: {data['filing_date']}")
+    if page["filing_date"]:
+        data["filing_date"] = page["filing_date"]
+        logger.info(f"Found filing date: {data['filing_date']}")
     
     # Extract title
-    title_elem = soup.find('span', string=lambda s: s and "Título" in s)
-    if title_elem:
-        # Title is usually in a sibling or nearby span with text-balance class
-        title_span = title_elem.find_next('span', class_="text-balance")
-        if title_span:
-            data["title"] = title_span.get_text(strip=True)
-            logger.info(f"Found title: {data['title'][:50]}...")
+    if page["title"]:
+        data["title"] = page["title"]
+        logger.info(f"Found title: {data['title'][:50]}...")
     
     # Extract authors from the "Autores" tab, if possible
-    authors_section = soup.find(lambda tag: tag.name == 'button' and tag.get_text(strip=True) == 'Autores (1)')
-    if authors_section:
-        author_items = soup.find_all('li', class_=lambda c: c and "autor_id_li" in c)
-        for author_item in author_items:
-            author_name = author_item.find('p', class_=lambda c: c and "font-semibold" in c)
-            if author_name:
-                data["authors"].append(author_name.get_text(strip=True))
-                logger.info(f"Found author: {author_name.get_text(strip=True)}")
+    for author_name in page["author_items"]:
+        data["authors"].append(author_name)
+        logger.info(f"Found author: {author_name}")
     
     # Fallback to direct author parsing if needed
     if not data["authors"]:
-        authors_div = soup.find(lambda tag: tag.name == 'div' and tag.get_text(strip=True) == 'Autores')
-        if authors_div:
-            author_spans = authors_div.find_next('div').find_all('span')
-            for span in author_spans:
-                if span.get_text(strip=True) and not any(kw in span.get_text().lower() for kw in ["autor", "fecha"]):
-                    data["authors"].append(span.get_text(strip=True))
-                    logger.info(f"Found author: {span.get_text(strip=True)}")
-
-    # --- Helper Function (Extract Documents) ---
-    def extract_documents_from_element(element):
-        documents = []
-        if element:
-            for link in element.find_all('a', href=True):
-                doc_url = link['href']
-                if not doc_url.startswith("http"):
-                    doc_url = "https://sutra.oslpr.org" + doc_url
-                doc_description = link.get_text(strip=True)
-                documents.append({"link_url": doc_url, "description": doc_description})
-        return documents
+        for author_name in page["authors"]:
+            data["authors"].append(author_name)
+            logger.info(f"Found author: {author_name}")
 
     # --- 3. Extract Commission Information ---
     # In the modern UI, commission info is integrated into the events
     # However, we can check if "Comisión" tab exists
-    commission_tab = soup.find(lambda tag: tag.name == 'button' and 'Comisión' in tag.get_text())
-    if commission_tab:
+    if page["has_commission_tab"]:
         logger.info("Found commission tab")
-        # Extract commission info from the tab content
-        # This will depend on the exact structure, but we might find it in a list
-        commission_items = soup.find_all('li', string=lambda s: s and "Comisión" in s)
-        for item in commission_items:
-            commission_name = item.get_text(strip=True)
-            if commission_name:
-                data["comisiones"].append({
-                    "comision": commission_name,
-                    "documents": []  # We'll have to find the documents elsewhere
-                })
+        for commission_name in page["commission_items"]:
+            data["comisiones"].append({
+                "comision": commission_name,
+                "documents": []  # We'll have to find the documents elsewhere
+            })
     
-    # --- 4. Extract Documents Tab Content ---
-    # Find the "Documentos" tab and its content
-    documents_tab = soup.find(lambda tag: tag.name == 'button' and tag.get_text(strip=True) == 'Documentos (0)')
-    if documents_tab:
+    # Every document collected so far, keyed by URL, across documents,
+    # tramites, votaciones and comisiones. Keeps duplicate checks O(1) and
+    # lets a URL that shows up in several places share one entry.
+    doc_index = {}
+
+    def add_document(doc_list, doc_url, description, shared=False):
+        """
+        Add a document to doc_list unless its URL is already indexed.
+        Known URLs get the new description merged in; with shared=True the
+        existing entry is also added to doc_list (events keep their own list).
+        """
+        existing = doc_index.get(doc_url)
+        if existing is None:
+            doc = {"link_url": doc_url, "description": description}
+            doc_index[doc_url] = doc
+            doc_list.append(doc)
+            return doc
+
+        merge_document_description(existing, description)
+        if shared and not any(doc is existing for doc in doc_list):
+            doc_list.append(existing)
+        return existing
+
+    for comision in data["comisiones"]:
+        comision_docs = comision["documents"]
+        comision["documents"] = []
+        for doc in comision_docs:
+            add_document(comision["documents"], doc["link_url"], doc["description"], shared=True)
+
+    # --- 4. Extract Events from the modern UI structure ---
+    logger.info(f"Found {len(page['events'])} event items")
+
+    for event in page["events"]:
+        event_docs = []
+        for doc in event["documents"]:
+            add_document(event_docs, doc["link_url"], doc["description"], shared=True)
+
+        # Vote events are the ones the parser collected vote counts for
+        if "votes" in event:
+            data["votaciones"].append({
+                "camara": "Senado" if "Senado" in event["descripcion"] else "Cámara",
+                "fecha": event["fecha"],
+                "descripcion": event["descripcion"],  # Changed from "resultado" to "descripcion"
+                "documents": event_docs,
+                "votes": event["votes"]
+            })
+        else:
+            # This is a regular "tramite" (processing step)
+            event["documents"] = event_docs
+            data["tramites"].append(event)
+    
+    logger.info(f"Extracted {len(data['tramites'])} tramites and {len(data['votaciones'])} votaciones")
+
+    # --- 5. Extract Documents Tab Content ---
+    # Only documents not already attached to an event are added here
+    if page["has_documents_tab"]:
         logger.info("Found documents tab")
-        # Documents might be in a following div or list
-        document_items = soup.find_all('a', href=lambda h: h and (h.endswith('.pdf') or h.endswith('.doc') or h.endswith('.docx')))
-        for doc_link in document_items:
-            doc_url = doc_link['href']
-            if not doc_url.startswith("http"):
-                doc_url = "https://sutra.oslpr.org" + doc_url
-            
-            # Try to find document description
-            doc_desc_elem = doc_link.find('span', class_=lambda c: c and "text-sutra-secondary" in c)
-            doc_desc = doc_desc_elem.get_text(strip=True) if doc_desc_elem else doc_link.get_text(strip=True)
-            
-            # Only add if not already in any event
-            if not any(doc['link_url'] == doc_url for tramite in data['tramites'] for doc in tramite['documents']):
-                data["documents"].append({
-                    "link_url": doc_url,
-                    "description": doc_desc
-                })
+        for doc_link in page["document_links"]:
+            add_document(data["documents"], doc_link["link_url"], doc_link["tab_description"])
     
     # Additional document extraction from all links
     # This ensures we don't miss documents that might not be in the tab
-    for doc_link in soup.find_all('a', href=lambda h: h and (h.endswith('.pdf') or h.endswith('.doc') or h.endswith('.docx'))):
-        doc_url = doc_link['href']
+    for doc_link in page["document_links"]:
+        doc_url = doc_link["link_url"]
 
         # Skip User-Manual files
         if "User-Manual" in doc_url:
             logger.info(f"Skipping User-Manual file in extraction: {doc_url}")
             continue
-
-        if not doc_url.startswith("http"):
-            doc_url = "https://sutra.oslpr.org" + doc_url
         
-        # Try to find document description
-        doc_span = doc_link.find('span', class_=lambda c: c and "cursor-pointer" in c)
-        doc_desc = doc_span.get_text(strip=True) if doc_span else doc_link.get_text(strip=True)
-        
-        # Only add if not already in any list
-        if not any(doc['link_url'] == doc_url for doc_list in [data['documents']] + [tramite['documents'] for tramite in data['tramites']] for doc in doc_list):
-            data["documents"].append({
-                "link_url": doc_url,
-                "description": doc_desc
-            })
+        add_document(data["documents"], doc_url, doc_link["description"])
     
     logger.info(f"Found {len(data['documents'])} general documents")
 
-    # --- 5. Extract Events from the modern UI structure ---
-    event_items = soup.find_all('li', class_=lambda c: c and "relative flex justify-between" in c)
-    logger.info(f"Found {len(event_items)} event items")
-
-    for event_item in event_items:
-        # Extract event title/type
-        event_title_elem = event_item.find('span', class_="text-sutra-primary")
-        if not event_title_elem:
-            continue
-            
-        event_title = event_title_elem.get_text(strip=True)
-        
-        # Initialize event data
-        event_data = {
-            "descripcion": event_title,
-            "fecha": None,
-            "documents": []
-        }
-        
-        # Extract date
-        date_elem = event_item.find('span', string=lambda s: s and "Fecha:" in s)
-        if date_elem:
-            date_parent = date_elem.parent
-            # The date text is the text after "Fecha: "
-            event_data["fecha"] = date_parent.get_text(strip=True).replace("Fecha:", "").strip()
-        
-        # Extract commission information - this needs to find the actual commission name
-        # This looks for the last <p> element with text in the event item, which typically contains the commission name
-        all_paragraphs = event_item.find_all('p', class_="mt-1 flex text-xs leading-5 text-gray-500")
-        for p in all_paragraphs:
-            # Skip paragraphs that contain "Fecha:" or document links
-            if p.find('span', string=lambda s: s and "Fecha:" in s) or p.find('a'):
-                continue
-            
-            # Check if this paragraph contains text about a commission
-            commission_text = p.get_text(strip=True)
-            if commission_text and "Comisión" in commission_text:
-                # This is likely the commission name
-                event_data["comision"] = commission_text
-                break
-        
-        # Extract documents
-        doc_links = event_item.find_all('a', href=True)
-        for link in doc_links:
-            doc_url = link['href']
-            # Skip User-Manual files
-            if "User-Manual" in doc_url:
-                logger.info(f"Skipping User-Manual file in extraction: {doc_url}")
-                continue
-                
-            # Make sure URL is absolute
-            if not doc_url.startswith("http"):
-                doc_url = "https://sutra.oslpr.org" + doc_url
-                
-            # Try to find document description
-            doc_desc_elem = link.find('span', class_=lambda c: c and "text-sutra-secondary" in c)
-            doc_desc = doc_desc_elem.get_text(strip=True) if doc_desc_elem else "Document"
-            
-            event_data["documents"].append({
-                "link_url": doc_url,
-                "description": doc_desc
-            })
-        
-        # Determine if this is a vote event
-        if "Votación" in event_title or "Aprobado" in event_title:
-            # Try to extract vote counts
-            vote_counts = {}
-            vote_elements = event_item.find_all('span', string=lambda s: s and any(x in s for x in ["Votos a favor", "Votos en contra", "Votos abstenidos", "Votos ausentes"]))
-            
-            for vote_elem in vote_elements:
-                vote_type = vote_elem.get_text(strip=True).rstrip(":")
-                vote_value_elem = vote_elem.parent
-                if vote_value_elem:
-                    try:
-                        # Extract just the number
-                        vote_text = vote_value_elem.get_text(strip=True).replace(vote_type, "").strip()
-                        vote_counts[vote_type] = int(vote_text) if vote_text.isdigit() else vote_text
-                    except:
-                        pass
-            
-            data["votaciones"].append({
-                "camara": "Senado" if "Senado" in event_title else "Cámara",
-                "fecha": event_data["fecha"],
-                "descripcion": event_title,  # Changed from "resultado" to "descripcion"
-                "documents": event_data["documents"],
-                "votes": vote_counts if vote_counts else None
-            })
-        else:
-            # This is a regular "tramite" (processing step)
-            data["tramites"].append(event_data)
-    
-    logger.info(f"Extracted {len(data['tramites'])} tramites and {len(data['votaciones'])} votaciones")
-
-    if driver:
-        driver.quit()
-
     # --- 7. Prepare Documents (with optional downloading) ---
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    all_documents = data["documents"] + [doc for tramite in data["tramites"] for doc in tramite["documents"]] + [doc for votacion in data["votaciones"] for doc in votacion["documents"]] + [doc for comision in data["comisiones"] for doc in comision["documents"]]
+    # Each URL is downloaded once, however many lists it appears in
+    all_documents = list(doc_index.values())
 
     logger.info(f"Found {len(all_documents)} documents")
 
-    # Check if we're applying the monkey patch 
-    if download_and_process_doc.__name__ == 'patched_download_func':
+    if skip_downloads:
         logger.info("IMPORTANT: Document downloads SKIPPED due to --no-extract flag")
-        processed_documents = [download_and_process_doc(doc, output_dir) for doc in all_documents]
+        processed_documents = [document_metadata(doc) for doc in all_documents]
         # Add timing info
         logger.info(f"Processed {len(processed_documents)} document metadata in NO DOWNLOAD mode")
     else:
-        # Use ThreadPoolExecutor to download files in parallel WITHOUT text extraction
+        # Download files in parallel WITHOUT text extraction
         logger.info(f"Starting parallel download of {len(all_documents)} documents (no text extraction)")
-        processed_documents = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            # Pass extract_text=False to skip text extraction
-            download_fn = partial(download_and_process_doc, output_dir=output_dir, extract_text=False)
-            # Process results as they complete to track errors
-            for i, doc_info in enumerate(executor.map(download_fn, all_documents)):
-                processed_documents.append(doc_info)
-
-                # If document had an error, add it to the data errors list
-                if 'error' in doc_info:
-                    data.setdefault("errors", []).append(doc_info['error'])
-                    del doc_info['error']  # Remove temporary error field
-                    
+        try:
+            from async_downloader import download_documents
+        except ImportError:
+            download_documents = None
+
+        if download_documents is not None:
+            processed_documents, data["download_stats"] = download_documents(all_documents, output_dir)
+        else:
+            logger.warning("aiohttp not installed, falling back to threaded downloads")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+                # Pass extract_text=False to skip text extraction
+                download_fn = partial(download_and_process_doc, output_dir=output_dir, extract_text=False)
+                processed_documents = list(executor.map(download_fn, all_documents))
+
+        # If a document had an error, add it to the data errors list
+        for doc_info in processed_documents:
+            if 'error' in doc_info:
+                data.setdefault("errors", []).append(doc_info['error'])
+                del doc_info['error']  # Remove temporary error field
+
         logger.info(f"Completed downloading {len(processed_documents)} documents")
 
     # Replace the all_documents list with the processed one
@@ -591,19 +539,210 @@ def scrape_and_download(url, output_dir="scraped_data"):
     logger.info("Data structure collected from scraping:")
     logger.info(json.dumps(data, indent=2, ensure_ascii=False))
 
-    # Save the JSON to a file for reference
-    json_filepath = os.path.join(output_dir, "scraped_data.json")
-    with open(json_filepath, 'w', encoding='utf-8') as json_file:
-        json.dump(data, indent=2, ensure_ascii=False, fp=json_file)
-    logger.info(f"Saved structured data to {json_filepath}")
+    # Upsert into the bill store; every bill scraped stays available there
+    if url:
+        save_bill(url, data, "full")
+        logger.info(f"Saved {data.get('measure_number')} to the bill store")
 
     cleanup_debug_files()
 
     return data
 
+# Resolves once the bill header or timeline exists and the DOM has had no
+# mutations for quietMs, so we return as soon as the page stops rendering
+TIMELINE_QUIESCENCE_SCRIPT = """
+const [quietMs, timeoutMs, done] = arguments;
+const eventSelector = "li[class*='relative flex justify-between']";
+const ready = () => document.querySelector("h1[class*='text-2xl']") || document.querySelector(eventSelector);
+const started = Date.now();
+let quietTimer = null;
+let finished = false;
+
+const finish = (status) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(deadline);
+    done({status: status, events: document.querySelectorAll(eventSelector).length, elapsed_ms: Date.now() - started});
+};
+
+// Every mutation restarts the quiet period; if it ends before the content
+// exists, keep waiting for the next one
+const arm = () => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(() => ready() ? finish("quiet") : arm(), quietMs);
+};
+
+const observer = new MutationObserver(arm);
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true, attributes: true});
+const deadline = setTimeout(() => finish(ready() ? "timeout" : "not_ready"), timeoutMs);
+arm();
+"""
+
+def wait_for_timeline(driver, quiet_ms=500, timeout=30):
+    """
+    Wait for the bill page to finish rendering using a MutationObserver.
+    Returns {"status": "quiet" | "timeout" | "not_ready", "events": n, "elapsed_ms": ms}.
+    """
+    driver.set_script_timeout(timeout + 5)
+    return driver.execute_async_script(TIMELINE_QUIESCENCE_SCRIPT, quiet_ms, timeout * 1000)
+
+# Non-blocking readiness probe for batch tabs: installs a MutationObserver on
+# first call and reports whether the page has loaded, and whether the content
+# exists and has been quiet
+TAB_READINESS_SCRIPT = """
+const quietMs = arguments[0];
+const eventSelector = "li[class*='relative flex justify-between']";
+if (location.href === "about:blank") return {loaded: false, ready: false};
+if (!window.__sutraLastMutation) {
+    window.__sutraLastMutation = Date.now();
+    new MutationObserver(() => { window.__sutraLastMutation = Date.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, characterData: true, attributes: true});
+}
+const hasContent = !!(document.querySelector("h1[class*='text-2xl']") || document.querySelector(eventSelector));
+return {loaded: document.readyState === "complete",
+        ready: hasContent && Date.now() - window.__sutraLastMutation >= quietMs};
+"""
+
+def scrape_bills_batch(urls, output_dir="scraped_data", tabs=4, skip_downloads=True, quiet_ms=500, timeout=60):
+    """
+    Scrapes many bills with one browser, keeping up to `tabs` pages loading at
+    once. Yields one result dict per bill (with its "url") as soon as that
+    page is ready, in completion order.
+
+    Like driver.get in the single-bill scraper, a tab holds a slot of SUTRA's
+    rate limiter only while its page loads. Ready pages are built (and their
+    documents downloaded, through the same limiter) only once no tab holds a
+    slot, so the downloads never wait on slots only this loop can free.
+    """
+    from chrome_pool import get_driver_pool
+
+    pool = get_driver_pool()
+    pending = deque(urls)
+    active = {}  # window handle -> (url, started, holding a limiter slot)
+    harvested = deque()  # (url, scrape_time, page source or None if it timed out)
+    pooled = pool.checkout()
+    driver = pooled.driver
+    home_window = driver.current_window_handle
+    opened = 0  # bills loaded in this driver's tabs, each a page towards its recycling
+    broken = False
+
+    try:
+        while pending or active or harvested:
+            if harvested and not any(holding for _, _, holding in active.values()):
+                while harvested:
+                    url, scrape_time, page_source = harvested.popleft()
+                    if page_source is None:
+                        result = {"error": f"Timed out after {timeout} seconds waiting for page"}
+                    else:
+                        try:
+                            result = build_bill_data(page_source, output_dir, skip_downloads, url=url)
+                        except Exception as e:
+                            logger.error(f"Batch: error processing {url}: {e}")
+                            result = {"error": f"Error: {str(e)}"}
+                    result["url"] = url
+                    result["scrape_time"] = scrape_time
+                    yield result
+
+            # A driver that has served its max_pages is swapped for a fresh one
+            # once its last tab closes, as checkin does between single scrapes
+            if pending and not active and pool.worn_out(pooled, opened):
+                pool.checkin(pooled, pages=opened)
+                pooled = None
+                pooled = pool.checkout()
+                driver = pooled.driver
+                home_window = driver.current_window_handle
+                opened = 0
+
+            # Start loading bills in free tabs without waiting for them (and
+            # the adaptive rate limit for SUTRA has room); not while harvested
+            # pages wait for the loading tabs to give back their slots
+            while (not harvested and pending and len(active) < tabs and not pool.worn_out(pooled, opened)
+                   and get_limiter(pending[0]).try_acquire() == 0):
+                url = pending.popleft()
+                driver.switch_to.new_window('tab')
+                driver.execute_script("window.location.href = arguments[0];", url)
+                active[driver.current_window_handle] = (url, time.time(), True)
+                opened += 1
+                logger.info(f"Batch: loading {url} ({len(pending)} queued)")
+
+            # Free the slots of tabs that have loaded and harvest whichever
+            # tabs have finished rendering
+            for handle, (url, started, holding) in list(active.items()):
+                driver.switch_to.window(handle)
+                try:
+                    state = driver.execute_script(TAB_READINESS_SCRIPT, quiet_ms) or {}
+                except Exception as e:
+                    # The tab was mid-navigation; check it again next round
+                    logger.debug(f"Batch: readiness check failed for {url}: {e}")
+                    continue
+
+                timed_out = time.time() - started > timeout
+                loaded = state.get("loaded") or state.get("ready")
+                if holding and (loaded or timed_out):
+                    get_limiter(url).release(error=not loaded)
+                    active[handle] = (url, started, False)
+                if not state.get("ready") and not timed_out:
+                    continue
+
+                if state.get("ready"):
+                    page_source = driver.page_source
+                else:
+                    logger.error(f"Batch: timed out waiting for {url}")
+                    page_source = None
+                harvested.append((url, time.time() - started, page_source))
+
+                # Closing leaves the driver on a dead handle; go back before opening the next tab
+                driver.close()
+                driver.switch_to.window(home_window)
+                del active[handle]
+
+            if active:
+                time.sleep(0.1)
+    except Exception as e:
+        logger.error(f"Batch: browser error: {e}")
+        broken = True
+        raise
+    finally:
+        # pooled is None only if checking out a replacement driver failed
+        if pooled is not None:
+            try:
+                for handle, (url, started, holding) in list(active.items()):
+                    if holding:
+                        get_limiter(url).release()
+                    driver.switch_to.window(handle)
+                    driver.close()
+                    driver.switch_to.window(home_window)
+            except Exception:
+                broken = True
+            pool.checkin(pooled, broken=broken, pages=opened)
+
+def document_metadata(doc_info):
+    """Document info without downloading (used when downloads are skipped)."""
+    return {
+        "link_url": doc_info["link_url"],
+        "description": doc_info.get("description", "Document"),
+        "downloaded": False,
+        "text_extracted": False
+    }
+
+def merge_document_description(doc, description):
+    """Merge another description for the same document URL into doc."""
+    if not description or description == doc["description"]:
+        return
+    # Prefer a real description over the generic placeholder
+    if not doc["description"] or doc["description"] == "Document":
+        doc["description"] = description
+        return
+    if description != "Document" and description not in doc["description"].split(" / "):
+        doc["description"] = f"{doc['description']} / {description}"
+
 def extract_text_from_docx(docx_path):
     """Extracts text from a .docx file."""
     try:
+        import docx
+
         doc = docx.Document(docx_path)
         full_text = []
         
@@ -640,10 +779,11 @@ def extract_text_from_docx(docx_path):
         return ""
 
 def extract_text_from_pdf(pdf_path):
-    """Extracts text from a PDF file."""
+    """Extracts text from a PDF file, page ranges in parallel on the shared process pool."""
     try:
-        text = extract_text(pdf_path)
-        return text
+        from pdf_extractor import extract_pdf_text
+
+        return extract_pdf_text(pdf_path)
     except Exception as e:
         logger.error(f"Error extracting text from {pdf_path}: {e}")
         return ""
@@ -669,13 +809,32 @@ if __name__ == "__main__":
     
     # Setup argument parser for better command-line options
     parser = argparse.ArgumentParser(description="Scrape bill data from SUTRA website")
-    parser.add_argument("url", help="URL of the bill page to scrape")
+    parser.add_argument("url", nargs="?", help="URL of the bill page to scrape")
     parser.add_argument("--no-extract", action="store_true", help="Skip document downloading and text extraction")
     parser.add_argument("--output-dir", default="scraped_data", help="Directory to save scraped data")
+    parser.add_argument("--batch", metavar="FILE", help="Scrape every bill URL in FILE (one per line, - for stdin) and print NDJSON")
+    parser.add_argument("--tabs", type=int, default=4, help="Concurrent browser tabs in batch mode")
     
     # Parse only known args to handle when called from Node.js
     args, unknown = parser.parse_known_args()
     
+    if args.batch:
+        batch_file = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+        with batch_file:
+            batch_urls = [line.strip() for line in batch_file if line.strip()]
+        logger.info(f"Starting batch scrape of {len(batch_urls)} bills with {args.tabs} tabs")
+        
+        from chrome_pool import get_driver_pool
+        get_driver_pool(size=1)
+        
+        # One JSON line per bill, flushed as soon as it is ready
+        for result in scrape_bills_batch(batch_urls, args.output_dir, tabs=args.tabs, skip_downloads=args.no_extract):
+            print(json.dumps(result), flush=True)
+        sys.exit(0)
+    
+    if not args.url:
+        parser.error("a bill URL or --batch FILE is required")
+    
     url = args.url
     output_directory = args.output_dir
     skip_downloads = args.no_extract
@@ -683,37 +842,19 @@ if __name__ == "__main__":
     logger.info(f"Starting scraper for URL: {url}")
     logger.info(f"Skip document downloads: {skip_downloads}")
     
-    # Modify the scrape_and_download function behavior based on the flag
-    if skip_downloads:
-        # Create a patched version of download_and_process_doc that just returns the URL info
-        original_download_func = download_and_process_doc
-        
-        def patched_download_func(doc_info, output_dir, extract_text=False):
-            # Just return the document info without downloading
-            return {
-                "link_url": doc_info["link_url"],
-                "description": doc_info.get("description", "Document"),
-                "downloaded": False,
-                "text_extracted": False
-            }
-        
-        # Apply the monkey patch
-        import types
-        download_and_process_doc = patched_download_func
+    # A one-off run only ever needs a single browser
+    from chrome_pool import get_driver_pool
+    get_driver_pool(size=1)
     
     # Call the scraper
-    result = scrape_and_download(url, output_directory)
+    result = scrape_and_download(url, output_directory, skip_downloads=skip_downloads)
 
     if "error" in result:
         logger.error(result["error"])
         # Still output the result as JSON even on error
         print(json.dumps(result))
     else:
-        # Save the result to a JSON file
-        with open("result.json", "w", encoding="utf-8") as f:
-            json.dump(result, indent=2, ensure_ascii=False, fp=f)
-        logger.info("Results saved to result.json")
-        
+        # The bill itself was saved to the bill store by build_bill_data
         # IMPORTANT: Print the result as JSON for the Node.js server to parse
         print(json.dumps(result))
         
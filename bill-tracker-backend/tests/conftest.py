@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The backend is a directory of flat modules, imported by name like scraper_worker does
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Saved pages and documents the tests parse
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
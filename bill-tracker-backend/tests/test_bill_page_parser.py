@@ -0,0 +1,65 @@
+"""
+Every parser backend must turn a saved SUTRA bill page into exactly the dict
+the original BeautifulSoup/html.parser rules produce.
+"""
+
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from bill_page_parser import PARSER_BACKENDS, get_parser_backend
+
+REFERENCE_BACKEND = "html.parser"
+PAGES = sorted(name for name in os.listdir(FIXTURES_DIR) if name.startswith("bill_") and name.endswith(".html"))
+
+
+def load_page(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def backend_or_skip(name):
+    backend = get_parser_backend(name)
+    if backend.name != name:
+        pytest.skip(f"{name} is not installed")
+    return backend
+
+
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.parametrize("backend_name", [name for name in PARSER_BACKENDS if name != REFERENCE_BACKEND])
+def test_backend_matches_reference(page, backend_name):
+    html = load_page(page)
+    expected = get_parser_backend(REFERENCE_BACKEND).parse(html)
+    assert backend_or_skip(backend_name).parse(html) == expected
+
+
+def test_reference_parse_of_full_page():
+    page = get_parser_backend(REFERENCE_BACKEND).parse(load_page("bill_ps0136.html"))
+
+    assert page["measure_number"] == "Medida:Proyecto del Senado (PS0136)"
+    assert page["filing_date"] == "01/02/2025"
+    assert page["title"].startswith("Para crear la “Ley de Entrevista Forense de Menores”")
+    assert page["authors"] == ["Hon. Thomas Rivera Schatz", "Hon. Nitza Moran Trinidad",
+                               "Hon. Gregorio Matías Rosario"]
+    assert page["commission_items"] == ["Comisión De Lo Jurídico",
+                                        "Comisión de Hacienda, Asuntos Federales y Junta de Supervisión Fiscal"]
+
+    events = page["events"]
+    assert [event["descripcion"] for event in events] == [
+        "Radicado", "Referido a Comisión", "Vista Pública: Salón Leopoldo Figueroa", "Informe Positivo",
+        "Votación Final Senado - Aprobado", "Enviado a la Cámara"]
+    assert events[2]["comision"] == "Comisión De Lo Jurídico"
+    # The user manual link in an event is not one of its documents
+    assert [doc["description"] for doc in events[2]["documents"]] == ["Ponencias"]
+    assert len(events[3]["documents"]) == 2
+    assert events[4]["votes"]["Votos a favor"]
+    assert events[5]["documents"] == []
+
+
+def test_reference_parse_of_missing_page():
+    page = get_parser_backend(REFERENCE_BACKEND).parse(load_page("bill_empty.html"))
+
+    assert page["measure_number"] is None
+    assert page["events"] == []
+    assert page["document_links"] == []
@@ -0,0 +1,60 @@
+"""
+A measure with a long history must come back with every timeline event and
+its full fields, within the time fast_scrape used to cut parsing off at.
+
+The 400-event page is synthetic (built from the PS0136 fixture), so it
+bounds the parse of the timeline, not of a real SUTRA page; time saved
+pages with bill_page_parser.py --benchmark.
+"""
+
+import gzip
+import os
+import time
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from bill_page_parser import PARSER_BACKENDS, get_parser_backend
+
+# fast_scrape's old cut-off; a single parse of the largest measures must fit in it
+PARSE_BUDGET_SECONDS = float(os.environ.get("PARSE_BUDGET_SECONDS", 1.8))
+RUNS = 3
+
+LONG_TIMELINE_EVENTS = 400
+
+
+@pytest.fixture(scope="module")
+def long_timeline_html():
+    with gzip.open(os.path.join(FIXTURES_DIR, "bill_long_timeline.html.gz"), "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("backend_name", list(PARSER_BACKENDS))
+def test_long_timeline_within_budget(long_timeline_html, backend_name):
+    backend = get_parser_backend(backend_name)
+    if backend.name != backend_name:
+        pytest.skip(f"{backend_name} is not installed")
+
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        page = backend.parse(long_timeline_html)
+        timings.append(time.perf_counter() - started)
+
+    events = page["events"]
+    assert len(events) == LONG_TIMELINE_EVENTS
+    assert all(event["descripcion"] and event["fecha"] for event in events)
+    # Events late in the timeline keep their documents, commissions and votes
+    tail = events[-6:]
+    assert [len(event["documents"]) for event in tail] == [1, 0, 1, 0, 1, 2]
+    assert ["comision" in event for event in tail] == [False, False, False, True, True, True]
+    assert ["votes" in event for event in tail] == [True, False, False, False, False, False]
+    assert min(timings) <= PARSE_BUDGET_SECONDS, f"{backend_name} took {min(timings):.2f}s"
+
+
+def test_long_timeline_backends_agree(long_timeline_html):
+    expected = get_parser_backend("html.parser").parse(long_timeline_html)
+    for backend_name in PARSER_BACKENDS:
+        backend = get_parser_backend(backend_name)
+        if backend.name == backend_name:
+            assert backend.parse(long_timeline_html) == expected, backend_name
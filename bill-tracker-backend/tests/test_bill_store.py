@@ -0,0 +1,61 @@
+"""
+The bill store keeps what each scraper knows: a fast scrape (which never
+reads the commission tab) must not erase what a full scrape stored.
+"""
+
+import pytest
+
+from bill_store import BillStore
+
+URL = "https://sutra.oslpr.org/medidas/155436"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BillStore(str(tmp_path / "bills.db"))
+
+
+def full_result():
+    return {
+        "measure_number": "PS0136",
+        "title": "Para crear la Ley de Entrevista Forense de Menores",
+        "comisiones": [{"comision": "Hacienda", "documents": [
+            {"link_url": "https://sutra.oslpr.org/SutraFilesGen/155436/informe.pdf", "description": "Informe",
+             "downloaded": True, "text_extracted": True, "filepath": "objects/ab/cd/ab.pdf",
+             "text_filepath": "objects/ab/cd/ab.pdf.txt"}]}],
+        "eventos": [{"descripcion": "Radicado", "fecha": "01/02/2025", "documents": []}],
+    }
+
+
+def fast_result():
+    return {
+        "measure_number": "PS0136",
+        "comisiones": [],
+        "eventos": [
+            {"descripcion": "Radicado", "fecha": "01/02/2025", "documents": []},
+            {"descripcion": "Referido a Comisión", "fecha": "03/02/2025", "comision": "Hacienda",
+             "documents": [{"link_url": "https://sutra.oslpr.org/SutraFilesGen/155436/ponencia.pdf",
+                            "description": "Ponencia"}]},
+        ],
+    }
+
+
+def test_fast_upsert_keeps_full_scrape_commissions(store):
+    store.upsert_bill(URL, full_result(), "full")
+    store.upsert_bill(URL, fast_result(), "fast")
+
+    bill = store.get_bill(URL)
+    assert [c["comision"] for c in bill["comisiones"]] == ["Hacienda"]
+    assert bill["comisiones"][0]["documents"][0]["filepath"] == "objects/ab/cd/ab.pdf"
+    # The timeline is the fast scrape's
+    assert [e["descripcion"] for e in bill["eventos"]] == ["Radicado", "Referido a Comisión"]
+    assert bill["eventos"][1]["documents"][0]["description"] == "Ponencia"
+
+
+def test_full_upsert_replaces_commissions(store):
+    store.upsert_bill(URL, full_result(), "full")
+    rescraped = full_result()
+    rescraped["comisiones"] = []
+    store.upsert_bill(URL, rescraped, "full")
+
+    assert store.get_bill(URL)["comisiones"] == []
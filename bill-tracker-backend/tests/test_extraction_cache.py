@@ -0,0 +1,72 @@
+"""
+Only real extractions are cached: a failed .doc conversion must not be
+stored as the document's text, and text from the antiword fallback is
+recorded as antiword's rather than LibreOffice's.
+"""
+
+import os
+import subprocess
+
+import pytest
+
+from document_store import digest_of, get_store
+from extraction_cache import cached_extraction, extract_cached
+
+URL = "https://sutra.oslpr.org/SutraFilesGen/155436/informe.doc"
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    # The scraper logs to scraper.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    import sutra_scraper_enhanced
+    from doc_converter import ConversionError
+
+    def unavailable(path):
+        raise ConversionError("soffice is not running")
+
+    monkeypatch.setattr(sutra_scraper_enhanced, "convert_doc_to_text", unavailable)
+    return sutra_scraper_enhanced
+
+
+@pytest.fixture
+def stored_doc(tmp_path):
+    output_dir = str(tmp_path / "scraped_data")
+    store = get_store(output_dir)
+    staging = store.staging_path(URL)
+    os.makedirs(os.path.dirname(staging), exist_ok=True)
+    with open(staging, "wb") as f:
+        f.write(b"\xd0\xcf\x11\xe0 informe")
+    return store.commit(URL, staging, digest_of(staging)), output_dir
+
+
+def extract(scraper, filepath, output_dir):
+    return extract_cached(filepath, output_dir, lambda path: scraper.extract_document_text(path, output_dir))
+
+
+def test_failed_conversion_is_not_cached(scraper, stored_doc, monkeypatch):
+    filepath, output_dir = stored_doc
+
+    def no_antiword(*args, **kwargs):
+        raise FileNotFoundError("antiword")
+
+    monkeypatch.setattr(scraper.subprocess, "run", no_antiword)
+    text, metadata, cached = extract(scraper, filepath, output_dir)
+    assert (text, metadata, cached) == ("", None, False)
+
+    monkeypatch.setattr(scraper.subprocess, "run", lambda command, **kwargs: subprocess.CompletedProcess(
+        command, 1, stdout="", stderr="informe.doc is not a Word Document."))
+    assert extract(scraper, filepath, output_dir) == ("", None, False)
+    assert get_store(output_dir).extraction(filepath) is None
+
+
+def test_antiword_text_is_recorded_as_antiword(scraper, stored_doc, monkeypatch):
+    filepath, output_dir = stored_doc
+    monkeypatch.setattr(scraper.subprocess, "run", lambda command, **kwargs: subprocess.CompletedProcess(
+        command, 0, stdout="Informe positivo", stderr=""))
+
+    text, metadata, cached = extract(scraper, filepath, output_dir)
+    assert (text, cached) == ("Informe positivo", False)
+    assert metadata["extractor"] == "antiword"
+    # Not LibreOffice's text, so LibreOffice gets another go next time
+    assert cached_extraction(filepath, output_dir) is None
@@ -0,0 +1,48 @@
+"""
+Cold import of the download/extract path (sutra_scraper_enhanced) must stay
+cheap: the heavy scraping and extraction libraries load only when their code
+path runs, and the whole import fits in IMPORT_TIME_BUDGET_MS.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 600))
+RUNS = 3
+
+# Loaded by scrape_and_download, the extractors and the search index, never on import
+HEAVY_MODULES = ("selenium", "webdriver_manager", "bs4", "lxml", "selectolax", "docx", "pdfminer",
+                 "snowballstemmer", "unoserver")
+
+
+def cold_import(tmp_path):
+    """(cumulative import microseconds, heavy modules loaded) for a fresh interpreter."""
+    probe = ("import sys, json, sutra_scraper_enhanced; "
+             f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=tmp_path, env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+        capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == "sutra_scraper_enhanced":
+            cumulative = int(parts[1])
+    assert cumulative is not None, result.stderr[-2000:]
+    return cumulative, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_heavy_dependencies_are_not_imported(tmp_path):
+    _, loaded = cold_import(tmp_path)
+    assert loaded == []
+
+
+def test_cold_import_within_budget(tmp_path):
+    # Best of a few runs, so a busy machine doesn't fail the check
+    best_ms = min(cold_import(tmp_path)[0] for _ in range(RUNS)) / 1000
+    assert best_ms <= IMPORT_TIME_BUDGET_MS, f"import took {best_ms:.0f}ms, budget {IMPORT_TIME_BUDGET_MS:.0f}ms"
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Text Index - Full-text search over extracted bill documents
+Every time a document's text is extracted it is added to an SQLite FTS5 index
+in the bill store's database, so finding the measures that mention a phrase
+is one ranked query instead of a grep over scraped_data/. Words are matched
+without regard to accents or case and by their Spanish stem ("enmiendas"
+finds "enmienda", "comisión" finds "comisiones"). The text itself stays in
+the .txt sidecar next to each document; only stems go into the index, and
+snippets are cut from the sidecar for the hits actually returned.
+
+Stemming uses the Snowball Spanish stemmer when snowballstemmer is installed
+and a built-in light stemmer otherwise.
+
+Usage: text_index.py QUERY... | --reindex
+"""
+
+import functools
+import html
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+
+from bill_store import get_bill_store
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS document_texts (
+    id INTEGER PRIMARY KEY,
+    link_url TEXT NOT NULL UNIQUE,
+    text_filepath TEXT,
+    chars INTEGER,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS document_fts USING fts5 (stems, tokenize = 'unicode61 remove_diacritics 2');
+CREATE TABLE IF NOT EXISTS text_index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Words too common in legislative Spanish to be worth indexing
+STOPWORDS = frozenset("""
+a al ante con contra de del desde e el en entre es esta este esto la las lo los o para por que se
+sin sobre su sus un una unos unas y ya como mas pero sus le les ha han fue ser son sea no ni
+""".split())
+
+# Longest first; applied once, before the plural and final-vowel rules
+LIGHT_SUFFIXES = sorted((
+    "amientos", "imientos", "amiento", "imiento", "aciones", "uciones", "adoras", "adores", "ancias",
+    "encias", "idades", "mente", "acion", "ucion", "ancia", "encia", "adora", "ador", "idad",
+    "ables", "ibles", "able", "ible", "istas", "ista", "osos", "osas", "oso", "osa", "ivas", "ivos",
+    "iva", "ivo",
+), key=len, reverse=True)
+
+# How much of a document's text is scanned for a snippet, and its size in words
+SNIPPET_SCAN_CHARS = 2_000_000
+SNIPPET_WORDS = 30
+
+
+def fold(text):
+    """Lowercase without accents (ñ folds to n too, as SUTRA's own search does)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def light_stem(word):
+    """Minimal Spanish stemmer for folded words: a derivational suffix, the plural, a final vowel."""
+    if len(word) < 5:
+        return word
+    for suffix in LIGHT_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith("es") and len(word) > 5:
+        word = word[:-2]
+    elif word.endswith("s"):
+        word = word[:-1]
+    if word[-1] in "aeo" and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+@functools.lru_cache(maxsize=None)
+def load_stemmer():
+    """(name, stem function), loaded on first use so importing this module stays cheap."""
+    try:
+        import snowballstemmer
+    except ImportError:
+        return "light", lambda word: light_stem(fold(word))
+    snowball = snowballstemmer.stemmer("spanish")
+    # Snowball expects the accents, so fold after stemming
+    return "snowball", lambda word: fold(snowball.stemWord(word))
+
+
+def stemmer_name():
+    return load_stemmer()[0]
+
+
+@functools.lru_cache(maxsize=100_000)
+def stem(word):
+    return load_stemmer()[1](word.lower())
+
+
+def stems(text):
+    """The words of text as stems, stopwords dropped."""
+    return [stem(word) for word in WORD_RE.findall(text) if fold(word) not in STOPWORDS]
+
+
+def build_match(query):
+    """
+    FTS5 MATCH expression for a user query: every word must appear (by stem),
+    "quoted phrases" must appear in order, and a trailing * makes a word a prefix.
+    Returns (expression, set of query stems), or (None, set()) for an empty query.
+    """
+    terms, query_stems = [], set()
+    for phrase, word in QUERY_RE.findall(query):
+        if phrase:
+            phrase_stems = stems(phrase)
+            if phrase_stems:
+                terms.append('"' + " ".join(phrase_stems) + '"')
+                query_stems.update(phrase_stems)
+            continue
+        prefix = word.endswith("*")
+        words = WORD_RE.findall(word)
+        for index, part in enumerate(words):
+            if fold(part) in STOPWORDS:
+                continue
+            term = stem(part)
+            query_stems.add(term)
+            terms.append(f'"{term}" *' if prefix and index == len(words) - 1 else f'"{term}"')
+    return (" AND ".join(terms) if terms else None), query_stems
+
+
+def make_snippet(text, query_stems, words=SNIPPET_WORDS):
+    """The words around the first query match in text, matches wrapped in <mark>."""
+    tokens = list(WORD_RE.finditer(text[:SNIPPET_SCAN_CHARS]))
+    first = next((i for i, token in enumerate(tokens) if stem(token.group()) in query_stems), 0)
+    start = max(first - words // 3, 0)
+    window = tokens[start:start + words]
+    if not window:
+        return ""
+    parts, position = [], window[0].start()
+    for token in window:
+        parts.append(html.escape(text[position:token.start()]))
+        word = html.escape(token.group())
+        parts.append(f"<mark>{word}</mark>" if stem(token.group()) in query_stems else word)
+        position = token.end()
+    snippet = re.sub(r"\s+", " ", "".join(parts)).strip()
+    prefix = "… " if window[0].start() > 0 else ""
+    suffix = " …" if window[-1].end() < len(text) else ""
+    return prefix + snippet + suffix
+
+
+class TextIndex:
+    """FTS5 index over extracted document text, sharing the bill store's database."""
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.stats = {"indexed": 0, "queries": 0, "query_ms": 0.0}
+        conn = store.connection()
+        conn.executescript(SCHEMA)
+        row = conn.execute("SELECT value FROM text_index_meta WHERE key = 'stemmer'").fetchone()
+        if row is None or row["value"] != stemmer_name():
+            if row is not None:
+                logger.warning(f"Index was built with the {row['value']} stemmer; rebuilding with {stemmer_name()}")
+            self.rebuild()
+            with store.transaction() as conn:
+                conn.execute("INSERT OR REPLACE INTO text_index_meta (key, value) VALUES ('stemmer', ?)",
+                             (stemmer_name(),))
+
+    def index_document(self, link_url, text, text_filepath=None):
+        """Add or replace one document's text in the index."""
+        indexed_stems = " ".join(stems(text))
+        with self.store.transaction() as conn:
+            row = conn.execute("SELECT id FROM document_texts WHERE link_url = ?", (link_url,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM document_fts WHERE rowid = ?", (row["id"],))
+                conn.execute("UPDATE document_texts SET text_filepath = ?, chars = ?, indexed_at = ? WHERE id = ?",
+                             (text_filepath, len(text), time.time(), row["id"]))
+                doc_id = row["id"]
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO document_texts (link_url, text_filepath, chars, indexed_at) VALUES (?, ?, ?, ?)",
+                    (link_url, text_filepath, len(text), time.time())).lastrowid
+            conn.execute("INSERT INTO document_fts (rowid, stems) VALUES (?, ?)", (doc_id, indexed_stems))
+        with self.lock:
+            self.stats["indexed"] += 1
+
+    def is_indexed(self, link_url, text_filepath):
+        row = self.store.connection().execute(
+            "SELECT 1 FROM document_texts WHERE link_url = ? AND text_filepath IS ?",
+            (link_url, text_filepath)).fetchone()
+        return row is not None
+
+    def rebuild(self):
+        """Re-stem every indexed document from its sidecar, plus any extracted text not yet indexed."""
+        conn = self.store.connection()
+        sources = {row["link_url"]: row["text_filepath"] for row in conn.execute(
+            "SELECT link_url, text_filepath FROM document_texts")}
+        for row in conn.execute(
+                "SELECT link_url, text_filepath FROM documents WHERE text_extracted = 1 "
+                "AND text_filepath IS NOT NULL").fetchall():
+            sources.setdefault(row["link_url"], row["text_filepath"])
+        indexed = 0
+        for link_url, text_filepath in sources.items():
+            text = read_text(text_filepath)
+            if text is None:
+                continue
+            self.index_document(link_url, text, text_filepath)
+            indexed += 1
+        if sources:
+            logger.info(f"Indexed {indexed} of {len(sources)} extracted documents")
+        return indexed
+
+    def search(self, query, limit=20):
+        """Documents matching query, best first, each with the bills that list it and a snippet."""
+        started = time.perf_counter()
+        expression, query_stems = build_match(query)
+        if expression is None:
+            return []
+        conn = self.store.connection()
+        rows = conn.execute(
+            "SELECT document_texts.id, link_url, text_filepath, bm25(document_fts) AS score "
+            "FROM document_fts JOIN document_texts ON document_texts.id = document_fts.rowid "
+            "WHERE document_fts MATCH ? ORDER BY score LIMIT ?", (expression, limit)).fetchall()
+
+        hits = []
+        for row in rows:
+            bills = conn.execute(
+                "SELECT DISTINCT bills.url, bills.measure_number, bills.title, bills.filing_date, "
+                "documents.description FROM documents JOIN bills ON bills.id = documents.bill_id "
+                "WHERE documents.link_url = ?", (row["link_url"],)).fetchall()
+            text = read_text(row["text_filepath"])
+            hits.append({
+                "link_url": row["link_url"],
+                "text_filepath": row["text_filepath"],
+                # bm25() is lower-is-better; flip it so higher scores rank higher
+                "score": round(-row["score"], 6),
+                "snippet": make_snippet(text, query_stems) if text else "",
+                "bills": [{key: bill[key] for key in ("url", "measure_number", "title", "filing_date", "description")}
+                          for bill in bills],
+            })
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.stats["queries"] += 1
+            self.stats["query_ms"] += elapsed_ms
+        return hits
+
+    def health(self):
+        count = self.store.connection().execute("SELECT COUNT(*) FROM document_texts").fetchone()[0]
+        with self.lock:
+            queries = self.stats["queries"]
+            return {
+                "documents": count,
+                "stemmer": stemmer_name(),
+                "indexed": self.stats["indexed"],
+                "queries": queries,
+                "avg_query_ms": round(self.stats["query_ms"] / queries, 2) if queries else None,
+            }
+
+
+def read_text(text_filepath):
+    if not text_filepath:
+        return None
+    try:
+        with open(text_filepath, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_text_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TextIndex(get_bill_store())
+        return _index
+
+
+def text_index_stats():
+    return _index.health() if _index is not None else None
+
+
+def index_extracted_text(link_url, text, text_filepath=None):
+    """Add freshly extracted text to the index; a failure is logged, not raised."""
+    try:
+        index = get_text_index()
+        if text_filepath and index.is_indexed(link_url, text_filepath):
+            return
+        index.index_document(link_url, text, text_filepath)
+    except Exception as e:
+        logger.error(f"Could not index text of {link_url}: {e}")
+
+
+def search_documents(query, limit=20):
+    """Worker entry point: ranked document hits for query."""
+    started = time.perf_counter()
+    try:
+        hits = get_text_index().search(query, limit=limit)
+    except Exception as e:
+        logger.error(f"Search for {query!r} failed: {e}")
+        return {"success": False, "error": str(e), "hits": []}
+    return {
+        "success": True,
+        "query": query,
+        "hits": hits,
+        "count": len(hits),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(json.dumps({"success": False, "error": "A search query or --reindex is required"}))
+        sys.exit(1)
+
+    if sys.argv[1] == "--reindex":
+        result = {"success": True, "indexed": get_text_index().rebuild()}
+    else:
+        result = search_documents(" ".join(sys.argv[1:]))
+
+    print(json.dumps(result, ensure_ascii=False))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Worker Methods - The scraper functions the worker exposes, and their stats
+Importing this loads the whole scraping stack, so only the worker's main
+process does it: scraper_worker.py stays cheap to import for the processes
+the PDF extraction pool spawns (they re-run it as __mp_main__).
+"""
+
+import fast_scraper
+import sutra_scraper_enhanced
+import date_search_scraper
+import bill_sync
+import bill_store
+import text_index
+import chrome_pool
+import http_client
+import http_cache
+import rate_limiter
+import single_flight
+import date_search_cache
+import document_store
+import pdf_extractor
+import doc_converter
+import extraction_cache
+
+# Methods exposed to the Node.js server, called with params as keyword arguments
+METHODS = {
+    "fast_scrape": fast_scraper.fast_scrape,
+    "on_demand_document_processor": fast_scraper.on_demand_document_processor,
+    "download_and_process_doc": sutra_scraper_enhanced.download_and_process_doc,
+    "scrape_and_download": sutra_scraper_enhanced.scrape_and_download,
+    "scrape_bills_by_date": date_search_scraper.scrape_bills_by_date,
+    "scrape_bills_by_date_range": date_search_scraper.scrape_bills_by_date_range,
+    "sync_new_bills": bill_sync.sync_new_bills,
+    "get_stored_bill": bill_store.get_stored_bill,
+    "list_stored_bills": bill_store.list_stored_bills,
+    "search_documents": text_index.search_documents,
+    "convert_doc_to_docx": doc_converter.convert_doc_to_docx,
+    "stream_document_text": sutra_scraper_enhanced.stream_document_text,
+}
+
+
+def service_stats():
+    """Stats of the shared pools and caches, for the worker's health report."""
+    return {
+        "chrome_pool": chrome_pool.driver_pool_health(),
+        "http": http_client.connection_stats(),
+        "http_cache": http_cache.cache_stats(),
+        "rate_limits": rate_limiter.limiter_stats(),
+        "single_flight": single_flight.single_flight_stats(),
+        "date_search_cache": date_search_cache.date_cache_stats(),
+        "document_store": document_store.store_stats(),
+        "bill_store": bill_store.bill_store_stats(),
+        "text_index": text_index.text_index_stats(),
+        "pdf_extractor": pdf_extractor.pdf_extractor_stats(),
+        "doc_converter": doc_converter.doc_converter_stats(),
+        "extraction_cache": extraction_cache.extraction_cache_stats(),
+    }